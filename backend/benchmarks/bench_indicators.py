@@ -0,0 +1,245 @@
+"""
+Technical indicator benchmark suite
+
+Times every indicator function in stocks/utils.py and stocks/indicators.py,
+plus update_technical_indicators against an in-memory SQLite database, on
+synthetic price series of increasing length. Reports wall time, peak
+traced memory (tracemalloc) and the log-log scaling exponent between sizes,
+and writes the results as JSON so runs can be compared between releases.
+
+Runs offline; no PostgreSQL server or network access is needed.
+
+Usage (from the backend directory):
+    python benchmarks/bench_indicators.py
+    python benchmarks/bench_indicators.py --sizes 1000,10000 --output bench.json
+    python benchmarks/bench_indicators.py --db-max-size 100000
+"""
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def setup_django():
+    """
+    Configure Django with an in-memory SQLite database and create the schema
+    """
+    import django
+    from django.conf import settings
+    from django.core.management import call_command
+
+    settings.configure(
+        INSTALLED_APPS=[
+            'django.contrib.contenttypes',
+            'django.contrib.auth',
+            'users',
+            'stocks',
+        ],
+        DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}},
+        AUTH_USER_MODEL='users.User',
+        DEFAULT_AUTO_FIELD='django.db.models.BigAutoField',
+        USE_TZ=True,
+    )
+    django.setup()
+    call_command('migrate', verbosity=0)
+
+
+def synthetic_prices(size: int, seed: int = 42) -> np.ndarray:
+    """
+    Geometric Brownian motion close prices kept within DecimalField limits
+    """
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0002, 0.02, size)
+    prices = 100 * np.exp(np.cumsum(returns))
+    return np.round(np.clip(prices, 1, 99_999), 2)
+
+
+def measure(func, repeat: int):
+    """
+    Run func repeat times for the best wall time, then once more under tracemalloc
+
+    Returns:
+        Tuple of (best seconds, peak traced bytes)
+    """
+    best = math.inf
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def function_cases(prices: np.ndarray):
+    """
+    Indicator callables to benchmark for one price series
+    """
+    from stocks import indicators, utils
+
+    price_list = prices.tolist()
+    high = prices * 1.01
+    low = prices * 0.99
+    volume = np.full(prices.shape, 1_000_000.0)
+
+    return {
+        'utils.calculate_ma(20)': lambda: utils.calculate_ma(price_list, 20),
+        'utils.calculate_ema(12)': lambda: utils.calculate_ema(price_list, 12),
+        'utils.calculate_macd': lambda: utils.calculate_macd(price_list),
+        'utils.calculate_rsi(14)': lambda: utils.calculate_rsi(price_list),
+        'indicators.ma(20)': lambda: indicators.ma(prices, 20),
+        'indicators.ema(12)': lambda: indicators.ema(prices, 12),
+        'indicators.macd': lambda: indicators.macd(prices),
+        'indicators.rsi(14)': lambda: indicators.rsi(prices),
+        'utils.compute_indicator_columns': lambda: utils.compute_indicator_columns(prices),
+        'indicators.compute_indicator_set(all)': lambda: indicators.compute_indicator_set(
+            prices, high=high, low=low, volume=volume,
+            ma_periods=(5, 10, 20, 50), ema_periods=(12, 26), macd_params=(12, 26, 9),
+            rsi_periods=(14,), bollinger=(20, 2.0), atr_period=14, stochastic=(14, 3),
+            obv=True, vwap_period=20,
+        ),
+    }
+
+
+def seed_stock(symbol: str, prices: np.ndarray):
+    """
+    Insert a stock with one bar per day for every price
+    """
+    from stocks.models import Stock, StockPrice
+
+    stock = Stock.objects.create(symbol=symbol, name=symbol, exchange='BENCH')
+    start = date(1000, 1, 1)
+    StockPrice.objects.bulk_create(
+        (
+            StockPrice(
+                stock=stock,
+                date=start + timedelta(days=i),
+                open_price=price,
+                high_price=price,
+                low_price=price,
+                close_price=price,
+                volume=1_000_000,
+            )
+            for i, price in enumerate(prices.tolist())
+        ),
+        batch_size=5000,
+    )
+    return stock, start + timedelta(days=len(prices))
+
+
+def database_cases(size: int, prices: np.ndarray):
+    """
+    Benchmark update_technical_indicators full and incremental paths for one size
+    """
+    from stocks.models import StockPrice
+    from stocks.utils import update_technical_indicators
+
+    symbol = f'B{size}'[:10]
+    stock, next_date = seed_stock(symbol, prices)
+
+    results = {}
+    seconds, peak = measure(lambda: update_technical_indicators(symbol), repeat=1)
+    results['utils.update_technical_indicators(full)'] = (seconds, peak)
+
+    def append_and_update():
+        nonlocal next_date
+        price = float(prices[-1])
+        StockPrice.objects.create(
+            stock=stock, date=next_date, open_price=price, high_price=price,
+            low_price=price, close_price=price, volume=1_000_000
+        )
+        next_date += timedelta(days=1)
+        update_technical_indicators(symbol, incremental=True)
+
+    seconds, peak = measure(append_and_update, repeat=3)
+    results['utils.update_technical_indicators(incremental, 1 bar)'] = (seconds, peak)
+
+    stock.delete()
+    return results
+
+
+def scaling_exponents(rows):
+    """
+    Log-log slope of time against size between consecutive sizes of each case
+    """
+    by_case = {}
+    for row in rows:
+        by_case.setdefault(row['case'], []).append(row)
+
+    exponents = {}
+    for case, case_rows in by_case.items():
+        case_rows.sort(key=lambda row: row['size'])
+        slopes = []
+        for a, b in zip(case_rows, case_rows[1:]):
+            if a['seconds'] > 0 and b['seconds'] > 0:
+                slopes.append(round(
+                    math.log(b['seconds'] / a['seconds']) / math.log(b['size'] / a['size']), 3
+                ))
+        exponents[case] = slopes
+    return exponents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=str, default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help='Comma-separated series lengths')
+    parser.add_argument('--repeat', type=int, default=3, help='Timing repeats per function (best is kept)')
+    parser.add_argument('--db-max-size', type=int, default=max(DEFAULT_SIZES),
+                        help='Largest size used for the database benchmarks (0 skips them)')
+    parser.add_argument('--output', type=str, default='', help='Write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    setup_django()
+
+    rows = []
+    for size in sizes:
+        prices = synthetic_prices(size)
+        cases = {name: measure(func, args.repeat) for name, func in function_cases(prices).items()}
+        if args.db_max_size and size <= args.db_max_size:
+            cases.update(database_cases(size, prices))
+
+        for name, (seconds, peak) in cases.items():
+            rows.append({
+                'case': name,
+                'size': size,
+                'seconds': seconds,
+                'bars_per_second': size / seconds if seconds > 0 else None,
+                'peak_memory_bytes': peak,
+            })
+            print(f'{name:58s} {size:>9d} bars {seconds * 1000:>11.2f} ms {peak / 1e6:>9.2f} MB', file=sys.stderr)
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'sizes': sizes,
+        'results': rows,
+        'scaling_exponents': scaling_exponents(rows),
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
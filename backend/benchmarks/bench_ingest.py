@@ -0,0 +1,97 @@
+"""
+Ingest pipeline benchmark
+
+Imports synthetic stocks from the offline LocalProvider through
+stocks.pipeline.run_import_pipeline at several fetch concurrencies, with a
+simulated per-request latency standing in for the network. Reports stocks
+and rows per second for each setting; the data is deterministic, so runs on
+different machines ingest exactly the same bars.
+
+Runs offline against an in-memory SQLite database, like bench_indicators.py.
+
+Usage (from the backend directory):
+    python benchmarks/bench_ingest.py
+    python benchmarks/bench_ingest.py --stocks 200 --latency 0.25 --concurrency 1,8,32
+"""
+import argparse
+import json
+import platform
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from bench_indicators import setup_django
+
+
+def run_case(symbols, concurrency: int, latency: float, period: str, method: str):
+    """
+    Import the symbols from scratch with one concurrency setting
+    """
+    from stocks.models import Stock
+    from stocks.pipeline import run_import_pipeline
+    from stocks.providers import LocalProvider
+
+    Stock.objects.filter(symbol__in=symbols).delete()
+    stats = run_import_pipeline(
+        symbols,
+        fetcher=LocalProvider(latency=latency),
+        concurrency=concurrency,
+        rate=0,
+        period=period,
+        method=method,
+    )
+    if stats['failed']:
+        raise RuntimeError(f"Import failed for {', '.join(stats['failed'])}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stocks', type=int, default=50, help='Number of synthetic stocks to import')
+    parser.add_argument('--concurrency', type=str, default='1,4,16', help='Comma-separated fetch concurrencies')
+    parser.add_argument('--latency', type=float, default=0.1, help='Simulated seconds per fetch')
+    parser.add_argument('--period', type=str, default='1y', help='History period fetched per stock')
+    parser.add_argument('--method', type=str, default='bulk', help='Price load method')
+    parser.add_argument('--output', type=str, default='', help='Write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    setup_django()
+    symbols = [f'SYN{i:04d}' for i in range(args.stocks)]
+
+    rows = []
+    for concurrency in [int(value) for value in args.concurrency.split(',') if value.strip()]:
+        stats = run_case(symbols, concurrency, args.latency, args.period, args.method)
+        rows.append({
+            'concurrency': concurrency,
+            'stocks': len(symbols),
+            'rows': stats['rows'],
+            'seconds': stats['seconds'],
+            'stocks_per_second': stats['symbols_per_second'],
+            'rows_per_second': stats['rows_per_second'],
+        })
+        print(
+            f"concurrency {concurrency:>4d} {len(symbols):>6d} stocks {stats['rows']:>9d} rows "
+            f"{stats['seconds']:>8.2f} s {stats['symbols_per_second']:>8.1f} stocks/s "
+            f"{stats['rows_per_second']:>10.0f} rows/s",
+            file=sys.stderr
+        )
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'latency': args.latency,
+        'period': args.period,
+        'method': args.method,
+        'results': rows,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Indicator storage benchmark
+
+Compares the DecimalField indicator columns on stock_prices with the opt-in
+float-native stock_price_indicators table (STOCK_INDICATOR_STORAGE='float'):
+writing a full set of indicator columns, loading them back into NumPy for
+further computation, and serializing them through StockPriceSerializer.
+
+Runs offline against an in-memory SQLite database, like bench_indicators.py.
+
+Usage (from the backend directory):
+    python benchmarks/bench_storage.py
+    python benchmarks/bench_storage.py --sizes 1000,10000 --output storage.json
+"""
+import argparse
+import json
+import platform
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from bench_indicators import measure, seed_stock, setup_django, synthetic_prices
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+STORAGE_MODES = ('decimal', 'float')
+
+
+def storage_cases(size: int, mode: str, prices: np.ndarray, repeat: int):
+    """
+    Benchmark the write, load and serialize paths of one storage mode
+    """
+    from django.test import override_settings
+    from stocks.bulk import write_indicator_columns
+    from stocks.models import StockPrice
+    from stocks.serializers import StockPriceSerializer
+    from stocks.storage import indicator_arrays, with_indicators
+    from stocks.utils import compute_indicator_columns
+
+    stock, _ = seed_stock(f'{mode[0].upper()}{size}'[:10], prices)
+    price_ids = list(StockPrice.objects.filter(stock=stock).order_by('date').values_list('id', flat=True))
+    columns, _ = compute_indicator_columns(prices)
+
+    def queryset():
+        return with_indicators(StockPrice.objects.filter(stock=stock).select_related('stock')).order_by('date')
+
+    results = {}
+    with override_settings(STOCK_INDICATOR_STORAGE=mode):
+        results['write_indicator_columns'] = measure(
+            lambda: write_indicator_columns(price_ids, columns), repeat
+        )
+        results['indicator_arrays'] = measure(lambda: indicator_arrays(queryset()), repeat)
+        results['StockPriceSerializer(many=True)'] = measure(
+            lambda: StockPriceSerializer(queryset(), many=True).data, repeat
+        )
+
+    stock.delete()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=str, default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help='Comma-separated series lengths')
+    parser.add_argument('--repeat', type=int, default=3, help='Timing repeats per case (best is kept)')
+    parser.add_argument('--output', type=str, default='', help='Write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    setup_django()
+
+    rows = []
+    for size in sizes:
+        prices = synthetic_prices(size)
+        for mode in STORAGE_MODES:
+            for name, (seconds, peak) in storage_cases(size, mode, prices, args.repeat).items():
+                rows.append({
+                    'case': name,
+                    'storage': mode,
+                    'size': size,
+                    'seconds': seconds,
+                    'rows_per_second': size / seconds if seconds > 0 else None,
+                    'peak_memory_bytes': peak,
+                })
+                print(f'{name:34s} {mode:8s} {size:>9d} rows {seconds * 1000:>11.2f} ms {peak / 1e6:>9.2f} MB',
+                      file=sys.stderr)
+
+    # Time saved by float storage relative to decimal storage, per case and size
+    speedups = {}
+    for row in rows:
+        if row['storage'] == 'float':
+            decimal_row = next(
+                r for r in rows
+                if r['storage'] == 'decimal' and r['case'] == row['case'] and r['size'] == row['size']
+            )
+            speedups.setdefault(row['case'], {})[row['size']] = round(decimal_row['seconds'] / row['seconds'], 2)
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'sizes': sizes,
+        'results': rows,
+        'float_speedup': speedups,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,19 @@
+"""
+Celery application for stockanalysis
+
+Start a worker with:
+    celery -A stockanalysis worker -l info
+"""
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'stockanalysis.settings')
+
+app = Celery('stockanalysis')
+
+# Read the CELERY_* settings from settings.py
+app.config_from_object('django.conf:settings', namespace='CELERY')
+
+# Load tasks.py of every installed app
+app.autodiscover_tasks()
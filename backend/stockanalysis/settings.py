@@ -178,10 +178,57 @@ CELERY_ACCEPT_CONTENT = ['application/json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+# Run tasks in the calling process instead of a worker (tests, development without Redis)
+CELERY_TASK_ALWAYS_EAGER = os.environ.get('CELERY_TASK_ALWAYS_EAGER', '').lower() in ('1', 'true')
+# Periodic tasks, run by `celery -A stockanalysis beat`
+CELERY_BEAT_SCHEDULE = {
+    'create-price-partitions': {
+        'task': 'stocks.tasks.create_price_partitions_task',
+        'schedule': 24 * 60 * 60,  # seconds
+    },
+    # Refreshes stocks whose fundamentals are older than STOCK_FUNDAMENTALS_MAX_AGE_HOURS
+    'refresh-fundamentals': {
+        'task': 'stocks.tasks.refresh_fundamentals_task',
+        'schedule': 60 * 60,  # seconds
+    },
+}
+
+# Uploaded import files wait here for a Celery worker; must be shared with the workers
+STOCK_IMPORT_UPLOAD_DIR = os.environ.get('STOCK_IMPORT_UPLOAD_DIR', os.path.join(BASE_DIR, 'uploads', 'imports'))
+# Legacy .xls files cannot be streamed and are read whole, so larger ones are rejected
+STOCK_IMPORT_MAX_XLS_BYTES = 10 * 1024 * 1024  # 10MB
 
 # Stock data API configuration
 STOCK_DATA_API_KEY = os.environ.get('STOCK_DATA_API_KEY', '')
 
+# Market data provider: 'yfinance', or 'local' to replay recorded responses from
+# STOCK_DATA_FIXTURE_DIR (or generate synthetic prices when it is empty) offline
+STOCK_DATA_PROVIDER = os.environ.get('STOCK_DATA_PROVIDER', 'yfinance')
+STOCK_DATA_FIXTURE_DIR = os.environ.get('STOCK_DATA_FIXTURE_DIR', '')
+
+# Raw market data response cache (empty directory disables it)
+STOCK_DATA_CACHE_DIR = os.environ.get('STOCK_DATA_CACHE_DIR', os.path.join(BASE_DIR, 'cache', 'market_data'))
+STOCK_DATA_CACHE_TTL = 24 * 60 * 60  # seconds
+# Responses ending with today's bar, which may be intraday, are refetched sooner
+STOCK_DATA_CACHE_LIVE_TTL = 15 * 60  # seconds
+STOCK_DATA_CACHE_MAX_BYTES = 1024 * 1024 * 1024  # 1GB
+
+# Stock names, sectors and ratios older than this are refetched by the refresh-fundamentals
+# beat task and `manage.py refresh_fundamentals`
+STOCK_FUNDAMENTALS_MAX_AGE_HOURS = 24
+
+# Technical indicator storage: 'decimal' uses the DecimalField columns on
+# stock_prices, 'float' uses the double precision stock_price_indicators table.
+# After switching, run `manage.py recompute_indicators` to populate the new storage.
+STOCK_INDICATOR_STORAGE = os.environ.get('STOCK_INDICATOR_STORAGE', 'decimal')
+
+# On PostgreSQL stock_prices is partitioned by year; partitions are kept this many
+# years ahead of the current one by `manage.py manage_price_partitions` and Celery beat
+STOCK_PRICE_PARTITIONS_AHEAD = 2
+
+# Number of on-demand technical indicator results kept in memory per process
+TECHNICAL_INDICATOR_CACHE_SIZE = 256
+
 # File upload configuration
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Stock, StockPrice, UserFavoriteStock, StockDataImportLog
+from .models import Stock, StockPrice, StockIndicatorState, UserFavoriteStock, StockDataImportLog, StockImportItem
 
 
 @admin.register(Stock)
@@ -59,6 +59,16 @@ class StockPriceAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(StockIndicatorState)
+class StockIndicatorStateAdmin(admin.ModelAdmin):
+    """
+    Stock Indicator State Admin Configuration
+    """
+    list_display = ('stock', 'last_date', 'last_close', 'ema_12', 'ema_26', 'macd_signal', 'updated_at')
+    search_fields = ('stock__symbol', 'stock__name')
+    readonly_fields = ('updated_at',)
+
+
 @admin.register(UserFavoriteStock)
 class UserFavoriteStockAdmin(admin.ModelAdmin):
     """
@@ -78,6 +88,17 @@ class UserFavoriteStockAdmin(admin.ModelAdmin):
     )
 
 
+class StockImportItemInline(admin.TabularInline):
+    """
+    Per-Symbol Import Job State Inline
+    """
+    model = StockImportItem
+    fields = ('symbol', 'status', 'attempts', 'rows', 'leased_by', 'lease_expires_at', 'error_message', 'updated_at')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+
 @admin.register(StockDataImportLog)
 class StockDataImportLogAdmin(admin.ModelAdmin):
     """
@@ -86,18 +107,19 @@ class StockDataImportLogAdmin(admin.ModelAdmin):
     list_display = ('import_type', 'status', 'total_records', 'success_records', 'failed_records', 'created_at')
     list_filter = ('import_type', 'status', 'created_at')
     search_fields = ('file_path', 'error_message')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('created_at', 'updated_at', 'started_at', 'finished_at')
+    inlines = [StockImportItemInline]
     fieldsets = (
         ('Import Information', {
             'fields': ('import_type', 'status', 'file_path')
         }),
         ('Statistics', {
-            'fields': ('total_records', 'success_records', 'failed_records')
+            'fields': ('total_records', 'success_records', 'failed_records', 'rows_imported')
         }),
         ('Error Information', {
             'fields': ('error_message',)
         }),
         ('Metadata', {
-            'fields': ('created_by', 'created_at', 'updated_at')
+            'fields': ('created_by', 'created_at', 'updated_at', 'started_at', 'finished_at')
         }),
     )
\ No newline at end of file
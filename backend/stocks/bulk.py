@@ -0,0 +1,383 @@
+import logging
+import time
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Stock, StockPrice, StockPriceIndicators
+from . import indicators
+from .storage import DECIMAL_PLACES, INDICATOR_FIELDS, float_storage_enabled
+
+logger = logging.getLogger('stockanalysis')
+
+WRITE_STRATEGIES = ('auto', 'bulk_update', 'executemany', 'temp_table')
+
+# OHLCV columns written by the price loaders
+PRICE_FIELDS = ['open_price', 'high_price', 'low_price', 'close_price', 'volume']
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def _resolve_strategy(strategy: str) -> str:
+    """
+    Pick a concrete write strategy for the current database
+    """
+    if strategy not in WRITE_STRATEGIES:
+        raise ValueError(f"Unknown write strategy: {strategy}")
+    if strategy == 'auto':
+        return 'temp_table' if connection.vendor == 'postgresql' else 'executemany'
+    if strategy == 'temp_table' and connection.vendor != 'postgresql':
+        raise ValueError("The temp_table strategy requires PostgreSQL")
+    return strategy
+
+
+def _write_bulk_update(price_ids: List[int], fields: List[str], values: Dict[str, list], chunk_size: int) -> None:
+    """
+    Write indicator values with QuerySet.bulk_update, one CASE statement per chunk
+
+    Decimal columns are given the float's 15 significant digits, as the other
+    strategies' double precision -> numeric casts do; DecimalField would
+    otherwise round it to max_digits first, and values next to a tie could
+    then be stored differently.
+    """
+    for start in range(0, len(price_ids), chunk_size):
+        objs = []
+        for i in range(start, min(start + chunk_size, len(price_ids))):
+            obj = StockPrice(id=price_ids[i])
+            for field in fields:
+                value = values[field][i]
+                if value is not None and field in DECIMAL_PLACES:
+                    value = Decimal(f'{value:.15g}')
+                setattr(obj, field, value)
+            objs.append(obj)
+        StockPrice.objects.bulk_update(objs, fields)
+
+
+def _write_executemany(price_ids: List[int], fields: List[str], values: Dict[str, list], chunk_size: int) -> None:
+    """
+    Write indicator values with one parameterized UPDATE executed for many rows
+
+    Unlike bulk_update, whose CASE expression grows with the chunk, the cost
+    per row is constant. Values are cast to double precision first, so they
+    are rounded into the numeric columns like the temp_table strategy does.
+    """
+    table = connection.ops.quote_name(StockPrice._meta.db_table)
+    assignments = ', '.join(
+        f"{connection.ops.quote_name(field)} = CAST(%s AS double precision)" for field in fields
+    )
+    sql = f"UPDATE {table} SET {assignments} WHERE id = %s"
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(price_ids), chunk_size):
+            end = min(start + chunk_size, len(price_ids))
+            cursor.executemany(sql, [
+                tuple(values[field][i] for field in fields) + (price_ids[i],)
+                for i in range(start, end)
+            ])
+
+
+def _write_float_table(price_ids: List[int], fields: List[str], values: Dict[str, list], chunk_size: int) -> None:
+    """
+    Upsert indicator values into the float-typed StockPriceIndicators table
+
+    Uses INSERT ... ON CONFLICT, which SQLite and PostgreSQL both support.
+    """
+    quote = connection.ops.quote_name
+    table = quote(StockPriceIndicators._meta.db_table)
+    key = quote(StockPriceIndicators._meta.pk.column)
+    columns = ', '.join(quote(field) for field in fields)
+    placeholders = ', '.join(['%s'] * (len(fields) + 1))
+    assignments = ', '.join(f"{quote(field)} = excluded.{quote(field)}" for field in fields)
+    sql = (
+        f"INSERT INTO {table} ({key}, {columns}) VALUES ({placeholders}) "
+        f"ON CONFLICT ({key}) DO UPDATE SET {assignments}"
+    )
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(price_ids), chunk_size):
+            end = min(start + chunk_size, len(price_ids))
+            cursor.executemany(sql, [
+                (price_ids[i],) + tuple(values[field][i] for field in fields)
+                for i in range(start, end)
+            ])
+
+
+def _write_temp_table(price_ids: List[int], fields: List[str], values: Dict[str, list], chunk_size: int) -> None:
+    """
+    Load indicator values into a temporary table and apply them with one UPDATE ... FROM
+    """
+    from psycopg2.extras import execute_values
+
+    table = StockPrice._meta.db_table
+    columns = ', '.join(fields)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE TEMP TABLE tmp_indicator_values (id bigint PRIMARY KEY, "
+            + ', '.join(f"{field} double precision" for field in fields)
+            + ") ON COMMIT DROP"
+        )
+
+        raw_cursor = cursor.cursor
+        for start in range(0, len(price_ids), chunk_size):
+            end = min(start + chunk_size, len(price_ids))
+            rows = [
+                (price_ids[i],) + tuple(values[field][i] for field in fields)
+                for i in range(start, end)
+            ]
+            execute_values(
+                raw_cursor,
+                f"INSERT INTO tmp_indicator_values (id, {columns}) VALUES %s",
+                rows,
+                page_size=chunk_size
+            )
+
+        assignments = ', '.join(f"{field} = t.{field}" for field in fields)
+        cursor.execute(
+            f"UPDATE {table} AS p SET {assignments} FROM tmp_indicator_values AS t WHERE p.id = t.id"
+        )
+        # Drop explicitly as well, in case we are nested inside a longer transaction
+        cursor.execute("DROP TABLE tmp_indicator_values")
+
+
+def write_indicator_columns(price_ids: Sequence[int], columns: Dict[str, np.ndarray],
+                            strategy: str = 'auto', chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    Write indicator columns for many price rows inside a single transaction
+
+    Args:
+        price_ids: StockPrice ids, aligned with the column arrays
+        columns: Indicator arrays keyed by StockPrice field name (NaN is stored as NULL)
+        strategy: 'bulk_update', 'executemany', 'temp_table' (PostgreSQL only) or 'auto';
+            ignored when float indicator storage is enabled, which always upserts
+            into StockPriceIndicators
+        chunk_size: Number of rows sent per statement
+
+    Returns:
+        Dictionary with the strategy used, row count, elapsed seconds and rows per second
+    """
+    price_ids = list(price_ids)
+    fields = list(columns.keys())
+    if float_storage_enabled() and set(fields) <= set(INDICATOR_FIELDS):
+        strategy = 'float_table'
+    else:
+        strategy = _resolve_strategy(strategy)
+    started = time.perf_counter()
+
+    if price_ids:
+        # Plain floats are accepted by DecimalField too, which avoids a Decimal(str(x)) per value
+        values = {field: indicators.to_optional_list(columns[field]) for field in fields}
+
+        with transaction.atomic():
+            if strategy == 'float_table':
+                _write_float_table(price_ids, fields, values, chunk_size)
+            elif strategy == 'temp_table':
+                _write_temp_table(price_ids, fields, values, chunk_size)
+            elif strategy == 'executemany':
+                _write_executemany(price_ids, fields, values, chunk_size)
+            else:
+                _write_bulk_update(price_ids, fields, values, chunk_size)
+
+    elapsed = time.perf_counter() - started
+    stats = {
+        'strategy': strategy,
+        'rows': len(price_ids),
+        'seconds': elapsed,
+        'rows_per_second': len(price_ids) / elapsed if elapsed > 0 else 0.0,
+    }
+    logger.debug(
+        "Wrote %d indicator rows with %s in %.3fs (%.0f rows/s)",
+        stats['rows'], strategy, elapsed, stats['rows_per_second']
+    )
+    return stats
+
+
+def upsert_stock_prices(stock_id: int, price_data: List[Dict[str, Any]],
+                        chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    Insert or update OHLCV bars of one stock with one bulk upsert per chunk
+
+    The stock's updated_at is bumped along with its bars, which is how
+    cached custom indicators find out its prices changed.
+
+    Args:
+        stock_id: Stock primary key
+        price_data: Dictionaries with 'date' and the PRICE_FIELDS values; of
+            bars with the same date, the last one is stored
+        chunk_size: Number of rows per INSERT ... ON CONFLICT statement
+
+    Returns:
+        Dictionary with rows read, rows merged (without duplicated dates),
+        elapsed seconds and rows per second
+    """
+    started = time.perf_counter()
+    # ON CONFLICT cannot touch a row twice, so keep the last copy of duplicated bars
+    records = list({record['date']: record for record in price_data}.values())
+
+    with transaction.atomic():
+        for start in range(0, len(records), chunk_size):
+            StockPrice.objects.bulk_create(
+                [
+                    StockPrice(stock_id=stock_id, **record)
+                    for record in records[start:start + chunk_size]
+                ],
+                update_conflicts=True,
+                unique_fields=['stock', 'date'],
+                update_fields=PRICE_FIELDS,
+            )
+        if records:
+            Stock.objects.filter(id=stock_id).update(updated_at=timezone.now())
+
+    elapsed = time.perf_counter() - started
+    stats = {
+        'rows': len(price_data),
+        'merged': len(records),
+        'seconds': elapsed,
+        'rows_per_second': len(price_data) / elapsed if elapsed > 0 else 0.0,
+    }
+    logger.debug(
+        "Upserted %d price rows for stock %s in %.3fs (%.0f rows/s)",
+        stats['rows'], stock_id, elapsed, stats['rows_per_second']
+    )
+    return stats
+
+
+def upsert_stocks(records: List[Dict[str, Any]], fields: List[str],
+                  chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """
+    Insert or update stocks by symbol with one bulk upsert per chunk
+
+    Args:
+        records: Dictionaries with 'symbol' and the fields values; symbols must be unique
+        fields: Stock columns to set on existing stocks
+        chunk_size: Number of rows per INSERT ... ON CONFLICT statement
+
+    Returns:
+        Number of stocks written
+    """
+    # updated_at is auto_now, which the conflict update only sets when listed
+    Stock.objects.bulk_create(
+        [Stock(**record) for record in records],
+        update_conflicts=True,
+        unique_fields=['symbol'],
+        update_fields=list(fields) + ['updated_at'],
+        batch_size=chunk_size,
+    )
+    return len(records)
+
+
+class _CopyStream:
+    """
+    File-like object that feeds lines from an iterator to COPY ... FROM STDIN
+
+    Rows are formatted as they are read, so a load never holds its full CSV
+    text in memory.
+    """
+
+    def __init__(self, lines: Iterator[str]):
+        self._lines = lines
+        self._buffer = ''
+        self.lines = 0
+
+    def read(self, size: int = -1) -> str:
+        chunks = [self._buffer]
+        length = len(self._buffer)
+        while size < 0 or length < size:
+            try:
+                line = next(self._lines)
+            except StopIteration:
+                break
+            chunks.append(line)
+            length += len(line)
+            self.lines += 1
+
+        data = ''.join(chunks)
+        if size < 0:
+            self._buffer = ''
+            return data
+        self._buffer = data[size:]
+        return data[:size]
+
+
+def _copy_lines(rows: Iterable[Sequence[Any]]) -> Iterator[str]:
+    """
+    Format price rows as COPY csv lines (None becomes NULL)
+    """
+    for row in rows:
+        yield ','.join('' if value is None else str(value) for value in row) + '\n'
+
+
+def copy_stock_prices(rows: Iterable[Sequence[Any]], fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Load OHLCV bars with PostgreSQL COPY into a staging table and merge them into stock_prices
+
+    As with upsert_stock_prices, the updated_at of every loaded stock is bumped.
+
+    Args:
+        rows: (stock_id, date, *fields) tuples; streamed, so a generator keeps
+            memory flat for large backfills
+        fields: StockPrice columns of the rows after the date, defaults to
+            PRICE_FIELDS; indicator columns can be loaded along with the bars
+
+    Returns:
+        Dictionary with rows read, rows merged, elapsed seconds and rows per second
+
+    Raises:
+        ValueError: If the database is not PostgreSQL
+    """
+    if connection.vendor != 'postgresql':
+        raise ValueError("The COPY loader requires PostgreSQL")
+
+    fields = list(fields or PRICE_FIELDS)
+    table = StockPrice._meta.db_table
+    columns = ', '.join(fields)
+    # Indicators are staged as double precision, like write_indicator_columns does,
+    # so numeric indicator columns are rounded by the same float8 cast
+    definitions = ', '.join(
+        f"{field} {StockPrice._meta.get_field(field).db_type(connection) if field in PRICE_FIELDS else 'double precision'}"
+        for field in fields
+    )
+    assignments = ', '.join(f"{field} = excluded.{field}" for field in fields)
+    stream = _CopyStream(_copy_lines(rows))
+    started = time.perf_counter()
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE TEMP TABLE tmp_stock_prices ("
+            f"seq bigserial, stock_id bigint NOT NULL, date date NOT NULL, {definitions}"
+            ") ON COMMIT DROP"
+        )
+        cursor.cursor.copy_expert(
+            f"COPY tmp_stock_prices (stock_id, date, {columns}) FROM STDIN WITH (FORMAT csv)",
+            stream
+        )
+        # ON CONFLICT cannot touch a row twice, so keep the last copy of duplicated bars
+        cursor.execute(
+            f"INSERT INTO {table} (stock_id, date, {columns}, created_at) "
+            f"SELECT DISTINCT ON (stock_id, date) stock_id, date, {columns}, now() "
+            f"FROM tmp_stock_prices ORDER BY stock_id, date, seq DESC "
+            f"ON CONFLICT (stock_id, date) DO UPDATE SET {assignments}"
+        )
+        merged = cursor.rowcount
+        # clock_timestamp, as now() would repeat the time of an enclosing transaction's start
+        cursor.execute(
+            f"UPDATE {Stock._meta.db_table} SET updated_at = clock_timestamp() "
+            f"WHERE id IN (SELECT DISTINCT stock_id FROM tmp_stock_prices)"
+        )
+        cursor.execute("DROP TABLE tmp_stock_prices")
+
+    elapsed = time.perf_counter() - started
+    stats = {
+        'rows': stream.lines,
+        'merged': merged,
+        'seconds': elapsed,
+        'rows_per_second': stream.lines / elapsed if elapsed > 0 else 0.0,
+    }
+    logger.debug(
+        "Copied %d price rows (%d merged) in %.3fs (%.0f rows/s)",
+        stats['rows'], merged, elapsed, stats['rows_per_second']
+    )
+    return stats
@@ -0,0 +1,131 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Stock
+from .pipeline import TokenBucket, fetch_with_retries
+from .providers import FUNDAMENTAL_FIELDS, MarketDataProvider, get_provider
+
+logger = logging.getLogger('stockanalysis')
+
+
+def _fit(stock: Stock, field: str, value: Any) -> Any:
+    """
+    Make a fetched value fit its column, so one bad value cannot fail a whole batch
+
+    Text is truncated to the column length, and a missing value of a NOT NULL
+    column keeps the stored value, or becomes the field default if there is none.
+    """
+    model_field = Stock._meta.get_field(field)
+    if value is None and not model_field.null:
+        current = getattr(stock, field)
+        return current if current is not None else model_field.get_default()
+    if model_field.max_length and isinstance(value, str):
+        return value[:model_field.max_length]
+    return value
+
+
+def default_max_age() -> timedelta:
+    """
+    How old fundamentals may get before a refresh fetches them again
+    """
+    return timedelta(hours=getattr(settings, 'STOCK_FUNDAMENTALS_MAX_AGE_HOURS', 24))
+
+
+def stale_stocks(symbols: Optional[List[str]] = None, max_age: Optional[timedelta] = None):
+    """
+    Stocks whose fundamentals were never fetched or are older than max_age
+
+    Args:
+        symbols: Limit to these symbols, or None for every stock
+        max_age: Staleness threshold, defaults to settings.STOCK_FUNDAMENTALS_MAX_AGE_HOURS
+
+    Returns:
+        Stock queryset, least recently refreshed first
+    """
+    cutoff = timezone.now() - (max_age if max_age is not None else default_max_age())
+    stocks = Stock.objects.filter(Q(fundamentals_updated_at__isnull=True) | Q(fundamentals_updated_at__lt=cutoff))
+    if symbols is not None:
+        stocks = stocks.filter(symbol__in=symbols)
+    return stocks.order_by('fundamentals_updated_at', 'symbol')
+
+
+def refresh_fundamentals(symbols: Optional[List[str]] = None, max_age: Optional[timedelta] = None,
+                         provider: Optional[MarketDataProvider] = None, concurrency: int = 4,
+                         rate: float = 2.0, retries: int = 3, batch_size: int = 100) -> Dict[str, Any]:
+    """
+    Fetch fundamentals for stale stocks and save them with batched bulk_update
+
+    Runs separately from, and much less often than, the price import, which
+    never waits on the slow, rate-limited information endpoint.
+
+    Args:
+        symbols: Limit to these symbols, or None for every stock
+        max_age: Only refresh stocks whose fundamentals are older than this
+            (timedelta(0) refreshes every selected stock)
+        provider: Market data provider, defaults to get_provider()
+        concurrency: Number of concurrent fetches
+        rate: Fetch requests per second across all threads (0 for no limit)
+        retries: Extra attempts for transient fetch failures
+        batch_size: Stocks fetched and written per bulk_update
+
+    Returns:
+        Statistics with the number of stale stocks, refreshed count, symbols that failed
+        to fetch or save and elapsed seconds
+    """
+    provider = provider or get_provider()
+    stocks = list(stale_stocks(symbols, max_age))
+    limiter = TokenBucket(rate)
+    started = time.perf_counter()
+    stats = {'stale': len(stocks), 'refreshed': 0, 'failed': []}
+
+    def fetch(stock):
+        return stock, fetch_with_retries(provider.fetch_fundamentals, stock.symbol, limiter, retries=retries)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='fundamentals') as executor:
+        for start in range(0, len(stocks), batch_size):
+            updated = []
+            for stock, result in executor.map(fetch, stocks[start:start + batch_size]):
+                if not result['success']:
+                    logger.warning("Fetching fundamentals of %s failed: %s", stock.symbol, result['error'])
+                    stats['failed'].append(stock.symbol)
+                    continue
+                for field in FUNDAMENTAL_FIELDS:
+                    if field in result['stock_data']:
+                        setattr(stock, field, _fit(stock, field, result['stock_data'][field]))
+                updated.append(stock)
+
+            # updated_at is auto_now, which bulk_update does not set by itself
+            now = timezone.now()
+            for stock in updated:
+                stock.fundamentals_updated_at = now
+                stock.updated_at = now
+            fields = FUNDAMENTAL_FIELDS + ['fundamentals_updated_at', 'updated_at']
+            try:
+                with transaction.atomic():
+                    Stock.objects.bulk_update(updated, fields)
+            except DatabaseError as e:
+                # Save the batch row by row, so one rejected stock does not lose the others
+                logger.warning("Saving a batch of %d fundamentals failed, saving them one by one: %s",
+                               len(updated), e)
+                saved = []
+                for stock in updated:
+                    try:
+                        with transaction.atomic():
+                            stock.save(update_fields=fields)
+                        saved.append(stock)
+                    except DatabaseError as e:
+                        logger.error("Saving fundamentals of %s failed: %s", stock.symbol, e)
+                        stats['failed'].append(stock.symbol)
+                updated = saved
+            stats['refreshed'] += len(updated)
+
+    stats['seconds'] = time.perf_counter() - started
+    return stats
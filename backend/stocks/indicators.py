@@ -0,0 +1,660 @@
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+
+def as_float_array(values) -> np.ndarray:
+    """
+    Convert a price sequence to a float64 array
+
+    Args:
+        values: List, tuple or array of prices (None is treated as missing)
+
+    Returns:
+        float64 array with NaN in place of missing values
+    """
+    if isinstance(values, (list, tuple)):
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    return np.asarray(values, dtype=np.float64)
+
+
+def to_optional_list(values: np.ndarray) -> List[Optional[float]]:
+    """
+    Convert a 1-D float array to a list with None in place of NaN
+
+    Args:
+        values: 1-D float array
+
+    Returns:
+        List of floats and None
+    """
+    return [None if v != v else v for v in values.tolist()]
+
+
+def seed_mean(values) -> np.ndarray:
+    """
+    Mean along axis 0, summed strictly in order
+
+    ndarray.mean sums a 1-D array pairwise but the columns of a 2-D array
+    sequentially, so the same prices would seed slightly different values in
+    the per-symbol and panel paths. A cumulative sum is sequential in both.
+    """
+    values = as_float_array(values)
+    return np.cumsum(values, axis=0)[-1] / values.shape[0]
+
+
+def _smooth(values: np.ndarray, alpha: float, seed_row: int, seed: np.ndarray) -> np.ndarray:
+    """
+    Apply the recursion out[i] = values[i] * alpha + out[i-1] * (1 - alpha)
+
+    Args:
+        values: Input array of shape (n,) or (n, k)
+        alpha: Smoothing factor
+        seed_row: Row at which the recursion is seeded
+        seed: Seed value(s) for row seed_row
+
+    Returns:
+        Smoothed array, NaN before seed_row
+    """
+    out = np.full(values.shape, np.nan)
+    n = values.shape[0]
+    if seed_row >= n:
+        return out
+
+    out[seed_row] = seed
+    decay = 1 - alpha
+
+    if values.ndim == 1:
+        # Python floats are considerably faster than numpy scalars in a tight loop
+        prev = float(seed)
+        data = values.tolist()
+        result = [prev]
+        for i in range(seed_row + 1, n):
+            prev = data[i] * alpha + prev * decay
+            result.append(prev)
+        out[seed_row:] = result
+    else:
+        for i in range(seed_row + 1, n):
+            out[i] = values[i] * alpha + out[i - 1] * decay
+
+    return out
+
+
+def _rolling_sum(csum: np.ndarray, period: int) -> np.ndarray:
+    """
+    Window sums from a cumulative sum along axis 0
+
+    Args:
+        csum: Cumulative sum of shape (n,) or (n, k)
+        period: Window length
+
+    Returns:
+        Window sums, NaN for the first period - 1 rows
+    """
+    out = np.full(csum.shape, np.nan)
+    if period <= 0 or csum.shape[0] < period:
+        return out
+
+    out[period - 1] = csum[period - 1]
+    out[period:] = csum[period:] - csum[:-period]
+    return out
+
+
+def _rolling_reduce(values: np.ndarray, period: int, func) -> np.ndarray:
+    """
+    Apply func over sliding windows along axis 0
+
+    Args:
+        values: Array of shape (n,) or (n, k)
+        period: Window length
+        func: Reduction such as np.max, called with axis=-1
+
+    Returns:
+        Reduced values, NaN for the first period - 1 rows
+    """
+    out = np.full(values.shape, np.nan)
+    if period <= 0 or values.shape[0] < period:
+        return out
+
+    windows = np.lib.stride_tricks.sliding_window_view(values, period, axis=0)
+    out[period - 1:] = func(windows, axis=-1)
+    return out
+
+
+def ma(prices, period: int) -> np.ndarray:
+    """
+    Simple Moving Average using a cumulative sum, O(n) for any period
+
+    Args:
+        prices: Prices of shape (n,) or (n, k); indicators run along axis 0
+        period: Period
+
+    Returns:
+        Moving averages, NaN for the first period - 1 rows
+    """
+    values = as_float_array(prices)
+    return _rolling_sum(np.cumsum(values, axis=0), period) / period
+
+
+def ema(prices, period: int, offset: int = 0) -> np.ndarray:
+    """
+    Exponential Moving Average seeded with the SMA of the first period values
+
+    Args:
+        prices: Prices of shape (n,) or (n, k)
+        period: Period
+        offset: Row of the first valid input (earlier rows are ignored)
+
+    Returns:
+        Exponential moving averages, NaN before row offset + period - 1
+    """
+    values = as_float_array(prices)
+    seed_row = offset + period - 1
+    if period <= 0 or values.shape[0] <= seed_row:
+        return np.full(values.shape, np.nan)
+
+    seed = seed_mean(values[offset:seed_row + 1])
+    return _smooth(values, 2 / (period + 1), seed_row, seed)
+
+
+def macd(prices, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9) -> Dict[str, np.ndarray]:
+    """
+    MACD line, signal line and histogram
+
+    Args:
+        prices: Prices of shape (n,) or (n, k)
+        fast_period: Fast line period
+        slow_period: Slow line period
+        signal_period: Signal line period
+
+    Returns:
+        Dictionary containing 'macd', 'signal' and 'histogram' arrays
+    """
+    values = as_float_array(prices)
+    macd_line = ema(values, fast_period) - ema(values, slow_period)
+
+    # Signal line is an EMA over the MACD values, starting where both EMAs exist
+    start = max(fast_period, slow_period) - 1
+    signal = ema(macd_line, signal_period, offset=start)
+
+    return {
+        'macd': macd_line,
+        'signal': signal,
+        'histogram': macd_line - signal,
+    }
+
+
+def wilder_averages(prices, period: int = 14):
+    """
+    Wilder-smoothed average gain and loss
+
+    Args:
+        prices: Prices of shape (n,) or (n, k)
+        period: Period
+
+    Returns:
+        Tuple (avg_gain, avg_loss) aligned with prices, NaN for the first period rows
+    """
+    values = as_float_array(prices)
+    return _wilder_smooth(*_gains_and_losses(_changes(values)), period)
+
+
+def _changes(values: np.ndarray) -> np.ndarray:
+    """
+    Price changes aligned with prices: row i is the change into price i, row 0 is zero
+    """
+    return np.diff(values, axis=0, prepend=values[:1])
+
+
+def _gains_and_losses(changes: np.ndarray):
+    """
+    Split aligned price changes into gains and losses
+    """
+    return np.maximum(changes, 0), np.maximum(-changes, 0)
+
+
+def _wilder_smooth(gains: np.ndarray, losses: np.ndarray, period: int):
+    """
+    Wilder-smooth padded gains and losses, seeded with the mean of the first period changes
+    """
+    if period <= 0 or gains.shape[0] < period + 1:
+        empty = np.full(gains.shape, np.nan)
+        return empty, empty.copy()
+
+    alpha = 1 / period
+    avg_gain = _smooth(gains, alpha, period, seed_mean(gains[1:period + 1]))
+    avg_loss = _smooth(losses, alpha, period, seed_mean(losses[1:period + 1]))
+    return avg_gain, avg_loss
+
+
+def rsi_from_averages(avg_gain: np.ndarray, avg_loss: np.ndarray) -> np.ndarray:
+    """
+    Convert Wilder averages to RSI values
+
+    Args:
+        avg_gain: Average gains
+        avg_loss: Average losses
+
+    Returns:
+        RSI values, 100 where there were no losses
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi_values = 100 - 100 / (1 + avg_gain / avg_loss)
+    return np.where(avg_loss == 0, 100.0, rsi_values)
+
+
+def rsi(prices, period: int = 14) -> np.ndarray:
+    """
+    Relative Strength Index with Wilder smoothing
+
+    Args:
+        prices: Prices of shape (n,) or (n, k)
+        period: Period
+
+    Returns:
+        RSI values aligned with prices, NaN for the first period rows
+    """
+    return rsi_from_averages(*wilder_averages(prices, period))
+
+
+def compute_indicator_set(close, high=None, low=None, volume=None,
+                          ma_periods: Tuple[int, ...] = (), ema_periods: Tuple[int, ...] = (),
+                          macd_params: Optional[Tuple[int, int, int]] = None,
+                          rsi_periods: Tuple[int, ...] = (),
+                          bollinger: Optional[Tuple[int, float]] = None,
+                          atr_period: Optional[int] = None,
+                          stochastic: Optional[Tuple[int, int]] = None,
+                          obv: bool = False,
+                          vwap_period: Optional[int] = None,
+                          include_state: bool = False) -> Dict[str, np.ndarray]:
+    """
+    Calculate many indicators from OHLCV arrays in one pass
+
+    Intermediates are computed once and shared: the close cumulative sum
+    feeds every MA and the Bollinger middle band, EMAs requested directly
+    are reused by MACD, price changes feed both RSI and OBV, and the
+    typical price feeds VWAP.
+
+    Args:
+        close: Close prices of shape (n,) or (n, k)
+        high: High prices (required for ATR, Stochastic and VWAP)
+        low: Low prices (required for ATR, Stochastic and VWAP)
+        volume: Volumes (required for OBV and VWAP)
+        ma_periods: Moving average periods, returned as 'ma_<period>'
+        ema_periods: EMA periods, returned as 'ema_<period>'
+        macd_params: (fast, slow, signal), returned as 'macd', 'macd_signal' and 'macd_histogram'
+        rsi_periods: RSI periods, returned as 'rsi_<period>'
+        bollinger: (period, width), returned as 'bb_upper', 'bb_middle' and 'bb_lower'
+        atr_period: Average True Range period, returned as 'atr'
+        stochastic: (%K period, %D period), returned as 'stoch_k' and 'stoch_d'
+        obv: Whether to return On-Balance Volume as 'obv'
+        vwap_period: Rolling VWAP window, returned as 'vwap'
+        include_state: Also return Wilder averages as 'rsi_<period>_avg_gain' and 'rsi_<period>_avg_loss'
+
+    Returns:
+        Dictionary of indicator arrays aligned with close
+    """
+    close = as_float_array(close)
+    needs_range = atr_period or stochastic or vwap_period
+    if needs_range and (high is None or low is None):
+        raise ValueError("ATR, Stochastic and VWAP require high and low prices")
+    if (obv or vwap_period) and volume is None:
+        raise ValueError("OBV and VWAP require volume")
+
+    high = as_float_array(high) if high is not None else None
+    low = as_float_array(low) if low is not None else None
+    volume = as_float_array(volume) if volume is not None else None
+    result = {}
+
+    # Moving averages and Bollinger bands share one cumulative sum
+    if ma_periods or bollinger:
+        close_sum = np.cumsum(close, axis=0)
+        for period in ma_periods:
+            result[f'ma_{period}'] = _rolling_sum(close_sum, period) / period
+
+    if bollinger:
+        period, width = bollinger
+        middle = result.get(f'ma_{period}')
+        if middle is None:
+            middle = _rolling_sum(close_sum, period) / period
+        # Per-window two-pass std: E[x^2] - E[x]^2 from cumulative sums cancels badly
+        # on long or low-volatility series
+        std = _rolling_reduce(close, period, np.std)
+        result['bb_middle'] = middle
+        result['bb_upper'] = middle + width * std
+        result['bb_lower'] = middle - width * std
+
+    # MACD reuses EMAs that were requested directly
+    emas = {period: ema(close, period) for period in ema_periods}
+    for period, values in emas.items():
+        result[f'ema_{period}'] = values
+
+    if macd_params:
+        fast_period, slow_period, signal_period = macd_params
+        fast = emas[fast_period] if fast_period in emas else ema(close, fast_period)
+        slow = emas[slow_period] if slow_period in emas else ema(close, slow_period)
+        line = fast - slow
+        signal = ema(line, signal_period, offset=max(fast_period, slow_period) - 1)
+        result['macd'] = line
+        result['macd_signal'] = signal
+        result['macd_histogram'] = line - signal
+
+    # RSI and OBV share the close-to-close changes
+    if rsi_periods or obv:
+        changes = _changes(close)
+
+    if rsi_periods:
+        gains, losses = _gains_and_losses(changes)
+        for period in rsi_periods:
+            avg_gain, avg_loss = _wilder_smooth(gains, losses, period)
+            result[f'rsi_{period}'] = rsi_from_averages(avg_gain, avg_loss)
+            if include_state:
+                result[f'rsi_{period}_avg_gain'] = avg_gain
+                result[f'rsi_{period}_avg_loss'] = avg_loss
+
+    if obv:
+        result['obv'] = np.cumsum(np.sign(changes) * volume, axis=0)
+
+    if atr_period:
+        true_range = high - low
+        prev_close = close[:-1]
+        true_range[1:] = np.maximum(
+            true_range[1:],
+            np.maximum(np.abs(high[1:] - prev_close), np.abs(low[1:] - prev_close))
+        )
+        if close.shape[0] < atr_period:
+            result['atr'] = np.full(close.shape, np.nan)
+        else:
+            seed = seed_mean(true_range[:atr_period])
+            result['atr'] = _smooth(true_range, 1 / atr_period, atr_period - 1, seed)
+
+    if stochastic:
+        k_period, d_period = stochastic
+        highest = _rolling_reduce(high, k_period, np.max)
+        lowest = _rolling_reduce(low, k_period, np.min)
+        price_range = highest - lowest
+        with np.errstate(divide='ignore', invalid='ignore'):
+            stoch_k = np.where(price_range > 0, 100 * (close - lowest) / price_range, np.nan)
+        result['stoch_k'] = stoch_k
+        result['stoch_d'] = _rolling_reduce(stoch_k, d_period, np.mean)
+
+    if vwap_period:
+        typical = (high + low + close) / 3
+        traded = _rolling_sum(np.cumsum(typical * volume, axis=0), vwap_period)
+        total_volume = _rolling_sum(np.cumsum(volume, axis=0), vwap_period)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result['vwap'] = np.where(total_volume > 0, traded / total_volume, np.nan)
+
+    return result
+
+
+def continue_ema(prices, period: int, last_value: float) -> np.ndarray:
+    """
+    Continue an EMA over newly appended prices
+
+    Args:
+        prices: New prices of shape (m,) or (m, k)
+        period: Period
+        last_value: EMA value of the bar preceding prices
+
+    Returns:
+        EMA values for the new prices
+    """
+    values = as_float_array(prices)
+    padded = np.concatenate([np.full((1,) + values.shape[1:], last_value), values])
+    return _smooth(padded, 2 / (period + 1), 0, last_value)[1:]
+
+
+def continue_wilder_averages(prices, period: int, last_close: float, avg_gain: float, avg_loss: float):
+    """
+    Continue Wilder-smoothed average gain and loss over newly appended prices
+
+    Args:
+        prices: New prices of shape (m,) or (m, k)
+        period: Period
+        last_close: Close price of the bar preceding prices
+        avg_gain: Average gain of the bar preceding prices
+        avg_loss: Average loss of the bar preceding prices
+
+    Returns:
+        Tuple (avg_gain, avg_loss) for the new prices
+    """
+    values = as_float_array(prices)
+    gains, losses = _gains_and_losses(_changes(np.concatenate([np.full((1,) + values.shape[1:], last_close), values])))
+
+    alpha = 1 / period
+    return (
+        _smooth(gains, alpha, 0, avg_gain)[1:],
+        _smooth(losses, alpha, 0, avg_loss)[1:],
+    )
+
+
+class StreamingSMA:
+    """
+    Simple Moving Average updated one price at a time
+
+    Keeps a ring buffer of the last period cumulative sums, so each update is
+    O(1) and values are identical to ma() over the same prices.
+    """
+    __slots__ = ('period', '_sums', '_index', '_count', '_total', 'value')
+
+    def __init__(self, period: int):
+        self.period = period
+        self._sums = [0.0] * period
+        self._index = 0
+        self._count = 0
+        self._total = 0.0
+        self.value = None
+
+    def update(self, price: float) -> Optional[float]:
+        """
+        Add a price and return the moving average, or None during warm-up
+        """
+        self._total += price
+        oldest = self._sums[self._index]
+        self._sums[self._index] = self._total
+        self._index = (self._index + 1) % self.period
+        self._count += 1
+
+        if self._count == self.period:
+            self.value = self._total / self.period
+        elif self._count > self.period:
+            self.value = (self._total - oldest) / self.period
+        return self.value
+
+    def snapshot(self) -> Dict:
+        """
+        Return the state as a JSON-serializable dictionary
+        """
+        return {
+            'period': self.period,
+            'sums': self._sums[self._index:] + self._sums[:self._index],
+            'count': self._count,
+            'total': self._total,
+            'value': self.value,
+        }
+
+    @classmethod
+    def restore(cls, state: Dict) -> 'StreamingSMA':
+        """
+        Rebuild an instance from snapshot()
+        """
+        obj = cls(state['period'])
+        obj._sums = list(state['sums'])
+        obj._count = state['count']
+        obj._total = state['total']
+        obj.value = state['value']
+        return obj
+
+
+class StreamingEMA:
+    """
+    Exponential Moving Average updated one price at a time
+
+    Seeds with the SMA of the first period prices like ema().
+    """
+    __slots__ = ('period', 'alpha', '_warmup', 'value')
+
+    def __init__(self, period: int):
+        self.period = period
+        self.alpha = 2 / (period + 1)
+        self._warmup = []
+        self.value = None
+
+    def update(self, price: float) -> Optional[float]:
+        """
+        Add a price and return the EMA, or None during warm-up
+        """
+        if self.value is not None:
+            self.value = price * self.alpha + self.value * (1 - self.alpha)
+        else:
+            self._warmup.append(price)
+            if len(self._warmup) == self.period:
+                self.value = float(seed_mean(self._warmup))
+                self._warmup = []
+        return self.value
+
+    def snapshot(self) -> Dict:
+        """
+        Return the state as a JSON-serializable dictionary
+        """
+        return {'period': self.period, 'warmup': list(self._warmup), 'value': self.value}
+
+    @classmethod
+    def restore(cls, state: Dict) -> 'StreamingEMA':
+        """
+        Rebuild an instance from snapshot()
+        """
+        obj = cls(state['period'])
+        obj._warmup = list(state['warmup'])
+        obj.value = state['value']
+        return obj
+
+
+class StreamingMACD:
+    """
+    MACD line, signal line and histogram updated one price at a time
+    """
+    __slots__ = ('fast', 'slow', 'signal', 'value')
+
+    def __init__(self, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9):
+        self.fast = StreamingEMA(fast_period)
+        self.slow = StreamingEMA(slow_period)
+        self.signal = StreamingEMA(signal_period)
+        self.value = {'macd': None, 'signal': None, 'histogram': None}
+
+    def update(self, price: float) -> Dict[str, Optional[float]]:
+        """
+        Add a price and return the MACD, signal and histogram values
+        """
+        fast = self.fast.update(price)
+        slow = self.slow.update(price)
+        if fast is None or slow is None:
+            return self.value
+
+        line = fast - slow
+        signal = self.signal.update(line)
+        self.value = {
+            'macd': line,
+            'signal': signal,
+            'histogram': line - signal if signal is not None else None,
+        }
+        return self.value
+
+    def snapshot(self) -> Dict:
+        """
+        Return the state as a JSON-serializable dictionary
+        """
+        return {
+            'fast': self.fast.snapshot(),
+            'slow': self.slow.snapshot(),
+            'signal': self.signal.snapshot(),
+            'value': dict(self.value),
+        }
+
+    @classmethod
+    def restore(cls, state: Dict) -> 'StreamingMACD':
+        """
+        Rebuild an instance from snapshot()
+        """
+        obj = cls.__new__(cls)
+        obj.fast = StreamingEMA.restore(state['fast'])
+        obj.slow = StreamingEMA.restore(state['slow'])
+        obj.signal = StreamingEMA.restore(state['signal'])
+        obj.value = dict(state['value'])
+        return obj
+
+
+class StreamingRSI:
+    """
+    Relative Strength Index with Wilder smoothing updated one price at a time
+    """
+    __slots__ = ('period', '_last_price', '_gains', '_losses', 'avg_gain', 'avg_loss', 'value')
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self._last_price = None
+        self._gains = []
+        self._losses = []
+        self.avg_gain = None
+        self.avg_loss = None
+        self.value = None
+
+    def update(self, price: float) -> Optional[float]:
+        """
+        Add a price and return the RSI, or None during warm-up
+        """
+        last_price, self._last_price = self._last_price, price
+        if last_price is None:
+            return None
+
+        change = price - last_price
+        gain = max(change, 0.0)
+        loss = max(-change, 0.0)
+
+        if self.avg_gain is not None:
+            alpha = 1 / self.period
+            self.avg_gain = gain * alpha + self.avg_gain * (1 - alpha)
+            self.avg_loss = loss * alpha + self.avg_loss * (1 - alpha)
+        else:
+            self._gains.append(gain)
+            self._losses.append(loss)
+            if len(self._gains) < self.period:
+                return None
+            self.avg_gain = float(seed_mean(self._gains))
+            self.avg_loss = float(seed_mean(self._losses))
+            self._gains = []
+            self._losses = []
+
+        if self.avg_loss == 0:
+            self.value = 100.0
+        else:
+            self.value = 100 - 100 / (1 + self.avg_gain / self.avg_loss)
+        return self.value
+
+    def snapshot(self) -> Dict:
+        """
+        Return the state as a JSON-serializable dictionary
+        """
+        return {
+            'period': self.period,
+            'last_price': self._last_price,
+            'gains': list(self._gains),
+            'losses': list(self._losses),
+            'avg_gain': self.avg_gain,
+            'avg_loss': self.avg_loss,
+            'value': self.value,
+        }
+
+    @classmethod
+    def restore(cls, state: Dict) -> 'StreamingRSI':
+        """
+        Rebuild an instance from snapshot()
+        """
+        obj = cls(state['period'])
+        obj._last_price = state['last_price']
+        obj._gains = list(state['gains'])
+        obj._losses = list(state['losses'])
+        obj.avg_gain = state['avg_gain']
+        obj.avg_loss = state['avg_loss']
+        obj.value = state['value']
+        return obj
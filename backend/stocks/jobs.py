@@ -0,0 +1,609 @@
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .bulk import PRICE_FIELDS, copy_stock_prices, upsert_stock_prices, upsert_stocks
+from .models import Stock, StockDataImportLog, StockImportItem
+from .panel import recompute_panel
+from .pipeline import run_import_pipeline
+from .utils import (
+    PRICE_FILE_CHUNK_SIZE, STOCK_FILE_CHUNK_SIZE, STOCK_FILE_FIELDS,
+    clean_price_frame, clean_stock_frame, iter_price_file, iter_stock_file,
+)
+
+logger = logging.getLogger('stockanalysis')
+
+
+def create_import_job(symbols: List[str], import_type: str = 'api', created_by=None) -> StockDataImportLog:
+    """
+    Create an import job with one pending item per symbol
+
+    The log and its items are created in one transaction, so a rejected item
+    never leaves a job without items behind.
+
+    Args:
+        symbols: Stock symbols to import (duplicates are dropped)
+        import_type: StockDataImportLog import type
+        created_by: User starting the job
+
+    Returns:
+        The job's StockDataImportLog, in 'pending' status
+    """
+    symbols = list(dict.fromkeys(symbol.strip().upper() for symbol in symbols if symbol.strip()))
+    with transaction.atomic():
+        log = StockDataImportLog.objects.create(
+            import_type=import_type,
+            status='pending',
+            total_records=len(symbols),
+            created_by=created_by
+        )
+        StockImportItem.objects.bulk_create(
+            [StockImportItem(log=log, symbol=symbol) for symbol in symbols],
+            batch_size=1000
+        )
+    return log
+
+
+def refresh_job_counts(log: StockDataImportLog) -> StockDataImportLog:
+    """
+    Copy the per-symbol item counts onto the job's log row
+    """
+    counts = log.items.aggregate(
+        total=Count('id'),
+        done=Count('id', filter=Q(status='done')),
+        failed=Count('id', filter=Q(status='failed')),
+        rows=Sum('rows'),
+    )
+    log.total_records = counts['total']
+    log.success_records = counts['done']
+    log.failed_records = counts['failed']
+    log.rows_imported = counts['rows'] or 0
+    log.save(update_fields=['total_records', 'success_records', 'failed_records', 'rows_imported', 'updated_at'])
+    return log
+
+
+def requeue_failed(log: StockDataImportLog) -> int:
+    """
+    Put the failed symbols of a job back to pending, leaving done ones alone
+
+    Returns:
+        Number of symbols queued again
+    """
+    return log.items.filter(status='failed').update(
+        status='pending', error_message=None, leased_by=None, lease_expires_at=None
+    )
+
+
+def finish_import_job(log: StockDataImportLog) -> StockDataImportLog:
+    """
+    Refresh the job's counters and set its final status from the items
+    """
+    refresh_job_counts(log)
+    log.finished_at = timezone.now()
+    if log.failed_records:
+        log.status = 'failed'
+        log.error_message = f'{log.failed_records} symbols failed; retry them with retry_failed'
+    else:
+        log.status = 'success'
+    log.save(update_fields=['status', 'error_message', 'finished_at', 'updated_at'])
+    return log
+
+
+def _record_item_result(log: StockDataImportLog, worker_id: str, symbol: str, success: bool, rows: int,
+                        error: Optional[str]) -> bool:
+    """
+    Checkpoint a symbol's outcome on its item, as long as the worker still holds its lease
+
+    Once a lease expired, another worker may have taken the item over and owns
+    its result, so the outcome is dropped.
+
+    Returns:
+        Whether the outcome was recorded
+    """
+    recorded = StockImportItem.objects.filter(
+        log=log, symbol=symbol, status='pending', leased_by=worker_id
+    ).update(
+        status='done' if success else 'failed',
+        rows=rows,
+        error_message=error,
+        attempts=F('attempts') + 1,
+        leased_by=None,
+        lease_expires_at=None,
+        updated_at=timezone.now(),
+    )
+    if not recorded:
+        logger.warning("%s lost the lease of %s in import job %s, dropping its result", worker_id, symbol, log.id)
+    return bool(recorded)
+
+
+def run_import_job(log: StockDataImportLog, retry_failed: bool = False, checkpoint_every: int = 25,
+                   progress: Optional[Callable[[StockDataImportLog], None]] = None,
+                   worker_id: Optional[str] = None, batch_size: int = 100, lease_seconds: float = 300,
+                   heartbeat_interval: Optional[float] = None, **pipeline_options: Any) -> StockDataImportLog:
+    """
+    Run, resume or retry an import job
+
+    Only pending symbols are imported, so running the job again after a crash
+    picks up where it stopped. Every symbol's outcome is checkpointed on its
+    item as soon as it is written; the log's counters, and so its progress and
+    throughput, are refreshed every checkpoint_every symbols.
+
+    The job runs in this process, but its symbols are leased batch_size at a
+    time like work_import_queue does, so import_worker processes running at
+    the same time never import the same symbols. Symbols leased by such a
+    worker are left to it, and the job keeps its 'processing' status until
+    the worker finishing the last one sets the final status. After a hard
+    crash, the symbols of the batch that was running are resumed once their
+    leases expire.
+
+    Args:
+        log: Job created by create_import_job
+        retry_failed: Put failed symbols back to pending first, leaving done ones alone
+        checkpoint_every: Symbols processed between log counter refreshes
+        progress: Called with the log after every counter refresh
+        worker_id: Id recorded on leased items, defaults to hostname:pid
+        batch_size: Symbols leased and imported at a time
+        lease_seconds: Lease length
+        heartbeat_interval: Seconds between lease renewals, defaults to a third of lease_seconds
+        **pipeline_options: Passed to run_import_pipeline (fetcher, concurrency, rate, method, ...)
+
+    Returns:
+        The log, with status 'success' when every symbol is done, 'failed' when
+        some failed and 'processing' while workers still hold some symbols
+    """
+    worker_id = worker_id or default_worker_id()
+    if retry_failed:
+        requeue_failed(log)
+
+    refresh_job_counts(log)
+    log.status = 'processing'
+    log.started_at = timezone.now()
+    log.finished_at = None
+    log.error_message = None
+    log.resumed_records = log.success_records + log.failed_records
+    log.save(update_fields=['status', 'started_at', 'finished_at', 'error_message', 'resumed_records', 'updated_at'])
+
+    processed = 0
+
+    def on_result(symbol, success, rows, error):
+        nonlocal processed
+        if not _record_item_result(log, worker_id, symbol, success, rows, error):
+            return
+        processed += 1
+        if processed % checkpoint_every == 0:
+            refresh_job_counts(log)
+            if progress:
+                progress(log)
+
+    try:
+        while True:
+            items = lease_items(worker_id, batch_size, lease_seconds, log_id=log.id)
+            if not items:
+                break
+            item_ids = [item.id for item in items]
+            with LeaseHeartbeat(worker_id, item_ids, lease_seconds, heartbeat_interval):
+                try:
+                    run_import_pipeline([item.symbol for item in items], on_result=on_result, **pipeline_options)
+                finally:
+                    # Unfinished symbols stay pending for a resume, free to lease at once
+                    release_leases(worker_id, item_ids)
+    except Exception as e:
+        # Finished items keep their checkpoints; the rest stay pending for a resume
+        logger.error("Import job %s stopped: %s", log.id, e)
+        refresh_job_counts(log)
+        log.status = 'failed'
+        log.error_message = f'Job stopped: {e}'
+        log.finished_at = timezone.now()
+        log.save(update_fields=['status', 'error_message', 'finished_at', 'updated_at'])
+        raise
+
+    if log.items.filter(status='pending').exists():
+        # Workers hold the remaining symbols; the one finishing the last sets the status
+        refresh_job_counts(log)
+    else:
+        finish_import_job(log)
+    if progress:
+        progress(log)
+    return log
+
+
+def run_excel_import(log: StockDataImportLog, file_path: str,
+                     chunk_size: int = STOCK_FILE_CHUNK_SIZE) -> StockDataImportLog:
+    """
+    Import the stocks of an uploaded Excel or CSV file into an import job
+
+    The file is streamed chunk_size rows at a time; each chunk is validated
+    as a whole and written with one bulk upsert, after which the log's
+    counters are updated, so memory stays flat and progress is visible while
+    a large file is imported. A file only updates the stock columns it has;
+    of rows repeating a symbol within a chunk, the last one is stored and the
+    others count as failed records.
+
+    Args:
+        log: Job's StockDataImportLog, created with import_type 'excel' or 'stock_csv'
+        file_path: Path of the uploaded file
+        chunk_size: Rows read, validated and upserted at a time
+
+    Returns:
+        The log, with status 'success' or, when the file cannot be read, 'failed'
+    """
+    log.status = 'processing'
+    log.started_at = timezone.now()
+    log.finished_at = None
+    log.total_records = log.success_records = log.failed_records = 0
+    log.save(update_fields=['status', 'started_at', 'finished_at', 'total_records',
+                            'success_records', 'failed_records', 'updated_at'])
+
+    try:
+        for chunk in iter_stock_file(file_path, chunk_size):
+            records, invalid = clean_stock_frame(chunk)
+            fields = [field for field in STOCK_FILE_FIELDS if field in chunk.columns]
+            # Rows repeating a symbol of the same chunk are dropped, all but the last one
+            duplicates = len(chunk) - invalid - len(records)
+            log.total_records += len(chunk)
+            log.failed_records += invalid + duplicates
+            try:
+                with transaction.atomic():
+                    upsert_stocks(records, fields, chunk_size)
+                log.success_records += len(records)
+            except DatabaseError as e:
+                logger.warning("Importing rows %d-%d of %s failed: %s",
+                               log.total_records - len(chunk) + 1, log.total_records, log.file_path, e)
+                log.failed_records += len(records)
+            log.save(update_fields=['total_records', 'success_records', 'failed_records', 'updated_at'])
+
+        log.status = 'success'
+    except Exception as e:
+        logger.error("Stock file import %s failed: %s", log.id, e)
+        log.status = 'failed'
+        log.error_message = f"Error parsing file: {e}"
+
+    log.finished_at = timezone.now()
+    log.save()
+    return log
+
+
+def _stock_ids(symbols: List[str], create_missing: bool) -> Tuple[Dict[str, int], List[str]]:
+    """
+    Map symbols to stock ids with one query, creating unknown stocks when asked to
+
+    Returns:
+        The symbol to id map and the symbols of the stocks created
+    """
+    ids = dict(Stock.objects.filter(symbol__in=symbols).values_list('symbol', 'id'))
+    missing = [symbol for symbol in symbols if symbol not in ids]
+    created = []
+    if missing and create_missing:
+        Stock.objects.bulk_create(
+            [Stock(symbol=symbol, name=symbol) for symbol in missing],
+            ignore_conflicts=True,
+        )
+        created = dict(Stock.objects.filter(symbol__in=missing).values_list('symbol', 'id'))
+        ids.update(created)
+    return ids, list(created)
+
+
+def run_price_file_import(log: StockDataImportLog, file_path: str, method: Optional[str] = None,
+                          chunk_size: int = PRICE_FILE_CHUNK_SIZE, create_missing: bool = True,
+                          recompute: bool = True, recompute_batch_size: int = 100,
+                          progress: Optional[Callable[[StockDataImportLog], None]] = None) -> StockDataImportLog:
+    """
+    Backfill price history from a CSV or Parquet file into an import job
+
+    The file is streamed chunk_size rows at a time. Each chunk is validated
+    as a whole, its symbols are mapped to stock ids with one query, and its
+    bars are written with COPY on PostgreSQL (bulk upserts elsewhere); of rows
+    repeating a symbol and date within a chunk, the last one is stored and
+    the others count as failed records. Once the file is loaded, indicators
+    are recomputed for the affected stocks only, from the earliest loaded
+    date on, and a fundamentals refresh of the stocks it created is queued;
+    when a chunk fails, the stocks of the chunks loaded before it are still
+    recomputed.
+
+    Args:
+        log: Job's StockDataImportLog, created with import_type 'csv'
+        file_path: Path of the price file
+        method: Price load method, 'copy' or 'bulk' (default: copy on PostgreSQL, bulk otherwise)
+        chunk_size: Rows read, validated and loaded at a time
+        create_missing: Create stocks for unknown symbols instead of skipping their rows
+        recompute: Recompute technical indicators of the affected stocks afterwards
+        recompute_batch_size: Stocks per indicator recompute
+        progress: Called with the log after every chunk
+
+    Returns:
+        The log, with status 'success' or, when the file cannot be read, 'failed'
+    """
+    method = method or ('copy' if connection.vendor == 'postgresql' else 'bulk')
+    log.status = 'processing'
+    log.started_at = timezone.now()
+    log.finished_at = None
+    log.total_records = log.success_records = log.failed_records = log.rows_imported = 0
+    log.save(update_fields=['status', 'started_at', 'finished_at', 'total_records', 'success_records',
+                            'failed_records', 'rows_imported', 'updated_at'])
+
+    # Earliest loaded date of every affected stock
+    affected: Dict[str, date] = {}
+    created: List[str] = []
+
+    try:
+        for chunk in iter_price_file(file_path, chunk_size):
+            clean, invalid = clean_price_frame(chunk)
+            ids, new_symbols = _stock_ids(clean['symbol'].unique().tolist(), create_missing)
+            created += new_symbols
+            known = clean['symbol'].isin(list(ids))
+            unknown = int((~known).sum())
+            clean = clean[known]
+            stock_ids = clean['symbol'].map(ids)
+
+            # Recorded before the load, so stocks of a chunk that fails half-way are recomputed too
+            for symbol, first in clean.groupby('symbol')['date'].min().items():
+                affected[symbol] = min(first, affected.get(symbol, first))
+
+            if method == 'copy':
+                stats = copy_stock_prices(zip(stock_ids.tolist(), clean['date'].tolist(),
+                                              *(clean[field].tolist() for field in PRICE_FIELDS)))
+                merged = stats['merged']
+            else:
+                merged = 0
+                for stock_id, bars in clean.groupby(stock_ids):
+                    stats = upsert_stock_prices(int(stock_id), bars[['date'] + PRICE_FIELDS].to_dict('records'))
+                    merged += stats['merged']
+            # Rows repeating a bar of the same chunk are dropped, all but the last one
+            duplicates = len(clean) - merged
+
+            log.total_records += len(chunk)
+            log.failed_records += invalid + unknown + duplicates
+            log.success_records += merged
+            log.rows_imported += merged
+            log.save(update_fields=['total_records', 'success_records', 'failed_records', 'rows_imported',
+                                    'updated_at'])
+            if progress:
+                progress(log)
+
+        log.status = 'success'
+    except Exception as e:
+        logger.error("Price file import %s failed: %s", log.id, e)
+        log.status = 'failed'
+        log.error_message = f"Price import failed: {e}"
+
+    # Chunks loaded before a failure stay committed, so their stocks are recomputed either way;
+    # otherwise their indicator state would no longer match the stored bars
+    if recompute and affected:
+        try:
+            symbols = sorted(affected)
+            for start in range(0, len(symbols), recompute_batch_size):
+                batch = symbols[start:start + recompute_batch_size]
+                recompute_panel(batch, since=min(affected[symbol] for symbol in batch))
+        except Exception as e:
+            logger.error("Recomputing indicators after price file import %s failed: %s", log.id, e)
+            log.status = 'failed'
+            log.error_message = '; '.join(filter(None, [log.error_message, f"Indicator recompute failed: {e}"]))
+
+    # tasks imports this module
+    from .tasks import queue_fundamentals_refresh
+    queue_fundamentals_refresh(created)
+
+    log.finished_at = timezone.now()
+    log.save()
+    return log
+
+
+def default_worker_id() -> str:
+    """
+    Worker id that is unique across hosts: hostname and process id
+    """
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def lease_items(worker_id: str, batch_size: int = 10, lease_seconds: float = 300,
+                log_id: Optional[int] = None) -> List[StockImportItem]:
+    """
+    Lease a batch of pending import items for one worker
+
+    Items that were never leased, or whose lease expired because their worker
+    died or stopped renewing it, are selected with SELECT ... FOR UPDATE SKIP
+    LOCKED, so concurrent workers each get different rows without waiting on
+    one another. Each lease is then taken by an UPDATE that checks again that
+    the item is pending and free, so on backends without row locks (SQLite),
+    where two workers can select the same items, every item still goes to
+    one worker only.
+
+    Args:
+        worker_id: Id written to the leased items
+        batch_size: Maximum number of items to lease
+        lease_seconds: Lease length; the worker must renew it before it runs out
+        log_id: Only lease items of this job
+
+    Returns:
+        The leased items, oldest first
+    """
+    now = timezone.now()
+    expires = now + timedelta(seconds=lease_seconds)
+    leasable = Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lt=now)
+    leased = []
+    with transaction.atomic():
+        available = StockImportItem.objects.select_for_update(skip_locked=True).filter(leasable, status='pending')
+        if log_id is not None:
+            available = available.filter(log_id=log_id)
+        for item in available.order_by('id')[:batch_size]:
+            # The UPDATE checks the item is still free, so a row another worker leased
+            # after the SELECT (SQLite ignores SKIP LOCKED) is left to that worker
+            if StockImportItem.objects.filter(leasable, id=item.id, status='pending').update(
+                leased_by=worker_id, lease_expires_at=expires, updated_at=now
+            ):
+                item.leased_by, item.lease_expires_at, item.updated_at = worker_id, expires, now
+                leased.append(item)
+    return leased
+
+
+def renew_leases(worker_id: str, item_ids: List[int], lease_seconds: float = 300) -> int:
+    """
+    Extend the worker's leases on its items that are still pending
+
+    Returns:
+        Number of leases renewed; items taken over by another worker after an
+        expired lease are not counted
+    """
+    now = timezone.now()
+    return StockImportItem.objects.filter(
+        id__in=item_ids, leased_by=worker_id, status='pending'
+    ).update(lease_expires_at=now + timedelta(seconds=lease_seconds), updated_at=now)
+
+
+def release_leases(worker_id: str, item_ids: List[int]) -> int:
+    """
+    Give up the worker's leases on items it did not finish, so others can take them at once
+    """
+    return StockImportItem.objects.filter(
+        id__in=item_ids, leased_by=worker_id, status='pending'
+    ).update(leased_by=None, lease_expires_at=None, updated_at=timezone.now())
+
+
+class LeaseHeartbeat:
+    """
+    Background thread renewing a worker's leases while it imports them
+
+    A lease only expires when the heartbeat stops, i.e. when the worker process
+    dies or hangs, which is what lets other workers reclaim its symbols.
+    """
+
+    def __init__(self, worker_id: str, item_ids: List[int], lease_seconds: float,
+                 interval: Optional[float] = None):
+        self.worker_id = worker_id
+        self.item_ids = item_ids
+        self.lease_seconds = lease_seconds
+        self.interval = interval if interval is not None else lease_seconds / 3
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'heartbeat-{worker_id}', daemon=True)
+
+    def _run(self):
+        try:
+            while not self._stopped.wait(self.interval):
+                try:
+                    renew_leases(self.worker_id, self.item_ids, self.lease_seconds)
+                except Exception as e:
+                    logger.warning("Renewing leases of %s failed: %s", self.worker_id, e)
+        finally:
+            # Each thread has its own database connection
+            connection.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+
+
+def _start_job(log_id: int) -> StockDataImportLog:
+    """
+    Move a job to 'processing' when the first worker picks up one of its symbols
+    """
+    now = timezone.now()
+    started = StockDataImportLog.objects.filter(id=log_id).exclude(status='processing').update(
+        status='processing', started_at=now, finished_at=None, error_message=None, updated_at=now
+    )
+    log = StockDataImportLog.objects.get(id=log_id)
+    if started:
+        refresh_job_counts(log)
+        log.resumed_records = log.success_records + log.failed_records
+        log.save(update_fields=['resumed_records', 'updated_at'])
+    return log
+
+
+def work_import_queue(worker_id: Optional[str] = None, batch_size: int = 10, lease_seconds: float = 300,
+                      heartbeat_interval: Optional[float] = None, log_id: Optional[int] = None,
+                      exit_when_idle: bool = True, poll_interval: float = 5.0, checkpoint_every: int = 25,
+                      progress: Optional[Callable[[StockDataImportLog], None]] = None,
+                      **pipeline_options: Any) -> Dict[str, Any]:
+    """
+    Import leased symbols of pending jobs until the queue is empty
+
+    Any number of these workers, on any number of hosts, can run against the
+    same database: each leases batch_size symbols at a time (lease_items), keeps
+    the leases alive with a heartbeat while the batch goes through
+    run_import_pipeline, and checkpoints every symbol on its item. Symbols
+    leased by a worker that died become available again once its lease expires.
+    The worker that finishes a job's last symbol sets the job's final status.
+
+    Args:
+        worker_id: Id recorded on leased items, defaults to hostname:pid
+        batch_size: Symbols leased per batch
+        lease_seconds: Lease length
+        heartbeat_interval: Seconds between lease renewals, defaults to a third of lease_seconds
+        log_id: Only work on this job
+        exit_when_idle: Return once no pending symbols are left instead of polling for new jobs
+        poll_interval: Seconds to wait between polls when nothing can be leased
+        checkpoint_every: Symbols processed between job counter refreshes
+        progress: Called with a job's log after every counter refresh
+        **pipeline_options: Passed to run_import_pipeline (fetcher, concurrency, rate, method, ...)
+
+    Returns:
+        Statistics with the batches, done and failed symbol counts and rows imported by this
+        worker, and the number of results dropped because another worker took the lease over
+    """
+    worker_id = worker_id or default_worker_id()
+    stats = {'worker_id': worker_id, 'batches': 0, 'done': 0, 'failed': 0, 'lost': 0, 'rows': 0}
+    processed = 0
+
+    while True:
+        items = lease_items(worker_id, batch_size, lease_seconds, log_id)
+        if not items:
+            # Symbols still leased by other workers are waited for, so that they
+            # are reclaimed here if one of those workers dies
+            pending = StockImportItem.objects.filter(status='pending')
+            if log_id is not None:
+                pending = pending.filter(log_id=log_id)
+            if exit_when_idle and not pending.exists():
+                break
+            time.sleep(poll_interval)
+            continue
+
+        stats['batches'] += 1
+        item_ids = [item.id for item in items]
+        by_job: Dict[int, List[str]] = {}
+        for item in items:
+            by_job.setdefault(item.log_id, []).append(item.symbol)
+
+        with LeaseHeartbeat(worker_id, item_ids, lease_seconds, heartbeat_interval):
+            for job_id, symbols in by_job.items():
+                log = _start_job(job_id)
+
+                def on_result(symbol, success, rows, error, log=log):
+                    nonlocal processed
+                    if not _record_item_result(log, worker_id, symbol, success, rows, error):
+                        stats['lost'] += 1
+                        return
+                    stats['done' if success else 'failed'] += 1
+                    stats['rows'] += rows
+                    processed += 1
+                    if processed % checkpoint_every == 0:
+                        refresh_job_counts(log)
+                        if progress:
+                            progress(log)
+
+                try:
+                    run_import_pipeline(symbols, on_result=on_result, **pipeline_options)
+                except Exception as e:
+                    # Hand the unfinished symbols back instead of waiting for the leases to expire
+                    logger.error("Import worker %s stopped: %s", worker_id, e)
+                    release_leases(worker_id, item_ids)
+                    raise
+
+                if log.items.filter(status='pending').exists():
+                    refresh_job_counts(log)
+                else:
+                    finish_import_job(log)
+                if progress:
+                    progress(log)
+
+    return stats
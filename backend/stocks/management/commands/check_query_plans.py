@@ -0,0 +1,127 @@
+import re
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max, OuterRef, Subquery
+
+from stocks import partitions
+from stocks.models import Stock, StockPrice, StockPriceIndicators
+from stocks.storage import with_indicators
+
+# Plan lines of a full scan of a price table, per database vendor
+FULL_SCAN_PATTERNS = {
+    'postgresql': r'Seq Scan on ({tables})\b',
+    'sqlite': r'\bSCAN ({tables})\b',
+}
+
+# Partitions of stock_prices with fewer rows are scanned whole by design, which is cheaper than an index
+MIN_CHECKED_PARTITION_ROWS = 1000
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot stock price queries and fail if any scans a whole price table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--symbol',
+            type=str,
+            default=None,
+            help='Stock whose queries are explained (default: the stock of the most recently loaded price)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            metavar='SYMBOLS',
+            help='First generate this many synthetic stocks, so the planner sees a realistic table'
+        )
+        parser.add_argument(
+            '--seed-years',
+            type=float,
+            default=5,
+            help='Years of prices per synthetic stock with --seed'
+        )
+
+    def hot_queries(self, stock):
+        """
+        The price queries the API runs on every request, by name
+        """
+        prices = StockPrice.objects.filter(stock=stock)
+        last_date = prices.aggregate(last=Max('date'))['last']
+        latest = StockPrice.objects.filter(stock=OuterRef('pk')).order_by('-date')
+
+        return {
+            # StockPriceListView, first page
+            'price list': with_indicators(prices).order_by('-date')[:20],
+            # StockPriceListView and TechnicalIndicatorsView with a date range
+            'price range': with_indicators(prices).filter(
+                date__gte=last_date - timedelta(days=365), date__lte=last_date
+            ).order_by('-date'),
+            # TechnicalIndicatorsView without a start date
+            'last date': prices.values('stock').annotate(last=Max('date')),
+            # StockSerializer.get_latest_price
+            'latest price': stock.prices.values('close_price', 'date', 'volume')[:1],
+            # Latest bar of every stock on a page of the stock list
+            'latest per stock': Stock.objects.order_by('symbol').annotate(
+                latest_close=Subquery(latest.values('close_price')[:1]),
+                latest_volume=Subquery(latest.values('volume')[:1]),
+            )[:20],
+        }
+
+    def handle(self, *args, **options):
+        if connection.vendor not in FULL_SCAN_PATTERNS:
+            raise CommandError(f'Query plan checks are not supported on {connection.vendor}')
+
+        if options['seed']:
+            call_command(
+                'import_stock_data', '--generate', '--symbols', str(options['seed']),
+                '--years', str(options['seed_years']), '--prefix', 'QP', '--skip-indicators',
+                stdout=self.stdout
+            )
+
+        # Planner statistics must be current, or small or fresh tables are scanned regardless of indexes
+        tables = [StockPrice._meta.db_table, StockPriceIndicators._meta.db_table, Stock._meta.db_table]
+        with connection.cursor() as cursor:
+            for table in tables:
+                cursor.execute(f'ANALYZE {table}')
+
+        if options['symbol']:
+            try:
+                stock = Stock.objects.get(symbol=options['symbol'].upper())
+            except Stock.DoesNotExist:
+                raise CommandError(f'Stock {options["symbol"]} does not exist')
+            if not stock.prices.exists():
+                raise CommandError(f'Stock {stock.symbol} has no prices to explain')
+        else:
+            stock_id = StockPrice.objects.order_by('-id').values_list('stock', flat=True).first()
+            stock = Stock.objects.filter(id=stock_id).first()
+            if stock is None:
+                raise CommandError('No stock prices to explain; seed some with --seed')
+
+        price_tables = tables[:2]
+        if partitions.is_partitioned():
+            price_tables += [
+                partition['name'] for partition in partitions.list_partitions()
+                if partition['rows'] >= MIN_CHECKED_PARTITION_ROWS
+            ]
+        full_scan = re.compile(FULL_SCAN_PATTERNS[connection.vendor].format(
+            tables='|'.join(re.escape(table) for table in price_tables)
+        ))
+
+        regressed = []
+        for name, queryset in self.hot_queries(stock).items():
+            plan = queryset.explain()
+            scans = [line.strip() for line in plan.splitlines() if full_scan.search(line)]
+            if scans:
+                regressed.append(name)
+                self.stdout.write(self.style.ERROR(f'FAIL {name}: {"; ".join(scans)}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'ok   {name}'))
+            if options['verbosity'] > 1 or scans:
+                self.stdout.write(plan)
+
+        if regressed:
+            raise CommandError(f"{len(regressed)} price queries scan a whole table: {', '.join(regressed)}")
+        self.stdout.write(self.style.SUCCESS(f'All price queries of {stock.symbol} use indexes'))
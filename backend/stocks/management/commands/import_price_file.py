@@ -0,0 +1,85 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from stocks.jobs import run_price_file_import
+from stocks.models import StockDataImportLog
+from stocks.utils import PRICE_FILE_CHUNK_SIZE, PRICE_LOAD_METHODS
+
+
+class Command(BaseCommand):
+    help = 'Backfill price history from CSV or Parquet files (symbol, date, open, high, low, close, volume)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'files',
+            nargs='+',
+            help='CSV (.csv, .csv.gz) or Parquet (.parquet) price files'
+        )
+        parser.add_argument(
+            '--method',
+            choices=PRICE_LOAD_METHODS,
+            default=None,
+            help='Price load method (default: copy on PostgreSQL, bulk otherwise)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=PRICE_FILE_CHUNK_SIZE,
+            help='Rows read and loaded at a time'
+        )
+        parser.add_argument(
+            '--skip-unknown',
+            action='store_true',
+            help='Skip rows of symbols not in the database instead of creating the stocks'
+        )
+        parser.add_argument(
+            '--skip-indicators',
+            action='store_true',
+            help='Do not recompute technical indicators after loading'
+        )
+
+    def handle(self, *args, **options):
+        if options['method'] == 'copy' and connection.vendor != 'postgresql':
+            raise CommandError('The copy method requires PostgreSQL')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive')
+        for file_path in options['files']:
+            if not os.path.exists(file_path):
+                raise CommandError(f'File {file_path} does not exist')
+
+        failed = []
+        for file_path in options['files']:
+            log = StockDataImportLog.objects.create(
+                import_type='csv',
+                status='pending',
+                file_path=file_path
+            )
+            self.stdout.write(self.style.SUCCESS(f'Importing {file_path} as import job {log.id}...'))
+
+            def report(log):
+                self.stdout.write(
+                    f'{log.total_records} rows read, {log.rows_imported} loaded, '
+                    f'{log.failed_records} skipped, {log.records_per_second:.0f} rows/s'
+                )
+
+            log = run_price_file_import(
+                log,
+                file_path,
+                method=options['method'],
+                chunk_size=options['chunk_size'],
+                create_missing=not options['skip_unknown'],
+                recompute=not options['skip_indicators'],
+                progress=report,
+            )
+            if log.status == 'success':
+                self.stdout.write(self.style.SUCCESS(
+                    f'{file_path}: {log.rows_imported} rows loaded, {log.failed_records} rows skipped'
+                ))
+            else:
+                failed.append(file_path)
+                self.stdout.write(self.style.ERROR(f'{file_path}: {log.error_message}'))
+
+        if failed:
+            raise CommandError(f"Import failed for {', '.join(failed)}")
@@ -1,12 +1,25 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
 from django.utils import timezone
+from stocks import indicators
+from stocks.bulk import PRICE_FIELDS, copy_stock_prices, upsert_stock_prices
 from stocks.models import Stock, StockPrice
+from stocks.panel import compute_panel_indicators, recompute_panel, save_indicator_states
+from stocks.storage import INDICATOR_FIELDS, float_storage_enabled
+from stocks.synthetic import business_days, generate_ohlcv
+from stocks.utils import PRICE_LOAD_METHODS
 from decimal import Decimal
+import numpy as np
 import random
+import time
 from datetime import datetime, timedelta
 
+SECTORS = ['Technology', 'Financial', 'Healthcare', 'Energy', 'Industrials', 'Consumer', 'Utilities', 'Materials']
+EXCHANGES = ['NASDAQ', 'NYSE']
+
+
 class Command(BaseCommand):
-    help = 'Import stock data into database'
+    help = 'Import demo stock data, or generate a synthetic market for load tests with --generate'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -15,8 +28,147 @@ class Command(BaseCommand):
             default=30,
             help='Number of days of historical data to generate'
         )
+        parser.add_argument(
+            '--generate',
+            action='store_true',
+            help='Generate --symbols synthetic stocks with --years of geometric Brownian motion prices'
+        )
+        parser.add_argument(
+            '--symbols',
+            type=int,
+            default=100,
+            help='Number of synthetic stocks with --generate'
+        )
+        parser.add_argument(
+            '--years',
+            type=float,
+            default=5,
+            help='Years of daily bars per synthetic stock with --generate'
+        )
+        parser.add_argument(
+            '--prefix',
+            type=str,
+            default='SYN',
+            help='Symbol prefix of the synthetic stocks'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed; the same seed generates the same market'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=250,
+            help='Synthetic stocks generated and loaded at a time'
+        )
+        parser.add_argument(
+            '--method',
+            choices=PRICE_LOAD_METHODS,
+            default=None,
+            help='Price load method with --generate (default: copy on PostgreSQL, bulk otherwise)'
+        )
+        parser.add_argument(
+            '--skip-indicators',
+            action='store_true',
+            help='Do not compute technical indicators'
+        )
+
+    def generate(self, options):
+        """
+        Generate and bulk load a synthetic market, then run the indicator engine over it
+        """
+        n_symbols = options['symbols']
+        batch_size = options['batch_size']
+        width = max(4, len(str(n_symbols - 1)))
+        if n_symbols < 1 or batch_size < 1 or options['years'] <= 0:
+            raise CommandError('--symbols, --years and --batch-size must be positive')
+        if len(options['prefix']) + width > Stock._meta.get_field('symbol').max_length:
+            raise CommandError('--prefix is too long for the symbol column')
+        method = options['method'] or ('copy' if connection.vendor == 'postgresql' else 'bulk')
+        if method == 'copy' and connection.vendor != 'postgresql':
+            raise CommandError('The copy method requires PostgreSQL')
+
+        today = timezone.now().date()
+        dates = business_days(today - timedelta(days=round(options['years'] * 365.25)), today)
+        date_list = dates.tolist()
+        rng = np.random.default_rng(options['seed'])
+        symbols = [f"{options['prefix']}{i:0{width}d}" for i in range(n_symbols)]
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generating {n_symbols} stocks x {len(dates)} days with the {method} loader...'
+        ))
+        started = time.perf_counter()
+        total_rows = 0
+
+        for start in range(0, n_symbols, batch_size):
+            batch = symbols[start:start + batch_size]
+            Stock.objects.bulk_create(
+                [
+                    Stock(
+                        symbol=symbol,
+                        name=f'Synthetic {symbol}',
+                        exchange=EXCHANGES[i % len(EXCHANGES)],
+                        sector=SECTORS[i % len(SECTORS)],
+                        market_cap=int(rng.integers(100_000_000, 3_000_000_000_000)),
+                    )
+                    for i, symbol in enumerate(batch, start)
+                ],
+                ignore_conflicts=True,
+            )
+            ids = dict(Stock.objects.filter(symbol__in=batch).values_list('symbol', 'id'))
+            stock_ids = [ids[symbol] for symbol in batch]
+            bars = generate_ohlcv(len(dates), len(batch), rng)
+
+            # The bars are all in memory, so indicators can be computed before
+            # loading and copied with the prices instead of updating every row again
+            with_indicators = method == 'copy' and not options['skip_indicators'] and not float_storage_enabled()
+            if with_indicators:
+                columns, state = compute_panel_indicators(bars['close_price'])
+                bars.update(columns)
+
+            if method == 'copy':
+                fields = PRICE_FIELDS + (INDICATOR_FIELDS if with_indicators else [])
+                # Rows are day-major: every stock of the batch for the first day, then the next day
+                copy_stock_prices(zip(
+                    stock_ids * len(dates),
+                    (day for day in date_list for _ in batch),
+                    *(indicators.to_optional_list(bars[field].ravel()) for field in fields)
+                ), fields=fields)
+            else:
+                columns = {field: bars[field].T.tolist() for field in PRICE_FIELDS}
+                for column, stock_id in enumerate(stock_ids):
+                    upsert_stock_prices(stock_id, [
+                        dict(zip(['date'] + PRICE_FIELDS, row))
+                        for row in zip(date_list, *(columns[field][column] for field in PRICE_FIELDS))
+                    ])
+
+            if with_indicators:
+                save_indicator_states(np.array(stock_ids), dates, np.ones((len(dates), len(batch)), dtype=bool), state)
+            elif not options['skip_indicators']:
+                recompute_panel(batch)
+
+            total_rows += len(batch) * len(dates)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'[{start + len(batch)}/{n_symbols}] {total_rows} rows, {total_rows / elapsed:.0f} rows/s'
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Synthetic market generated!\n'
+                f'Stocks: {n_symbols}\n'
+                f'Price records: {total_rows}\n'
+                f'Elapsed: {time.perf_counter() - started:.1f}s'
+            )
+        )
 
     def handle(self, *args, **options):
+        if options['generate']:
+            self.generate(options)
+            return
+
         days = options['days']
         
         # Stock data from frontend
@@ -191,10 +343,6 @@ class Command(BaseCommand):
                         'low_price': Decimal(str(round(low_price, 2))),
                         'close_price': Decimal(str(round(close_price, 2))),
                         'volume': volume,
-                        # Add some technical indicators
-                        'ma_5': Decimal(str(round(close_price * 0.98, 2))),
-                        'ma_20': Decimal(str(round(close_price * 0.95, 2))),
-                        'rsi': random.randint(20, 80)
                     }
                 )
                 
@@ -203,6 +351,12 @@ class Command(BaseCommand):
                 
                 # Update base price for next day
                 base_price = close_price
+            
+            # Cached custom indicators are keyed on it, as for the bulk price writers
+            Stock.objects.filter(id=stock.id).update(updated_at=timezone.now())
+        
+        if not options['skip_indicators']:
+            recompute_panel([stock_info['symbol'] for stock_info in stock_data])
         
         self.stdout.write(
             self.style.SUCCESS(
@@ -0,0 +1,123 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from stocks.jobs import default_worker_id, work_import_queue
+from stocks.providers import add_provider_arguments, provider_from_options
+from stocks.utils import PRICE_LOAD_METHODS
+
+
+class Command(BaseCommand):
+    help = 'Work through queued import jobs; run any number of these against one database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--job',
+            type=int,
+            default=None,
+            metavar='LOG_ID',
+            help='Only import symbols of this job'
+        )
+        parser.add_argument(
+            '--worker-id',
+            type=str,
+            default=None,
+            help='Id recorded on leased symbols (default: hostname:pid)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10,
+            help='Symbols leased per batch'
+        )
+        parser.add_argument(
+            '--lease-seconds',
+            type=float,
+            default=300,
+            help='Lease length; symbols of a worker that stops renewing it are reclaimed afterwards'
+        )
+        parser.add_argument(
+            '--heartbeat',
+            type=float,
+            default=None,
+            help='Seconds between lease renewals (default: a third of --lease-seconds)'
+        )
+        parser.add_argument(
+            '--forever',
+            action='store_true',
+            help='Keep polling for new jobs instead of exiting when no pending symbols are left'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5.0,
+            help='Seconds between polls when nothing can be leased'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=8,
+            help='Number of concurrent fetches in this worker'
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=5.0,
+            help='Fetch requests per second for this worker (0 for no limit)'
+        )
+        parser.add_argument(
+            '--method',
+            choices=PRICE_LOAD_METHODS,
+            default='bulk',
+            help='Price load method'
+        )
+        parser.add_argument(
+            '--period',
+            type=str,
+            default='1y',
+            help='History period for stocks without stored prices'
+        )
+        add_provider_arguments(parser)
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        if options['lease_seconds'] <= 0:
+            raise CommandError('--lease-seconds must be positive')
+        if options['heartbeat'] is not None and not 0 < options['heartbeat'] < options['lease_seconds']:
+            raise CommandError('--heartbeat must be positive and shorter than --lease-seconds')
+
+        worker_id = options['worker_id'] or default_worker_id()
+        self.stdout.write(self.style.SUCCESS(f'Import worker {worker_id} started'))
+
+        def report(log):
+            self.stdout.write(
+                f'job {log.id}: [{log.success_records + log.failed_records}/{log.total_records}] '
+                f'{log.progress:.0%} done, {log.failed_records} failed, status {log.status}'
+            )
+
+        try:
+            stats = work_import_queue(
+                worker_id=worker_id,
+                batch_size=options['batch_size'],
+                lease_seconds=options['lease_seconds'],
+                heartbeat_interval=options['heartbeat'],
+                log_id=options['job'],
+                exit_when_idle=not options['forever'],
+                poll_interval=options['poll_interval'],
+                progress=report,
+                fetcher=provider_from_options(options),
+                concurrency=options['concurrency'],
+                rate=options['rate'],
+                method=options['method'],
+                period=options['period'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Import worker {worker_id} finished: {stats['done']} stocks imported, "
+            f"{stats['failed']} failed, {stats['rows']} rows in {stats['batches']} batches"
+        ))
+        if stats['lost']:
+            self.stdout.write(self.style.WARNING(
+                f"{stats['lost']} results dropped after their leases expired and were taken over"
+            ))
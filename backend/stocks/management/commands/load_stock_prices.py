@@ -0,0 +1,129 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from stocks.bulk import PRICE_FIELDS, copy_stock_prices, upsert_stock_prices
+from stocks.models import Stock
+from stocks.panel import recompute_panel
+from stocks.providers import add_provider_arguments, provider_from_options
+from stocks.utils import PRICE_LOAD_METHODS
+
+
+class Command(BaseCommand):
+    help = 'Backfill price history from the market data provider with a bulk loader (COPY on PostgreSQL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'symbols',
+            nargs='*',
+            help='Stock symbols to load'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Load every stock already in the database'
+        )
+        parser.add_argument(
+            '--period',
+            type=str,
+            default='max',
+            help='History period to load (1y, 5y, 10y, max, ...)'
+        )
+        parser.add_argument(
+            '--method',
+            choices=PRICE_LOAD_METHODS,
+            default=None,
+            help='Price load method (default: copy on PostgreSQL, bulk otherwise)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Number of symbols fetched before each load'
+        )
+        parser.add_argument(
+            '--skip-indicators',
+            action='store_true',
+            help='Do not recompute technical indicators after loading'
+        )
+        add_provider_arguments(parser)
+
+    def handle(self, *args, **options):
+        symbols = [symbol.strip().upper() for symbol in options['symbols'] if symbol.strip()]
+        if options['all']:
+            symbols += [s for s in Stock.objects.values_list('symbol', flat=True) if s not in symbols]
+        if not symbols:
+            raise CommandError('Give one or more symbols or --all')
+
+        method = options['method'] or ('copy' if connection.vendor == 'postgresql' else 'bulk')
+        if method == 'copy' and connection.vendor != 'postgresql':
+            raise CommandError('The copy method requires PostgreSQL')
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be positive')
+
+        provider = provider_from_options(options)
+        self.stdout.write(self.style.SUCCESS(
+            f'Loading {len(symbols)} stocks with the {method} loader...'
+        ))
+
+        started = time.perf_counter()
+        load_seconds = 0.0
+        total_rows = 0
+        failed = []
+
+        for start in range(0, len(symbols), batch_size):
+            batch = symbols[start:start + batch_size]
+
+            # Fetch the whole batch first so the load is one statement
+            fetched = []
+            for symbol in batch:
+                result = provider.fetch(symbol, period=options['period'])
+                if not result['success']:
+                    failed.append(symbol)
+                    self.stderr.write(f"Failed to fetch data for {symbol}: {result['error']}")
+                    continue
+                stock, _ = Stock.objects.get_or_create(symbol=symbol, defaults={'name': symbol})
+                fetched.append((stock, result['price_data']))
+
+            if not fetched:
+                continue
+
+            if method == 'copy':
+                stats = copy_stock_prices(
+                    (stock.id, record['date'], *(record[field] for field in PRICE_FIELDS))
+                    for stock, price_data in fetched
+                    for record in price_data
+                )
+            else:
+                stats = {'rows': 0, 'seconds': 0.0}
+                for stock, price_data in fetched:
+                    stock_stats = upsert_stock_prices(stock.id, price_data)
+                    stats['rows'] += stock_stats['rows']
+                    stats['seconds'] += stock_stats['seconds']
+
+            load_seconds += stats['seconds']
+            total_rows += stats['rows']
+
+            if not options['skip_indicators']:
+                recompute_panel([stock.symbol for stock, _ in fetched])
+
+            done = min(start + batch_size, len(symbols))
+            self.stdout.write(
+                f'[{done}/{len(symbols)}] {total_rows} rows, '
+                f'{total_rows / load_seconds if load_seconds > 0 else 0:.0f} rows/s loading'
+            )
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Price load completed!\n'
+                f'Stocks loaded: {len(symbols) - len(failed)}\n'
+                f'Rows loaded: {total_rows}\n'
+                f'Load throughput: {total_rows / load_seconds if load_seconds > 0 else 0:.0f} rows/s\n'
+                f'Elapsed: {elapsed:.1f}s'
+            )
+        )
+        if failed:
+            self.stdout.write(self.style.ERROR(f"Failed stocks: {', '.join(failed)}"))
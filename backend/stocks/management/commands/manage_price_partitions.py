@@ -0,0 +1,71 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from stocks import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        'List, create, detach or attach the yearly partitions of the stock_prices table (PostgreSQL). '
+        'Migration stocks 0010 partitions the table: it copies the bars while writes go on, blocks writes '
+        'only for the final swap, and needs free disk space for a second copy of the table and its indexes. '
+        'Creating a year that has bars in the default partition moves them while writes to stock_prices wait.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--create-ahead',
+            type=int,
+            default=None,
+            metavar='YEARS',
+            help='Create the partitions of the current year and this many following years'
+        )
+        parser.add_argument(
+            '--create-from',
+            type=int,
+            default=None,
+            metavar='YEAR',
+            help='Create the partitions from this year up to the current year, e.g. before a backfill'
+        )
+        parser.add_argument(
+            '--detach-before',
+            type=int,
+            default=None,
+            metavar='YEAR',
+            help='Detach the partitions of years before this one, keeping them as tables for archiving'
+        )
+        parser.add_argument(
+            '--attach',
+            type=int,
+            default=None,
+            metavar='YEAR',
+            help='Attach the archived partition of a year again'
+        )
+
+    def handle(self, *args, **options):
+        this_year = date.today().year
+        try:
+            if options['create_from'] is not None:
+                if options['create_from'] > this_year:
+                    raise CommandError('--create-from must not be after the current year')
+                self.report('Created', partitions.create_year_partitions(options['create_from'], this_year))
+            if options['create_ahead'] is not None:
+                if options['create_ahead'] < 0:
+                    raise CommandError('--create-ahead must not be negative')
+                self.report('Created', partitions.create_future_partitions(options['create_ahead']))
+            if options['attach'] is not None:
+                self.report('Attached', [partitions.attach_partition(options['attach'])])
+            if options['detach_before'] is not None:
+                self.report('Detached', partitions.detach_partitions_before(options['detach_before']))
+
+            for partition in partitions.list_partitions():
+                self.stdout.write(f"{partition['name']:<28} {partition['rows']:>12,} rows  {partition['bounds']}")
+        except ValueError as e:
+            raise CommandError(str(e))
+
+    def report(self, action, names):
+        if names:
+            self.stdout.write(self.style.SUCCESS(f"{action} {', '.join(names)}"))
+        else:
+            self.stdout.write(f'{action} no partitions')
@@ -0,0 +1,140 @@
+import multiprocessing
+import os
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _init_worker():
+    """
+    Give each worker process its own Django setup and database connections
+    """
+    import django
+    from django.db import connections
+
+    django.setup()
+    # Never reuse a connection inherited from the parent process
+    connections.close_all()
+
+
+def _recompute_chunk(args):
+    """
+    Recalculate indicators for one chunk of symbols inside a worker
+    """
+    symbols, since, strategy = args
+    from stocks.panel import recompute_panel
+
+    try:
+        stats = recompute_panel(symbols, since=since, strategy=strategy)
+        stats['failed'] = []
+        return stats
+    except Exception as e:
+        return {'symbols': len(symbols), 'rows': 0, 'failed': symbols, 'error': str(e)}
+
+
+class Command(BaseCommand):
+    help = 'Recompute technical indicators for the whole stock universe in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of worker processes (1 runs in-process)'
+        )
+        parser.add_argument(
+            '--symbols',
+            type=str,
+            default='',
+            help='Comma-separated symbols to recompute (default: all stocks)'
+        )
+        parser.add_argument(
+            '--since',
+            type=date.fromisoformat,
+            default=None,
+            help='Only rewrite bars on or after this date (YYYY-MM-DD); earlier bars are still used for warm-up'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=50,
+            help='Number of symbols per task, which bounds worker memory'
+        )
+        parser.add_argument(
+            '--strategy',
+            choices=['auto', 'bulk_update', 'executemany', 'temp_table'],
+            default='auto',
+            help='Bulk write strategy'
+        )
+
+    def handle(self, *args, **options):
+        from django.db import connections
+        from stocks.models import Stock
+
+        workers = options['workers']
+        chunk_size = options['chunk_size']
+        since = options['since']
+        if workers < 1 or chunk_size < 1:
+            raise CommandError('--workers and --chunk-size must be positive')
+
+        stocks = Stock.objects.order_by('symbol')
+        if options['symbols']:
+            requested = [s.strip().upper() for s in options['symbols'].split(',') if s.strip()]
+            stocks = stocks.filter(symbol__in=requested)
+        if since:
+            stocks = stocks.filter(prices__date__gte=since).distinct()
+        symbols = list(stocks.values_list('symbol', flat=True))
+
+        if not symbols:
+            self.stdout.write(self.style.WARNING('No stocks to recompute'))
+            return
+
+        chunks = [
+            (symbols[i:i + chunk_size], since, options['strategy'])
+            for i in range(0, len(symbols), chunk_size)
+        ]
+        self.stdout.write(self.style.SUCCESS(
+            f'Recomputing indicators for {len(symbols)} stocks in {len(chunks)} chunks with {workers} workers...'
+        ))
+
+        started = time.perf_counter()
+        done_symbols = 0
+        total_rows = 0
+        failed = []
+
+        def report(stats):
+            nonlocal done_symbols, total_rows
+            done_symbols += stats['symbols']
+            total_rows += stats['rows']
+            failed.extend(stats['failed'])
+            if stats.get('error'):
+                self.stderr.write(f"Chunk failed: {stats['error']}")
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'[{done_symbols}/{len(symbols)}] {total_rows} rows, '
+                f'{total_rows / elapsed if elapsed > 0 else 0:.0f} rows/s'
+            )
+
+        if workers == 1:
+            for chunk in chunks:
+                report(_recompute_chunk(chunk))
+        else:
+            # Children must open their own connections rather than share the parent's socket
+            connections.close_all()
+            with multiprocessing.Pool(processes=min(workers, len(chunks)), initializer=_init_worker) as pool:
+                for stats in pool.imap_unordered(_recompute_chunk, chunks):
+                    report(stats)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Indicator recompute completed!\n'
+                f'Stocks processed: {done_symbols - len(failed)}\n'
+                f'Rows written: {total_rows}\n'
+                f'Elapsed: {elapsed:.1f}s'
+            )
+        )
+        if failed:
+            # A non-zero exit status, so scheduled recomputes notice failed chunks
+            raise CommandError(f"Failed stocks: {', '.join(failed)}")
@@ -0,0 +1,79 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from stocks.fundamentals import refresh_fundamentals
+from stocks.providers import add_provider_arguments, provider_from_options
+
+
+class Command(BaseCommand):
+    help = 'Refresh stock names, sectors and fundamental ratios that are older than the staleness threshold'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'symbols',
+            nargs='*',
+            help='Stock symbols to refresh (default: all stale stocks)'
+        )
+        parser.add_argument(
+            '--max-age-hours',
+            type=float,
+            default=None,
+            help='Refresh stocks whose fundamentals are older than this (default: settings.STOCK_FUNDAMENTALS_MAX_AGE_HOURS)'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Refresh the selected stocks regardless of age'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=4,
+            help='Number of concurrent fetches'
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=2.0,
+            help='Fetch requests per second across all threads (0 for no limit)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Stocks written per bulk update'
+        )
+        add_provider_arguments(parser)
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--concurrency and --batch-size must be positive')
+
+        symbols = [symbol.strip().upper() for symbol in options['symbols'] if symbol.strip()] or None
+        if options['force']:
+            max_age = timedelta(0)
+        elif options['max_age_hours'] is not None:
+            max_age = timedelta(hours=options['max_age_hours'])
+        else:
+            max_age = None
+
+        stats = refresh_fundamentals(
+            symbols=symbols,
+            max_age=max_age,
+            provider=provider_from_options(options),
+            concurrency=options['concurrency'],
+            rate=options['rate'],
+            batch_size=options['batch_size'],
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Fundamentals refresh completed!\n'
+                f"Stale stocks: {stats['stale']}\n"
+                f"Refreshed: {stats['refreshed']}\n"
+                f"Elapsed: {stats['seconds']:.1f}s"
+            )
+        )
+        if stats['failed']:
+            self.stdout.write(self.style.ERROR(f"Failed stocks: {', '.join(stats['failed'])}"))
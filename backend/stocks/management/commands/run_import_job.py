@@ -0,0 +1,135 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from stocks.jobs import create_import_job, requeue_failed, run_import_job
+from stocks.models import Stock, StockDataImportLog
+from stocks.providers import add_provider_arguments, provider_from_options
+from stocks.utils import PRICE_LOAD_METHODS
+
+
+class Command(BaseCommand):
+    help = 'Run a checkpointed import job over many stocks, or resume or retry an earlier one'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'symbols',
+            nargs='*',
+            help='Stock symbols for a new job'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Create a job for every stock already in the database'
+        )
+        parser.add_argument(
+            '--resume',
+            type=int,
+            default=None,
+            metavar='LOG_ID',
+            help='Continue the pending symbols of an existing job'
+        )
+        parser.add_argument(
+            '--retry-failed',
+            type=int,
+            default=None,
+            metavar='LOG_ID',
+            help="Import the failed symbols of an existing job again, keeping the successful ones"
+        )
+        parser.add_argument(
+            '--enqueue',
+            action='store_true',
+            help='Only queue the job (or its failed symbols) for import_worker processes'
+        )
+        parser.add_argument(
+            '--checkpoint-every',
+            type=int,
+            default=25,
+            help='Symbols processed between progress updates of the import log'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=8,
+            help='Number of concurrent fetches'
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=5.0,
+            help='Fetch requests per second across all threads (0 for no limit)'
+        )
+        parser.add_argument(
+            '--method',
+            choices=PRICE_LOAD_METHODS,
+            default='bulk',
+            help='Price load method'
+        )
+        parser.add_argument(
+            '--period',
+            type=str,
+            default='1y',
+            help='History period for stocks without stored prices'
+        )
+        add_provider_arguments(parser)
+
+    def handle(self, *args, **options):
+        existing_id = options['resume'] or options['retry_failed']
+        if options['resume'] and options['retry_failed']:
+            raise CommandError('Use either --resume or --retry-failed')
+        if options['checkpoint_every'] < 1:
+            raise CommandError('--checkpoint-every must be positive')
+
+        if existing_id:
+            try:
+                log = StockDataImportLog.objects.get(id=existing_id)
+            except StockDataImportLog.DoesNotExist:
+                raise CommandError(f'Import log {existing_id} does not exist')
+        else:
+            symbols = list(options['symbols'])
+            if options['all']:
+                symbols += list(Stock.objects.values_list('symbol', flat=True))
+            if not symbols:
+                raise CommandError('Give one or more symbols, --all, --resume or --retry-failed')
+            log = create_import_job(symbols)
+
+        if options['enqueue']:
+            if options['retry_failed']:
+                requeue_failed(log)
+            pending = log.items.filter(status='pending').count()
+            self.stdout.write(self.style.SUCCESS(
+                f'Queued import job {log.id} with {pending} pending symbols; '
+                f'start workers with: manage.py import_worker --job {log.id}'
+            ))
+            return
+
+        self.stdout.write(self.style.SUCCESS(f'Running import job {log.id}...'))
+
+        def report(log):
+            self.stdout.write(
+                f'[{log.success_records + log.failed_records}/{log.total_records}] '
+                f'{log.progress:.0%} done, {log.failed_records} failed, '
+                f'{log.rows_imported} rows, {log.records_per_second:.1f} stocks/s'
+            )
+
+        try:
+            log = run_import_job(
+                log,
+                retry_failed=bool(options['retry_failed']),
+                checkpoint_every=options['checkpoint_every'],
+                progress=report,
+                fetcher=provider_from_options(options),
+                concurrency=options['concurrency'],
+                rate=options['rate'],
+                method=options['method'],
+                period=options['period'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if log.status == 'success':
+            self.stdout.write(self.style.SUCCESS(f'Import job {log.id} completed!'))
+        elif log.status == 'processing':
+            self.stdout.write(f'Import workers are still importing the remaining symbols of job {log.id}')
+        else:
+            failed = log.items.filter(status='failed').values_list('symbol', flat=True)
+            self.stdout.write(self.style.ERROR(f"Failed stocks: {', '.join(failed)}"))
+            self.stdout.write(f'Retry them with: manage.py run_import_job --retry-failed {log.id}')
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0002_delete_stocknews'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockIndicatorState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_date', models.DateField(verbose_name='Last Date')),
+                ('last_close', models.FloatField(verbose_name='Last Close Price')),
+                ('ema_12', models.FloatField(blank=True, null=True, verbose_name='12-Day EMA')),
+                ('ema_26', models.FloatField(blank=True, null=True, verbose_name='26-Day EMA')),
+                ('macd_signal', models.FloatField(blank=True, null=True, verbose_name='MACD Signal')),
+                ('rsi_avg_gain', models.FloatField(blank=True, null=True, verbose_name='RSI Average Gain')),
+                ('rsi_avg_loss', models.FloatField(blank=True, null=True, verbose_name='RSI Average Loss')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+                ('stock', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='indicator_state', to='stocks.stock', verbose_name='Stock')),
+            ],
+            options={
+                'verbose_name': 'Stock Indicator State',
+                'verbose_name_plural': 'Stock Indicator States',
+                'db_table': 'stock_indicator_states',
+            },
+        ),
+    ]
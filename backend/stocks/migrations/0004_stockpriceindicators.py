@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0003_stockindicatorstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockPriceIndicators',
+            fields=[
+                ('price', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='float_indicators', serialize=False, to='stocks.stockprice', verbose_name='Stock Price')),
+                ('ma_5', models.FloatField(blank=True, null=True, verbose_name='5-Day MA')),
+                ('ma_10', models.FloatField(blank=True, null=True, verbose_name='10-Day MA')),
+                ('ma_20', models.FloatField(blank=True, null=True, verbose_name='20-Day MA')),
+                ('ma_50', models.FloatField(blank=True, null=True, verbose_name='50-Day MA')),
+                ('ema_12', models.FloatField(blank=True, null=True, verbose_name='12-Day EMA')),
+                ('ema_26', models.FloatField(blank=True, null=True, verbose_name='26-Day EMA')),
+                ('macd', models.FloatField(blank=True, null=True, verbose_name='MACD')),
+                ('macd_signal', models.FloatField(blank=True, null=True, verbose_name='MACD Signal')),
+                ('macd_histogram', models.FloatField(blank=True, null=True, verbose_name='MACD Histogram')),
+                ('rsi', models.FloatField(blank=True, null=True, verbose_name='RSI')),
+            ],
+            options={
+                'verbose_name': 'Stock Price Indicators',
+                'verbose_name_plural': 'Stock Price Indicators',
+                'db_table': 'stock_price_indicators',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0004_stockpriceindicators'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stock',
+            name='fundamentals_updated_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Fundamentals Updated At'),
+        ),
+    ]
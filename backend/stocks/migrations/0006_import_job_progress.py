@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0005_stock_fundamentals_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockdataimportlog',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Finished At'),
+        ),
+        migrations.AddField(
+            model_name='stockdataimportlog',
+            name='resumed_records',
+            field=models.IntegerField(default=0, verbose_name='Records Done Before Last Start'),
+        ),
+        migrations.AddField(
+            model_name='stockdataimportlog',
+            name='rows_imported',
+            field=models.BigIntegerField(default=0, verbose_name='Rows Imported'),
+        ),
+        migrations.AddField(
+            model_name='stockdataimportlog',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Started At'),
+        ),
+        migrations.CreateModel(
+            name='StockImportItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=10, verbose_name='Stock Symbol')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20, verbose_name='Status')),
+                ('attempts', models.IntegerField(default=0, verbose_name='Attempts')),
+                ('rows', models.IntegerField(default=0, verbose_name='Rows Imported')),
+                ('error_message', models.TextField(blank=True, null=True, verbose_name='Error Message')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+                ('log', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='stocks.stockdataimportlog', verbose_name='Import Log')),
+            ],
+            options={
+                'verbose_name': 'Stock Import Item',
+                'verbose_name_plural': 'Stock Import Items',
+                'db_table': 'stock_import_items',
+                'indexes': [models.Index(fields=['log', 'status'], name='stock_impor_log_id_72cc33_idx')],
+                'unique_together': {('log', 'symbol')},
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0006_import_job_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockimportitem',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Lease Expires At'),
+        ),
+        migrations.AddField(
+            model_name='stockimportitem',
+            name='leased_by',
+            field=models.CharField(blank=True, max_length=100, null=True, verbose_name='Leased By'),
+        ),
+        migrations.AddIndex(
+            model_name='stockimportitem',
+            index=models.Index(fields=['status', 'lease_expires_at'], name='stock_impor_status_fb847f_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0008_stock_price_latest_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='stockpriceindicators',
+            name='price',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='float_indicators', serialize=False, to='stocks.stockprice', verbose_name='Stock Price'),
+        ),
+    ]
@@ -0,0 +1,226 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:22
+
+import re
+from datetime import date
+
+from django.db import migrations, transaction
+
+TABLE = 'stock_prices'
+
+# Yearly partitions created past the current year; stocks.partitions adds more later
+YEARS_AHEAD = 2
+
+# Rows copied per transaction, as a range scan of the old table's primary key
+BATCH_ROWS = 500_000
+
+# Keys written to stock_prices while it is being copied, recorded by a temporary trigger
+CHANGES = f'{TABLE}_migration_changes'
+
+
+def _temporary_name(name):
+    """
+    Name of a constraint or index of the new table until the old table frees the real one
+    """
+    return f'{name[:59]}_new'
+
+
+def _table_definition(cursor):
+    """
+    Constraints and plain indexes of stock_prices, as SQL to recreate them
+    """
+    cursor.execute(
+        "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'f', 'c') ORDER BY contype DESC",
+        [TABLE]
+    )
+    constraints = cursor.fetchall()
+    names = {name for name, _, _ in constraints}
+    cursor.execute(
+        "SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s",
+        [TABLE]
+    )
+    indexes = [(name, definition) for name, definition in cursor.fetchall() if name not in names]
+    return constraints, indexes
+
+
+def _cleanup(cursor, new_table):
+    """
+    Remove what an interrupted earlier run left behind
+    """
+    cursor.execute(f"DROP TRIGGER IF EXISTS {CHANGES} ON {TABLE}")
+    cursor.execute(f"DROP FUNCTION IF EXISTS {CHANGES}()")
+    cursor.execute(f"DROP TABLE IF EXISTS {CHANGES}")
+    cursor.execute(f"DROP TABLE IF EXISTS {new_table}")
+
+
+def _rebuild_table(schema_editor, new_table, create_table, primary_key, finish):
+    """
+    Replace stock_prices with new_table while writes to it go on
+
+    1. create_table creates new_table, and a trigger starts recording the keys
+       of every bar written to stock_prices.
+    2. The rows are copied in primary key batches, each in its own transaction.
+    3. Constraints and indexes are built on new_table under temporary names.
+    4. One short transaction blocks writes (reads go on), copies the recorded
+       bars again, drops stock_prices and renames new_table and its
+       constraints and indexes into place.
+
+    Writes only wait for the last step, which takes time in proportion to the
+    bars written during the copy. The database needs free disk space for a
+    second copy of the table and its indexes until the old table is dropped.
+    """
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        _cleanup(cursor, new_table)
+        constraints, indexes = _table_definition(cursor)
+        try:
+            create_table(cursor)
+
+            cursor.execute(f"CREATE TABLE {CHANGES} (stock_id bigint NOT NULL, date date NOT NULL)")
+            cursor.execute(
+                f"CREATE FUNCTION {CHANGES}() RETURNS trigger LANGUAGE plpgsql AS $$ BEGIN "
+                f"IF TG_OP <> 'INSERT' THEN INSERT INTO {CHANGES} VALUES (OLD.stock_id, OLD.date); END IF; "
+                f"IF TG_OP <> 'DELETE' THEN INSERT INTO {CHANGES} VALUES (NEW.stock_id, NEW.date); END IF; "
+                f"RETURN NULL; END $$"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER {CHANGES} AFTER INSERT OR UPDATE OR DELETE ON {TABLE} "
+                f"FOR EACH ROW EXECUTE FUNCTION {CHANGES}()"
+            )
+
+            cursor.execute(f"SELECT COALESCE(max(id), 0) FROM {TABLE}")
+            last_id = cursor.fetchone()[0]
+            for start in range(0, last_id + 1, BATCH_ROWS):
+                cursor.execute(
+                    f"INSERT INTO {new_table} SELECT * FROM {TABLE} WHERE id >= %s AND id < %s",
+                    [start, start + BATCH_ROWS]
+                )
+
+            # Constraints and indexes are added after the copy, which is much faster than
+            # maintaining them row by row
+            renames = []
+            for name, kind, definition in constraints:
+                if kind == 'p':
+                    definition = primary_key
+                cursor.execute(f"ALTER TABLE {new_table} ADD CONSTRAINT {_temporary_name(name)} {definition}")
+                renames.append(f"ALTER TABLE {TABLE} RENAME CONSTRAINT {_temporary_name(name)} TO {name}")
+            for name, definition in indexes:
+                cursor.execute(re.sub(
+                    rf'INDEX {name} ON (ONLY )?(\S+\.)?{TABLE} ',
+                    f'INDEX {_temporary_name(name)} ON {new_table} ',
+                    definition
+                ))
+                renames.append(f"ALTER INDEX {_temporary_name(name)} RENAME TO {name}")
+            cursor.execute(f"ANALYZE {new_table}")
+
+            with transaction.atomic(using=connection.alias):
+                cursor.execute(f"LOCK TABLE {TABLE} IN EXCLUSIVE MODE")
+                # Deferred foreign key checks of the copied bars would block the ALTER TABLEs below
+                cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+                cursor.execute(
+                    f"CREATE TEMP TABLE changed_keys ON COMMIT DROP AS SELECT DISTINCT stock_id, date FROM {CHANGES}"
+                )
+                cursor.execute(
+                    f"DELETE FROM {new_table} n USING changed_keys c WHERE n.stock_id = c.stock_id AND n.date = c.date"
+                )
+                cursor.execute(
+                    f"INSERT INTO {new_table} SELECT t.* FROM {TABLE} t "
+                    f"JOIN changed_keys c ON t.stock_id = c.stock_id AND t.date = c.date"
+                )
+                cursor.execute(f"DROP TABLE {TABLE}")
+                cursor.execute(f"DROP FUNCTION {CHANGES}()")
+                cursor.execute(f"DROP TABLE {CHANGES}")
+                cursor.execute(f"ALTER TABLE {new_table} RENAME TO {TABLE}")
+                for statement in renames:
+                    cursor.execute(statement)
+                finish(cursor)
+        except Exception:
+            _cleanup(cursor, new_table)
+            raise
+
+
+def _create_partitioned_table(cursor):
+    """
+    Create stock_prices_partitioned with one partition per year of stored bars and a default partition
+    """
+    cursor.execute(f"SELECT min(date), max(date) FROM {TABLE}")
+    first, last = cursor.fetchone()
+    this_year = date.today().year
+    first_year = first.year if first else this_year
+    last_year = max(last.year if last else this_year, this_year) + YEARS_AHEAD
+
+    cursor.execute(f"CREATE TABLE {TABLE}_partitioned (LIKE {TABLE}) PARTITION BY RANGE (date)")
+    for year in range(first_year, last_year + 1):
+        cursor.execute(
+            f"CREATE TABLE {TABLE}_y{year} PARTITION OF {TABLE}_partitioned "
+            f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+        )
+    # Bars outside every yearly partition (old backfills) land here until their year is created
+    cursor.execute(f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE}_partitioned DEFAULT")
+
+
+def _create_plain_table(cursor):
+    """
+    Create stock_prices_plain, an unpartitioned table with the columns of stock_prices
+    """
+    cursor.execute(f"CREATE TABLE {TABLE}_plain (LIKE {TABLE})")
+
+
+def _use_owned_sequence(cursor):
+    """
+    Identity columns need PostgreSQL 17 on partitioned tables, so ids come from an owned sequence
+    """
+    cursor.execute(f"CREATE SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id")
+    cursor.execute(f"ALTER TABLE {TABLE} ALTER COLUMN id SET DEFAULT nextval('{TABLE}_id_seq')")
+    cursor.execute(f"SELECT setval('{TABLE}_id_seq', COALESCE(max(id), 0) + 1, false) FROM {TABLE}")
+
+
+def _use_identity(cursor):
+    """
+    Generate ids of the plain table with an identity column again, like Django creates it
+    """
+    cursor.execute(f"ALTER TABLE {TABLE} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY")
+    cursor.execute(
+        f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), COALESCE(max(id), 0) + 1, false) FROM {TABLE}"
+    )
+
+
+def partition_stock_prices(apps, schema_editor):
+    """
+    Turn stock_prices into a table range partitioned by date, one partition per year
+
+    Unique keys of a partitioned table must contain the partition key, so the
+    primary key becomes (id, date). See _rebuild_table for locking and disk needs.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    _rebuild_table(
+        schema_editor, f'{TABLE}_partitioned', _create_partitioned_table, 'PRIMARY KEY (id, date)', _use_owned_sequence
+    )
+
+
+def unpartition_stock_prices(apps, schema_editor):
+    """
+    Turn the partitioned stock_prices back into a plain table
+
+    Rows of detached partitions are not brought back.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    _rebuild_table(schema_editor, f'{TABLE}_plain', _create_plain_table, 'PRIMARY KEY (id)', _use_identity)
+
+
+class Migration(migrations.Migration):
+
+    # The copy runs in batches of its own transactions, see _rebuild_table
+    atomic = False
+
+    dependencies = [
+        ('stocks', '0009_stock_price_indicators_no_constraint'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_stock_prices, unpartition_stock_prices),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:43
+
+from django.db import migrations, models
+
+
+def split_csv_import_types(apps, schema_editor):
+    """
+    Give metadata CSV uploads their own type, leaving 'csv' to the price history importer
+
+    Uploads go through ExcelImportView, which records the user; the
+    import_price_file command does not.
+    """
+    StockDataImportLog = apps.get_model('stocks', 'StockDataImportLog')
+    StockDataImportLog.objects.filter(import_type='csv', created_by__isnull=False).update(import_type='stock_csv')
+    StockDataImportLog.objects.filter(import_type='price_file').update(import_type='csv')
+
+
+def merge_csv_import_types(apps, schema_editor):
+    StockDataImportLog = apps.get_model('stocks', 'StockDataImportLog')
+    StockDataImportLog.objects.filter(import_type='stock_csv').update(import_type='csv')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0010_partition_stock_prices'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='stockdataimportlog',
+            name='import_type',
+            field=models.CharField(choices=[('api', 'API Import'), ('excel', 'Excel Import'), ('csv', 'Price History Import'), ('stock_csv', 'Stock CSV Import')], max_length=20, verbose_name='Import Type'),
+        ),
+        migrations.RunPython(split_csv_import_types, merge_csv_import_types),
+    ]
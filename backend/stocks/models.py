@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
 from decimal import Decimal
@@ -22,6 +23,7 @@ class Stock(models.Model):
     pe_ratio = models.FloatField(blank=True, null=True, verbose_name='P/E Ratio')
     pb_ratio = models.FloatField(blank=True, null=True, verbose_name='P/B Ratio')
     dividend_yield = models.FloatField(blank=True, null=True, verbose_name='Dividend Yield')
+    fundamentals_updated_at = models.DateTimeField(blank=True, null=True, verbose_name='Fundamentals Updated At')
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created At')
@@ -76,11 +78,92 @@ class StockPrice(models.Model):
         verbose_name_plural = 'Stock Prices'
         unique_together = ['stock', 'date']
         ordering = ['-date']
+        indexes = [
+            # Newest-first price history of one stock; close and volume are included
+            # so the latest price lookup is answered from the index alone (PostgreSQL)
+            models.Index(
+                fields=['stock', '-date'],
+                include=['close_price', 'volume'],
+                name='stock_prices_latest_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.stock.symbol} - {self.date}"
 
 
+class StockPriceIndicators(models.Model):
+    """
+    Float-Native Technical Indicator Model
+
+    Used instead of the DecimalField indicator columns on StockPrice when
+    settings.STOCK_INDICATOR_STORAGE is 'float'.
+    """
+    # No database constraint: stock_prices is partitioned by date on PostgreSQL,
+    # and a foreign key cannot reference its id alone; deletes cascade in Django
+    price = models.OneToOneField(
+        StockPrice, on_delete=models.CASCADE, primary_key=True, db_constraint=False,
+        related_name='float_indicators', verbose_name='Stock Price'
+    )
+
+    ma_5 = models.FloatField(blank=True, null=True, verbose_name='5-Day MA')
+    ma_10 = models.FloatField(blank=True, null=True, verbose_name='10-Day MA')
+    ma_20 = models.FloatField(blank=True, null=True, verbose_name='20-Day MA')
+    ma_50 = models.FloatField(blank=True, null=True, verbose_name='50-Day MA')
+
+    ema_12 = models.FloatField(blank=True, null=True, verbose_name='12-Day EMA')
+    ema_26 = models.FloatField(blank=True, null=True, verbose_name='26-Day EMA')
+
+    macd = models.FloatField(blank=True, null=True, verbose_name='MACD')
+    macd_signal = models.FloatField(blank=True, null=True, verbose_name='MACD Signal')
+    macd_histogram = models.FloatField(blank=True, null=True, verbose_name='MACD Histogram')
+
+    rsi = models.FloatField(blank=True, null=True, verbose_name='RSI')
+
+    class Meta:
+        db_table = 'stock_price_indicators'
+        verbose_name = 'Stock Price Indicators'
+        verbose_name_plural = 'Stock Price Indicators'
+
+    def __str__(self):
+        return f"{self.price_id}"
+
+
+class StockIndicatorState(models.Model):
+    """
+    Running Technical Indicator State Model
+
+    Holds the recursive EMA/MACD/RSI values as of the last processed bar, so
+    newly appended bars can be processed without reloading the full history.
+    """
+    stock = models.OneToOneField(Stock, on_delete=models.CASCADE, related_name='indicator_state', verbose_name='Stock')
+    last_date = models.DateField(verbose_name='Last Date')
+    last_close = models.FloatField(verbose_name='Last Close Price')
+
+    ema_12 = models.FloatField(blank=True, null=True, verbose_name='12-Day EMA')
+    ema_26 = models.FloatField(blank=True, null=True, verbose_name='26-Day EMA')
+    macd_signal = models.FloatField(blank=True, null=True, verbose_name='MACD Signal')
+    rsi_avg_gain = models.FloatField(blank=True, null=True, verbose_name='RSI Average Gain')
+    rsi_avg_loss = models.FloatField(blank=True, null=True, verbose_name='RSI Average Loss')
+
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At')
+
+    class Meta:
+        db_table = 'stock_indicator_states'
+        verbose_name = 'Stock Indicator State'
+        verbose_name_plural = 'Stock Indicator States'
+
+    def __str__(self):
+        return f"{self.stock.symbol} - {self.last_date}"
+
+    @property
+    def is_seeded(self):
+        """
+        Whether every recursive indicator has enough history to be continued
+        """
+        return None not in (self.ema_12, self.ema_26, self.macd_signal, self.rsi_avg_gain, self.rsi_avg_loss)
+
+
 class UserFavoriteStock(models.Model):
     """
     User Favorite Stock Model
@@ -109,7 +192,8 @@ class StockDataImportLog(models.Model):
         choices=[
             ('api', 'API Import'),
             ('excel', 'Excel Import'),
-            ('csv', 'CSV Import'),
+            ('csv', 'Price History Import'),
+            ('stock_csv', 'Stock CSV Import'),
         ],
         verbose_name='Import Type'
     )
@@ -131,10 +215,14 @@ class StockDataImportLog(models.Model):
     success_records = models.IntegerField(default=0, verbose_name='Success Records')
     failed_records = models.IntegerField(default=0, verbose_name='Failed Records')
     error_message = models.TextField(blank=True, null=True, verbose_name='Error Message')
+    rows_imported = models.BigIntegerField(default=0, verbose_name='Rows Imported')
+    resumed_records = models.IntegerField(default=0, verbose_name='Records Done Before Last Start')
     
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name='Created By')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created At')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At')
+    started_at = models.DateTimeField(blank=True, null=True, verbose_name='Started At')
+    finished_at = models.DateTimeField(blank=True, null=True, verbose_name='Finished At')
     
     class Meta:
         db_table = 'stock_data_import_logs'
@@ -144,3 +232,66 @@ class StockDataImportLog(models.Model):
     
     def __str__(self):
         return f"{self.import_type} - {self.status} - {self.created_at}"
+    
+    @property
+    def progress(self):
+        """
+        Share of records processed so far, from 0 to 1
+        """
+        if not self.total_records:
+            return 0.0
+        return (self.success_records + self.failed_records) / self.total_records
+    
+    @property
+    def records_per_second(self):
+        """
+        Processing throughput since the job was last started or resumed
+        """
+        if not self.started_at:
+            return 0.0
+        end = self.finished_at or timezone.now()
+        elapsed = (end - self.started_at).total_seconds()
+        processed = self.success_records + self.failed_records - self.resumed_records
+        return processed / elapsed if elapsed > 0 else 0.0
+
+
+class StockImportItem(models.Model):
+    """
+    Per-Symbol State of an Import Job
+
+    Each symbol of a StockDataImportLog job is checkpointed here as soon as
+    it is written, so an interrupted job resumes with the pending symbols only.
+    Import workers lease pending items; a lease that is not renewed expires and
+    the item can be taken by another worker.
+    """
+    log = models.ForeignKey(StockDataImportLog, on_delete=models.CASCADE, related_name='items', verbose_name='Import Log')
+    symbol = models.CharField(max_length=10, verbose_name='Stock Symbol')
+    status = models.CharField(
+        max_length=20,
+        choices=[
+            ('pending', 'Pending'),
+            ('done', 'Done'),
+            ('failed', 'Failed'),
+        ],
+        default='pending',
+        verbose_name='Status'
+    )
+    attempts = models.IntegerField(default=0, verbose_name='Attempts')
+    rows = models.IntegerField(default=0, verbose_name='Rows Imported')
+    error_message = models.TextField(blank=True, null=True, verbose_name='Error Message')
+    leased_by = models.CharField(max_length=100, blank=True, null=True, verbose_name='Leased By')
+    lease_expires_at = models.DateTimeField(blank=True, null=True, verbose_name='Lease Expires At')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At')
+    
+    class Meta:
+        db_table = 'stock_import_items'
+        verbose_name = 'Stock Import Item'
+        verbose_name_plural = 'Stock Import Items'
+        unique_together = ['log', 'symbol']
+        indexes = [
+            models.Index(fields=['log', 'status']),
+            models.Index(fields=['status', 'lease_expires_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.log_id} - {self.symbol} - {self.status}"
@@ -0,0 +1,204 @@
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.db import transaction
+
+from .models import Stock, StockPrice, StockIndicatorState
+from .bulk import write_indicator_columns
+from .utils import INDICATOR_FIELDS, calculate_indicator_arrays
+
+# Running state fields, in StockIndicatorState order
+STATE_FIELDS = ['last_close', 'ema_12', 'ema_26', 'macd_signal', 'rsi_avg_gain', 'rsi_avg_loss']
+
+
+def load_price_panel(symbols: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Load close prices for many stocks into one dates x symbols matrix
+
+    Args:
+        symbols: Stock symbols to load, or None for every stock
+
+    Returns:
+        Dictionary with 'dates' (datetime64[D] array), 'symbols', 'stock_ids',
+        'close' (float array, NaN where a stock has no bar) and 'price_ids'
+        (StockPrice ids, 0 where a stock has no bar)
+    """
+    stocks = Stock.objects.order_by('symbol')
+    if symbols is not None:
+        stocks = stocks.filter(symbol__in=list(symbols))
+    stock_list = list(stocks.values_list('id', 'symbol'))
+
+    stock_ids = np.array([stock_id for stock_id, _ in stock_list], dtype=np.int64)
+    rows = list(
+        StockPrice.objects.filter(stock_id__in=stock_ids.tolist())
+        .order_by()
+        .values_list('stock_id', 'date', 'id', 'close_price')
+    )
+
+    if rows:
+        row_stock, row_date, row_id, row_close = zip(*rows)
+        row_dates = np.array(row_date, dtype='datetime64[D]')
+        dates, date_index = np.unique(row_dates, return_inverse=True)
+        # stock_ids is ordered by symbol, not id, so map ids to columns explicitly
+        order = np.argsort(stock_ids)
+        column_index = order[np.searchsorted(stock_ids, np.array(row_stock, dtype=np.int64), sorter=order)]
+    else:
+        dates = np.array([], dtype='datetime64[D]')
+
+    close = np.full((len(dates), len(stock_list)), np.nan)
+    price_ids = np.zeros((len(dates), len(stock_list)), dtype=np.int64)
+    if rows:
+        close[date_index, column_index] = np.array(row_close, dtype=np.float64)
+        price_ids[date_index, column_index] = row_id
+
+    return {
+        'dates': dates,
+        'symbols': [symbol for _, symbol in stock_list],
+        'stock_ids': stock_ids,
+        'close': close,
+        'price_ids': price_ids,
+    }
+
+
+def _left_align(values: np.ndarray, mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Shift each column's valid values to the top so all histories start at row 0
+
+    Returns:
+        Tuple of (aligned matrix, row indices, column indices, aligned row of each valid value)
+    """
+    rank = np.cumsum(mask, axis=0) - 1
+    rows, cols = np.nonzero(mask)
+    aligned_rows = rank[rows, cols]
+
+    length = int(mask.sum(axis=0).max()) if mask.size else 0
+    aligned = np.full((length, values.shape[1]), np.nan)
+    aligned[aligned_rows, cols] = values[rows, cols]
+    return aligned, rows, cols, aligned_rows
+
+
+def compute_panel_indicators(close: np.ndarray) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+    """
+    Calculate the stored indicator columns for every column of a price matrix at once
+
+    Each column is treated like the bar sequence of a single stock: missing
+    dates (listing later, halts, delisting) are skipped rather than breaking
+    the recursions, so results match compute_indicator_columns per symbol.
+
+    Args:
+        close: Close prices of shape (dates, symbols), NaN where there is no bar
+
+    Returns:
+        Tuple of (indicator matrices keyed by field name with NaN where there is
+        no bar, running state arrays of each symbol's last bar)
+    """
+    mask = ~np.isnan(close)
+    aligned, rows, cols, aligned_rows = _left_align(close, mask)
+    aligned_columns, avg_gain, avg_loss = calculate_indicator_arrays(aligned)
+
+    columns = {}
+    for field in INDICATOR_FIELDS:
+        values = np.full(close.shape, np.nan)
+        values[rows, cols] = aligned_columns[field][aligned_rows, cols]
+        columns[field] = values
+
+    # Last bar of each symbol sits at row count - 1 of the aligned matrix
+    counts = mask.sum(axis=0)
+    has_bars = counts > 0
+    last_row = np.maximum(counts - 1, 0)
+    symbol_index = np.arange(close.shape[1])
+    state = {}
+    for field, source in (
+        ('last_close', aligned),
+        ('ema_12', aligned_columns['ema_12']),
+        ('ema_26', aligned_columns['ema_26']),
+        ('macd_signal', aligned_columns['macd_signal']),
+        ('rsi_avg_gain', avg_gain),
+        ('rsi_avg_loss', avg_loss),
+    ):
+        values = np.full(close.shape[1], np.nan)
+        if len(source):
+            values[has_bars] = source[last_row, symbol_index][has_bars]
+        state[field] = values
+
+    return columns, state
+
+
+def save_indicator_states(stock_ids: np.ndarray, dates: np.ndarray, has_bar: np.ndarray,
+                          state: Dict[str, np.ndarray]) -> None:
+    """
+    Upsert the running indicator state of every symbol of a panel that has bars
+
+    Args:
+        stock_ids: Stock ids of the panel columns
+        dates: Panel dates (datetime64[D])
+        has_bar: Boolean (dates, symbols) matrix of the stored bars
+        state: Running state arrays returned by compute_panel_indicators
+    """
+    has_bars = has_bar.any(axis=0)
+    last_row = has_bar.cumsum(axis=0).argmax(axis=0)
+    states = []
+    for j in np.nonzero(has_bars)[0]:
+        values = {field: None if np.isnan(state[field][j]) else float(state[field][j]) for field in STATE_FIELDS}
+        states.append(StockIndicatorState(
+            stock_id=int(stock_ids[j]),
+            last_date=dates[last_row[j]].item(),
+            **values
+        ))
+
+    StockIndicatorState.objects.bulk_create(
+        states,
+        update_conflicts=True,
+        unique_fields=['stock'],
+        update_fields=['last_date'] + STATE_FIELDS + ['updated_at'],
+    )
+
+
+def save_panel_indicators(panel: Dict[str, Any], columns: Dict[str, np.ndarray], state: Dict[str, np.ndarray],
+                          since: Optional[date] = None, strategy: str = 'auto') -> Dict[str, Any]:
+    """
+    Write panel indicator results and running states to the database
+
+    Args:
+        panel: Panel returned by load_price_panel
+        columns: Indicator matrices returned by compute_panel_indicators
+        state: Running state arrays returned by compute_panel_indicators
+        since: Only write rows dated on or after this date
+        strategy: Bulk write strategy passed to write_indicator_columns
+
+    Returns:
+        Write statistics from write_indicator_columns
+    """
+    write_mask = panel['price_ids'] > 0
+    if since is not None:
+        write_mask &= (panel['dates'] >= np.datetime64(since, 'D'))[:, None]
+
+    price_ids = panel['price_ids'][write_mask]
+    flat_columns = {field: values[write_mask] for field, values in columns.items()}
+
+    with transaction.atomic():
+        stats = write_indicator_columns(price_ids.tolist(), flat_columns, strategy=strategy)
+        save_indicator_states(panel['stock_ids'], panel['dates'], panel['price_ids'] > 0, state)
+
+    return stats
+
+
+def recompute_panel(symbols: Optional[List[str]] = None, since: Optional[date] = None,
+                    strategy: str = 'auto') -> Dict[str, Any]:
+    """
+    Recalculate indicators for many stocks with one matrix computation
+
+    Args:
+        symbols: Stock symbols, or None for every stock
+        since: Only write rows dated on or after this date (history before it is still used for warm-up)
+        strategy: Bulk write strategy passed to write_indicator_columns
+
+    Returns:
+        Write statistics with the number of symbols processed
+    """
+    panel = load_price_panel(symbols)
+    columns, state = compute_panel_indicators(panel['close'])
+    stats = save_panel_indicators(panel, columns, state, since=since, strategy=strategy)
+    stats['symbols'] = len(panel['symbols'])
+    return stats
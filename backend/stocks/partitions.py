@@ -0,0 +1,181 @@
+import logging
+import re
+from datetime import date
+from typing import Any, Dict, List
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import StockPrice
+
+logger = logging.getLogger('stockanalysis')
+
+
+def _table() -> str:
+    return StockPrice._meta.db_table
+
+
+def partition_name(year: int) -> str:
+    """
+    Name of the stock_prices partition holding one year of bars
+    """
+    return f'{_table()}_y{year}'
+
+
+def default_partition_name() -> str:
+    """
+    Name of the partition catching bars of years without their own partition
+    """
+    return f'{_table()}_default'
+
+
+def is_partitioned() -> bool:
+    """
+    Whether stock_prices is a partitioned table (migration 0010 on PostgreSQL)
+    """
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))",
+                       [_table()])
+        return cursor.fetchone()[0]
+
+
+def _require_partitioned():
+    if not is_partitioned():
+        raise ValueError(f"{_table()} is not partitioned; this needs PostgreSQL and migration stocks 0010")
+
+
+def list_partitions() -> List[Dict[str, Any]]:
+    """
+    Attached partitions of stock_prices
+
+    Returns:
+        Dictionaries with the partition 'name', its 'year' (None for the default
+        partition), 'bounds' and estimated 'rows', ordered by name
+    """
+    _require_partitioned()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass ORDER BY c.relname",
+            [_table()]
+        )
+        rows = cursor.fetchall()
+
+    pattern = re.compile(rf'^{re.escape(_table())}_y(\d{{4}})$')
+    partitions = []
+    for name, bounds, rows_estimate in rows:
+        match = pattern.match(name)
+        partitions.append({
+            'name': name,
+            'year': int(match.group(1)) if match else None,
+            'bounds': bounds,
+            'rows': max(rows_estimate, 0),
+        })
+    return partitions
+
+
+def create_year_partitions(first_year: int, last_year: int) -> List[str]:
+    """
+    Create the missing yearly partitions from first_year to last_year
+
+    Bars of those years already stored in the default partition are moved
+    into the new partitions, which PostgreSQL requires before it accepts them.
+
+    Returns:
+        Names of the partitions created
+    """
+    _require_partitioned()
+    table = _table()
+    attached = {partition['name'] for partition in list_partitions()}
+    missing = [year for year in range(first_year, last_year + 1) if partition_name(year) not in attached]
+    if not missing:
+        return []
+
+    default = default_partition_name()
+    has_default = default in attached
+    with transaction.atomic(), connection.cursor() as cursor:
+        if has_default:
+            cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {default}")
+        for year in missing:
+            start, end = date(year, 1, 1), date(year + 1, 1, 1)
+            cursor.execute(
+                f"CREATE TABLE {partition_name(year)} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)",
+                [start, end]
+            )
+            if has_default:
+                cursor.execute(
+                    f"WITH moved AS (DELETE FROM {default} WHERE date >= %s AND date < %s RETURNING *) "
+                    f"INSERT INTO {table} SELECT * FROM moved",
+                    [start, end]
+                )
+                if cursor.rowcount:
+                    logger.info("Moved %d bars of %d out of %s", cursor.rowcount, year, default)
+        if has_default:
+            cursor.execute(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT")
+
+    return [partition_name(year) for year in missing]
+
+
+def create_future_partitions(years_ahead: int = None) -> List[str]:
+    """
+    Make sure partitions exist for the current year and the next years_ahead years
+
+    Args:
+        years_ahead: Years past the current one, defaults to settings.STOCK_PRICE_PARTITIONS_AHEAD
+
+    Returns:
+        Names of the partitions created
+    """
+    if years_ahead is None:
+        years_ahead = getattr(settings, 'STOCK_PRICE_PARTITIONS_AHEAD', 2)
+    this_year = date.today().year
+    return create_year_partitions(this_year, this_year + years_ahead)
+
+
+def detach_partitions_before(year: int) -> List[str]:
+    """
+    Detach the yearly partitions of bars before a year, for archiving
+
+    Detached partitions stay in the database as plain tables, ready for
+    pg_dump and DROP TABLE, or to be attached again with attach_partition.
+    Their bars disappear from every query, but the float indicator rows of
+    those bars, if any, are kept.
+
+    Returns:
+        Names of the partitions detached
+    """
+    detached = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for partition in list_partitions():
+            if partition['year'] is not None and partition['year'] < year:
+                cursor.execute(f"ALTER TABLE {_table()} DETACH PARTITION {partition['name']}")
+                detached.append(partition['name'])
+    return detached
+
+
+def attach_partition(year: int) -> str:
+    """
+    Attach an archived yearly partition again
+
+    Returns:
+        Name of the attached partition
+
+    Raises:
+        ValueError: If there is no detached table for the year
+    """
+    _require_partitioned()
+    name = partition_name(year)
+    if any(partition['name'] == name for partition in list_partitions()):
+        raise ValueError(f"Partition {name} is already attached")
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [name])
+        if not cursor.fetchone()[0]:
+            raise ValueError(f"There is no table {name} to attach")
+        cursor.execute(
+            f"ALTER TABLE {_table()} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)",
+            [date(year, 1, 1), date(year + 1, 1, 1)]
+        )
+    return name
@@ -0,0 +1,229 @@
+import logging
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from .providers import get_provider
+from .utils import PRICE_LOAD_METHODS, delta_sync_starts, save_stock_data
+
+logger = logging.getLogger('stockanalysis')
+
+# Fetchers take (symbol, period=..., start=...) and return a MarketDataProvider.fetch style result
+Fetcher = Callable[..., Dict[str, Any]]
+
+# Seconds a fetch thread waits on the full result queue before checking whether the writer gave up
+QUEUE_PUT_TIMEOUT = 0.5
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket limiting how many requests start per second
+
+    Args:
+        rate: Tokens added per second (0 or less disables the limit)
+        capacity: Largest burst allowed, defaults to one second's worth of tokens
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Take one token, sleeping until one is available
+        """
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def fetch_with_retries(fetcher: Fetcher, symbol: str, limiter: TokenBucket, retries: int = 3,
+                       base_delay: float = 1.0, max_delay: float = 30.0, **kwargs) -> Dict[str, Any]:
+    """
+    Call a fetcher under the rate limit, retrying transient failures with jittered backoff
+
+    Args:
+        fetcher: Data source callable
+        symbol: Stock symbol
+        limiter: Rate limiter shared by all fetch threads
+        retries: Extra attempts after the first one
+        base_delay: Backoff before the first retry in seconds, doubled on each retry
+        max_delay: Upper bound of a single backoff
+        **kwargs: Passed to the fetcher
+
+    Returns:
+        The last fetch result; exceptions are turned into failed results
+    """
+    for attempt in range(retries + 1):
+        limiter.acquire()
+        try:
+            result = fetcher(symbol, **kwargs)
+        except Exception as e:
+            result = {'success': False, 'error': str(e), 'retryable': True}
+
+        if result['success'] or not result.get('retryable') or attempt == retries:
+            return result
+
+        # Full jitter keeps threads that failed together from retrying together
+        delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+        logger.debug("Fetching %s failed (%s), retrying in %.1fs", symbol, result['error'], delay)
+        time.sleep(delay)
+    return result
+
+
+def run_import_pipeline(symbols: List[str], fetcher: Optional[Fetcher] = None,
+                        concurrency: int = 8, rate: float = 5.0, retries: int = 3, queue_size: int = 32,
+                        method: str = 'bulk', period: str = '1y', full: bool = False,
+                        base_delay: float = 1.0,
+                        progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                        on_result: Optional[Callable[[str, bool, int, Optional[str]], None]] = None) -> Dict[str, Any]:
+    """
+    Import many stocks with concurrent fetches feeding a single database writer
+
+    Fetch threads never touch the database. Their results go through a bounded
+    queue to the calling thread, which writes them one at a time; a full queue
+    makes the fetchers wait, so memory stays bounded when the database is slower
+    than the network. If the writer raises (on_result or progress, for example),
+    pending fetches are cancelled and the exception propagates once the fetch
+    threads have stopped. The fundamentals refresh of the stocks created by the
+    run is queued once, after the last write.
+
+    Args:
+        symbols: Stock symbols to import
+        fetcher: Data source, called as fetcher(symbol, period=..., start=...);
+            defaults to get_provider()
+        concurrency: Number of fetch threads
+        rate: Fetch requests started per second across all threads (0 for no limit)
+        retries: Extra attempts for transient fetch failures
+        queue_size: Fetched results waiting for the writer before fetchers block
+        method: Price load method, 'bulk' or 'copy' (PostgreSQL only)
+        period: History period for stocks without stored prices, or with full=True
+        full: Re-download the whole period instead of syncing the delta
+        base_delay: First retry backoff in seconds
+        progress: Called with the running statistics after every written symbol
+        on_result: Called in the writer thread as on_result(symbol, success, rows, error)
+            once per symbol, including those skipped as already current
+
+    Returns:
+        Statistics with succeeded/failed/skipped symbols, rows written and throughput
+    """
+    if method not in PRICE_LOAD_METHODS:
+        raise ValueError(f"Unknown price load method: {method}")
+    if concurrency < 1 or queue_size < 1:
+        raise ValueError("concurrency and queue_size must be positive")
+
+    fetcher = fetcher or get_provider()
+    started = time.perf_counter()
+    stats = {'symbols': len(symbols), 'succeeded': 0, 'failed': [], 'skipped': 0, 'rows': 0}
+
+    if full:
+        starts = {symbol: (None, False) for symbol in symbols}
+    else:
+        starts = delta_sync_starts(symbols)
+    pending = [symbol for symbol in symbols if not starts[symbol][1]]
+    stats['skipped'] = len(symbols) - len(pending)
+    if on_result:
+        for symbol in symbols:
+            if starts[symbol][1]:
+                on_result(symbol, True, 0, None)
+
+    results = queue.Queue(maxsize=queue_size)
+    limiter = TokenBucket(rate)
+    cancelled = threading.Event()
+
+    def fetch(symbol):
+        if cancelled.is_set():
+            return
+        try:
+            result = fetch_with_retries(
+                fetcher, symbol, limiter, retries=retries, base_delay=base_delay,
+                period=period, start=starts[symbol][0]
+            )
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+        # Waiting on a full queue forever would keep the pool from shutting down once the writer is gone
+        while not cancelled.is_set():
+            try:
+                results.put((symbol, result), timeout=QUEUE_PUT_TIMEOUT)
+                return
+            except queue.Full:
+                pass
+
+    new_stocks: List[str] = []
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='stock-fetch') as executor:
+        try:
+            for symbol in pending:
+                executor.submit(fetch, symbol)
+            _write_results(results, len(pending), stats, started, method, progress, on_result, new_stocks)
+        except BaseException:
+            cancelled.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+            while True:
+                try:
+                    results.get_nowait()
+                except queue.Empty:
+                    break
+            raise
+        finally:
+            # One broker round trip per run instead of one per new stock in the writer loop;
+            # tasks imports this module through jobs
+            from .tasks import queue_fundamentals_refresh
+            queue_fundamentals_refresh(new_stocks)
+
+    elapsed = time.perf_counter() - started
+    stats['seconds'] = elapsed
+    stats['symbols_per_second'] = len(pending) / elapsed if elapsed > 0 else 0.0
+    stats['rows_per_second'] = stats['rows'] / elapsed if elapsed > 0 else 0.0
+    return stats
+
+
+def _write_results(results: queue.Queue, count: int, stats: Dict[str, Any], started: float, method: str,
+                   progress: Optional[Callable[[Dict[str, Any]], None]],
+                   on_result: Optional[Callable[[str, bool, int, Optional[str]], None]],
+                   new_stocks: List[str]) -> None:
+    """
+    Single writer of run_import_pipeline: save exactly count fetched results from the queue,
+    collecting the symbols of the stocks it creates in new_stocks
+    """
+    for _ in range(count):
+        symbol, result = results.get()
+        rows, error = 0, None
+        if result['success']:
+            try:
+                rows = save_stock_data(symbol, result, method=method, new_stocks=new_stocks)
+            except Exception as e:
+                error = str(e)
+                logger.error("Writing %s failed: %s", symbol, e)
+        else:
+            error = result['error']
+            logger.warning("Fetching %s failed: %s", symbol, error)
+
+        if error is None:
+            stats['rows'] += rows
+            stats['succeeded'] += 1
+        else:
+            stats['failed'].append(symbol)
+        if on_result:
+            on_result(symbol, error is None, rows, error)
+
+        elapsed = time.perf_counter() - started
+        stats['seconds'] = elapsed
+        stats['symbols_per_second'] = (stats['succeeded'] + len(stats['failed'])) / elapsed if elapsed > 0 else 0.0
+        if progress:
+            progress(stats)
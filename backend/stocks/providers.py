@@ -0,0 +1,604 @@
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from django.conf import settings
+
+from .synthetic import business_days, generate_ohlcv
+
+# Approximate number of trading days in each yfinance period
+PERIOD_BARS = {
+    '1d': 1, '5d': 5, '1mo': 21, '3mo': 63, '6mo': 126,
+    '1y': 252, '2y': 504, '5y': 1260, '10y': 2520,
+}
+
+# History periods a fetch accepts
+PERIODS = list(PERIOD_BARS) + ['ytd', 'max']
+
+# Columns of a price record, in the order recordings store them
+PRICE_COLUMNS = ['open_price', 'high_price', 'low_price', 'close_price', 'volume']
+
+# Cache writes between full scans of the cache directory, which pick up files
+# written by other processes and remove expired ones
+CACHE_RESCAN_WRITES = 500
+
+# Stock fields returned by fetch_fundamentals
+FUNDAMENTAL_FIELDS = [
+    'name', 'exchange', 'sector', 'industry', 'market_cap', 'description',
+    'pe_ratio', 'pb_ratio', 'dividend_yield',
+]
+
+
+def frame_to_price_data(hist: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Convert a yfinance history frame to price records, column by column
+
+    Args:
+        hist: Frame with Open/High/Low/Close/Volume columns and a DatetimeIndex
+
+    Returns:
+        List of price dictionaries; bars without prices are dropped
+    """
+    hist = hist.dropna(subset=['Open', 'High', 'Low', 'Close'])
+    return [
+        {
+            'date': bar_date,
+            'open_price': open_price,
+            'high_price': high_price,
+            'low_price': low_price,
+            'close_price': close_price,
+            'volume': volume,
+        }
+        for bar_date, open_price, high_price, low_price, close_price, volume in zip(
+            hist.index.date,
+            hist['Open'].to_numpy(dtype=float).tolist(),
+            hist['High'].to_numpy(dtype=float).tolist(),
+            hist['Low'].to_numpy(dtype=float).tolist(),
+            hist['Close'].to_numpy(dtype=float).tolist(),
+            hist['Volume'].fillna(0).to_numpy(dtype=np.int64).tolist(),
+        )
+    ]
+
+
+def first_bar_index(dates, period: str = '1y', start: Optional[date] = None) -> int:
+    """
+    Index of the first of the date-ordered bars that a period or start date asks for
+    """
+    if period == 'ytd' and start is None:
+        start = date(date.today().year, 1, 1)
+    if start is not None:
+        return int(np.searchsorted(np.asarray(dates, dtype='datetime64[D]'), np.datetime64(start)))
+    if period in PERIOD_BARS:
+        return max(0, len(dates) - PERIOD_BARS[period])
+    return 0
+
+
+class MarketDataProvider:
+    """
+    Source of stock information and daily price bars
+
+    Subclasses implement fetch() for price bars and fetch_fundamentals() for
+    the slower-changing stock information. Instances are callable as their
+    fetch(), so they can be passed wherever a fetcher function is expected
+    (see stocks.pipeline).
+    """
+    name = ''
+
+    def fetch(self, symbol: str, period: str = '1y', start: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Fetch daily price bars
+
+        Args:
+            symbol: Stock symbol
+            period: Data period (1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max)
+            start: Only fetch bars from this date onward (overrides period); an empty
+                result is then not an error, as there may be no new bars yet
+
+        Returns:
+            Dictionary with 'success' and either 'price_data', or 'error' (plus
+            'retryable' when another attempt may succeed)
+        """
+        raise NotImplementedError
+
+    def fetch_fundamentals(self, symbol: str) -> Dict[str, Any]:
+        """
+        Fetch stock information and fundamental ratios
+
+        Args:
+            symbol: Stock symbol
+
+        Returns:
+            Dictionary with 'success' and either 'stock_data' (FUNDAMENTAL_FIELDS
+            values), or 'error' (plus 'retryable' when another attempt may succeed)
+        """
+        raise NotImplementedError
+
+    def __call__(self, symbol: str, period: str = '1y', start: Optional[date] = None) -> Dict[str, Any]:
+        return self.fetch(symbol, period=period, start=start)
+
+
+class YFinanceProvider(MarketDataProvider):
+    """
+    Yahoo Finance data through the yfinance package
+    """
+    name = 'yfinance'
+
+    def fetch(self, symbol: str, period: str = '1y', start: Optional[date] = None) -> Dict[str, Any]:
+        try:
+            ticker = yf.Ticker(symbol)
+
+            # Get historical data; ticker.info is slow and rate-limited, see fetch_fundamentals
+            if start is not None:
+                hist = ticker.history(start=start)
+            else:
+                hist = ticker.history(period=period)
+
+            if hist.empty and start is None:
+                return {'success': False, 'error': f'No data found for symbol {symbol}'}
+
+            return {
+                'success': True,
+                'price_data': frame_to_price_data(hist)
+            }
+
+        except Exception as e:
+            # Network and rate-limit errors are worth another attempt, unlike a missing symbol
+            return {'success': False, 'error': str(e), 'retryable': True}
+
+    def fetch_fundamentals(self, symbol: str) -> Dict[str, Any]:
+        try:
+            info = yf.Ticker(symbol).info
+            if not info or not (info.get('longName') or info.get('shortName')):
+                return {'success': False, 'error': f'No information found for symbol {symbol}'}
+
+            # Prepare stock basic information
+            stock_data = {
+                'name': info.get('longName') or info.get('shortName'),
+                'exchange': info.get('exchange', ''),
+                'sector': info.get('sector', ''),
+                'industry': info.get('industry', ''),
+                'market_cap': info.get('marketCap'),
+                'description': info.get('longBusinessSummary', ''),
+                'pe_ratio': info.get('trailingPE'),
+                'pb_ratio': info.get('priceToBook'),
+                'dividend_yield': info.get('dividendYield'),
+            }
+            return {'success': True, 'stock_data': stock_data}
+
+        except Exception as e:
+            # Network and rate-limit errors are worth another attempt, unlike a missing symbol
+            return {'success': False, 'error': str(e), 'retryable': True}
+
+
+class LocalProvider(MarketDataProvider):
+    """
+    Offline provider for tests, benchmarks and load tests
+
+    With a directory, replays responses recorded by RecordingProvider
+    (<directory>/<SYMBOL>.json and <SYMBOL>.fundamentals.json). Without one,
+    generates deterministic synthetic OHLCV with synthetic.generate_ohlcv,
+    seeded from the symbol, over business days since first_date, so repeated
+    and incremental fetches agree with each other.
+
+    Args:
+        directory: Directory of recorded responses, or None for synthetic data
+        latency: Seconds each fetch sleeps, to stand in for network round trips
+        jitter: Extra random latency of up to this many seconds
+        failure_rate: Share of fetches that raise ConnectionError, to exercise retries
+        seed: Seed mixed into every symbol's series and the failure draws
+        first_date: First synthetic bar
+    """
+    name = 'local'
+
+    def __init__(self, directory: Optional[str] = None, latency: float = 0.0, jitter: float = 0.0,
+                 failure_rate: float = 0.0, seed: int = 0, first_date: date = date(2000, 1, 3)):
+        self.directory = Path(directory) if directory else None
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self.first_date = first_date
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _simulate_network(self, symbol: str) -> None:
+        """
+        Sleep for the configured latency and raise the configured share of failures
+        """
+        with self._lock:
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            fail = self._random.random() < self.failure_rate
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            raise ConnectionError(f'Simulated failure fetching {symbol}')
+
+    def fetch(self, symbol: str, period: str = '1y', start: Optional[date] = None) -> Dict[str, Any]:
+        self._simulate_network(symbol)
+
+        if self.directory is not None:
+            recorded = self.directory / f'{symbol}.json'
+            if not recorded.exists():
+                return {'success': False, 'error': f'No data found for symbol {symbol}'}
+            price_data = load_recording(recorded)['price_data']
+            first = first_bar_index([record['date'] for record in price_data], period=period, start=start)
+            price_data = price_data[first:]
+        else:
+            price_data = self._synthetic(symbol, period=period, start=start)
+
+        if not price_data and start is None:
+            return {'success': False, 'error': f'No data found for symbol {symbol}'}
+        return {'success': True, 'price_data': price_data}
+
+    def fetch_fundamentals(self, symbol: str) -> Dict[str, Any]:
+        self._simulate_network(symbol)
+
+        if self.directory is not None:
+            recorded = self.directory / f'{symbol}.fundamentals.json'
+            if not recorded.exists():
+                return {'success': False, 'error': f'No information found for symbol {symbol}'}
+            return {'success': True, 'stock_data': json.loads(recorded.read_text())}
+
+        rng = np.random.default_rng([zlib.crc32(symbol.encode()), self.seed, 1])
+        return {
+            'success': True,
+            'stock_data': {
+                'name': f'{symbol} Synthetic',
+                'exchange': 'LOCAL',
+                'sector': '',
+                'industry': '',
+                'market_cap': int(rng.integers(10 ** 8, 10 ** 12)),
+                'description': '',
+                'pe_ratio': round(float(rng.uniform(5, 60)), 2),
+                'pb_ratio': round(float(rng.uniform(0.5, 15)), 2),
+                'dividend_yield': round(float(rng.uniform(0, 0.05)), 4),
+            },
+        }
+
+    def _synthetic(self, symbol: str, period: str = '1y', start: Optional[date] = None) -> List[Dict[str, Any]]:
+        """
+        Deterministic synthetic price records of a symbol, up to the latest business day
+        """
+        dates = business_days(self.first_date, date.today())
+        bars = generate_ohlcv(len(dates), 1, np.random.default_rng([zlib.crc32(symbol.encode()), self.seed]))
+
+        # The whole path is always drawn so a symbol's bars never depend on what was requested
+        first = first_bar_index(dates, period=period, start=start)
+        columns = [bars[column][first:, 0].tolist() for column in PRICE_COLUMNS]
+        return [
+            dict(zip(['date'] + PRICE_COLUMNS, row))
+            for row in zip(dates[first:].tolist(), *columns)
+        ]
+
+
+class RecordingProvider(MarketDataProvider):
+    """
+    Wraps another provider and saves every successful response for LocalProvider to replay
+
+    Responses of fetches with a start date, such as delta syncs, are merged
+    into the symbol's existing recording by date instead of replacing it.
+
+    Args:
+        provider: Provider whose responses are recorded
+        directory: Directory the <SYMBOL>.json and <SYMBOL>.fundamentals.json recordings are written to
+    """
+    name = 'recording'
+
+    def __init__(self, provider: MarketDataProvider, directory: str):
+        self.provider = provider
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def fetch(self, symbol: str, period: str = '1y', start: Optional[date] = None) -> Dict[str, Any]:
+        result = self.provider.fetch(symbol, period=period, start=start)
+        if result['success']:
+            path = self.directory / f'{symbol}.json'
+            recorded = result
+            if start is not None and path.exists():
+                # Keep the recorded history before start; fetched bars replace recorded ones
+                bars = {record['date']: record for record in load_recording(path)['price_data']}
+                bars.update((record['date'], record) for record in result['price_data'])
+                recorded = {'price_data': [bars[day] for day in sorted(bars)]}
+            save_recording(path, recorded)
+        return result
+
+    def fetch_fundamentals(self, symbol: str) -> Dict[str, Any]:
+        result = self.provider.fetch_fundamentals(symbol)
+        if result['success']:
+            (self.directory / f'{symbol}.fundamentals.json').write_text(json.dumps(result['stock_data']))
+        return result
+
+
+def _live_since() -> date:
+    """
+    First bar date that makes a cached response live: the trading day before today
+    """
+    # utils imports this module
+    from .utils import latest_trading_day
+    return latest_trading_day(date.today() - timedelta(days=1))
+
+
+class CachedProvider(MarketDataProvider):
+    """
+    Read-through on-disk cache of another provider's raw responses
+
+    Successful responses are stored as compressed NumPy column files at
+    <directory>/<SYMBOL>/<period or start>_<fetch date>.npz, so fetching the same
+    range again on the same day is disk I/O only. Entries older than ttl seconds
+    are ignored and removed, and so are responses ending with a bar of today,
+    which may be an intraday bar, or with the previous trading day's bar, fetched
+    before today's was posted, once they are older than live_ttl seconds;
+    when the cache grows past max_bytes the least recently used files are evicted.
+
+    Args:
+        provider: Provider to fetch from on a cache miss
+        directory: Cache root directory
+        ttl: Seconds a cached response stays valid
+        max_bytes: Size the cache is trimmed back to after each write
+        live_ttl: Seconds a cached response ending on or after the previous trading day stays valid
+    """
+    name = 'cached'
+
+    def __init__(self, provider: MarketDataProvider, directory: str, ttl: float = 24 * 3600,
+                 max_bytes: int = 1024 ** 3, live_ttl: float = 15 * 60):
+        self.provider = provider
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.live_ttl = live_ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Size of every cached file, least recently used first; built by the first write
+        self._entries: Optional[OrderedDict] = None
+        self._total = 0
+        self._writes = 0
+
+    def path_for(self, symbol: str, period: str = '1y', start: Optional[date] = None) -> Path:
+        """
+        Cache file of a request made today
+        """
+        key = f'from-{start.isoformat()}' if start is not None else period
+        return self.directory / symbol / f'{key}_{date.today().isoformat()}.npz'
+
+    def fetch(self, symbol: str, period: str = '1y', start: Optional[date] = None) -> Dict[str, Any]:
+        path = self.path_for(symbol, period=period, start=start)
+        cached = self._read(path)
+        if cached is not None:
+            return cached
+
+        result = self.provider.fetch(symbol, period=period, start=start)
+        if result['success']:
+            self._write(path, result)
+        return result
+
+    def fetch_fundamentals(self, symbol: str) -> Dict[str, Any]:
+        # Refreshed rarely by their own job, so not worth caching
+        return self.provider.fetch_fundamentals(symbol)
+
+    def _read(self, path: Path) -> Optional[Dict[str, Any]]:
+        """
+        Load a cached response, or None when it is missing, expired or unreadable
+        """
+        try:
+            age = time.time() - path.stat().st_mtime
+            if age > self.ttl:
+                path.unlink(missing_ok=True)
+                self._used(path, removed=True)
+                return None
+            with np.load(path) as data:
+                columns = {name: data[name] for name in data.files}
+            # Today's bar keeps changing until the close, and a response ending with the previous
+            # session may have been fetched before today's bar was posted
+            if age > self.live_ttl and len(columns['date']) and columns['date'][-1] >= np.datetime64(_live_since()):
+                path.unlink(missing_ok=True)
+                self._used(path, removed=True)
+                return None
+            # Mark as recently used for eviction
+            os.utime(path)
+            self._used(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError):
+            path.unlink(missing_ok=True)
+            self._used(path, removed=True)
+            return None
+
+        dates = columns['date'].tolist()
+        values = [columns[column].tolist() for column in PRICE_COLUMNS]
+        return {
+            'success': True,
+            'price_data': [
+                dict(zip(['date'] + PRICE_COLUMNS, row))
+                for row in zip(dates, *values)
+            ],
+        }
+
+    def _write(self, path: Path, result: Dict[str, Any]) -> None:
+        """
+        Store a response and trim the cache; failures only cost a future cache miss
+        """
+        price_data = result['price_data']
+        columns = {
+            'date': np.array([record['date'] for record in price_data], dtype='datetime64[D]'),
+            'volume': np.array([record['volume'] for record in price_data], dtype=np.int64),
+        }
+        for column in PRICE_COLUMNS[:-1]:
+            columns[column] = np.array([record[column] for record in price_data], dtype=float)
+
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write then rename, so concurrent readers never see a partial file; the temporary
+            # name is unique per process and thread, as workers may share the cache directory
+            partial = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+            with open(partial, 'wb') as handle:
+                np.savez_compressed(handle, **columns)
+            os.replace(partial, path)
+            self._evict(path, path.stat().st_size)
+        except OSError:
+            pass
+
+    def _used(self, path: Path, removed: bool = False) -> None:
+        """
+        Move a cache file to the most recently used end of the index, or drop a removed one
+        """
+        with self._lock:
+            if self._entries is None or path not in self._entries:
+                return
+            if removed:
+                self._total -= self._entries.pop(path)
+            else:
+                self._entries.move_to_end(path)
+
+    def _scan(self) -> None:
+        """
+        Rebuild the index from the cache directory, removing expired files
+        """
+        now = time.time()
+        entries = []
+        for path in self.directory.glob('*/*.npz'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime > self.ttl:
+                path.unlink(missing_ok=True)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        self._entries = OrderedDict((path, size) for _, size, path in sorted(entries))
+        self._total = sum(size for _, size, _ in entries)
+
+    def _evict(self, path: Path, size: int) -> None:
+        """
+        Record a written file, then remove the least recently used files until under max_bytes
+
+        The directory is only scanned on the first write and every
+        CACHE_RESCAN_WRITES writes after it, so a write costs O(1) in between.
+        """
+        with self._lock:
+            self._writes += 1
+            if self._entries is None or self._writes % CACHE_RESCAN_WRITES == 0:
+                self._scan()
+            else:
+                self._total += size - self._entries.pop(path, 0)
+                self._entries[path] = size
+
+            while self._total > self.max_bytes and self._entries:
+                oldest, oldest_size = self._entries.popitem(last=False)
+                oldest.unlink(missing_ok=True)
+                self._total -= oldest_size
+
+
+def save_recording(path: Path, result: Dict[str, Any]) -> None:
+    """
+    Write a fetch result as column-oriented JSON
+    """
+    price_data = result['price_data']
+    payload = {
+        'prices': {
+            'date': [record['date'].isoformat() for record in price_data],
+            **{column: [record[column] for record in price_data] for column in PRICE_COLUMNS},
+        },
+    }
+    Path(path).write_text(json.dumps(payload))
+
+
+def load_recording(path: Path) -> Dict[str, Any]:
+    """
+    Read a fetch result written by save_recording
+    """
+    payload = json.loads(Path(path).read_text())
+    prices = payload['prices']
+    dates = [date.fromisoformat(value) for value in prices['date']]
+    return {
+        'price_data': [
+            dict(zip(['date'] + PRICE_COLUMNS, row))
+            for row in zip(dates, *(prices[column] for column in PRICE_COLUMNS))
+        ],
+    }
+
+
+PROVIDERS = {
+    'yfinance': YFinanceProvider,
+    'local': LocalProvider,
+}
+
+
+def get_provider(name: Optional[str] = None, cache: Optional[bool] = None, **options) -> MarketDataProvider:
+    """
+    Create a market data provider
+
+    Args:
+        name: 'yfinance' or 'local', defaults to settings.STOCK_DATA_PROVIDER
+        cache: Read through the on-disk response cache (settings.STOCK_DATA_CACHE_DIR);
+            defaults to caching every provider except the local one
+        **options: Provider arguments; the local provider's directory defaults to
+            settings.STOCK_DATA_FIXTURE_DIR
+
+    Returns:
+        Provider instance
+    """
+    name = name or getattr(settings, 'STOCK_DATA_PROVIDER', 'yfinance')
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown market data provider: {name}")
+    if name == 'local':
+        options.setdefault('directory', getattr(settings, 'STOCK_DATA_FIXTURE_DIR', '') or None)
+    provider = PROVIDERS[name](**options)
+
+    cache_dir = getattr(settings, 'STOCK_DATA_CACHE_DIR', '')
+    if cache is None:
+        cache = name != 'local'
+    if cache and cache_dir:
+        provider = CachedProvider(
+            provider,
+            cache_dir,
+            ttl=getattr(settings, 'STOCK_DATA_CACHE_TTL', 24 * 3600),
+            max_bytes=getattr(settings, 'STOCK_DATA_CACHE_MAX_BYTES', 1024 ** 3),
+            live_ttl=getattr(settings, 'STOCK_DATA_CACHE_LIVE_TTL', 15 * 60),
+        )
+    return provider
+
+
+def add_provider_arguments(parser) -> None:
+    """
+    Add the --provider, --fixtures and --latency options of the commands that fetch market data
+    """
+    parser.add_argument(
+        '--provider',
+        choices=sorted(PROVIDERS),
+        default=None,
+        help='Market data provider (default: settings.STOCK_DATA_PROVIDER)'
+    )
+    parser.add_argument(
+        '--fixtures',
+        type=str,
+        default=None,
+        help='Directory of recorded responses for the local provider (synthetic data if omitted)'
+    )
+    parser.add_argument(
+        '--latency',
+        type=float,
+        default=0.0,
+        help='Simulated seconds per fetch for the local provider'
+    )
+
+
+def provider_from_options(options: Dict[str, Any]) -> MarketDataProvider:
+    """
+    Create the market data provider selected by add_provider_arguments options
+    """
+    if (options['provider'] or getattr(settings, 'STOCK_DATA_PROVIDER', 'yfinance')) != 'local':
+        return get_provider(options['provider'])
+    local_options = {'latency': options['latency']}
+    if options['fixtures']:
+        local_options['directory'] = options['fixtures']
+    return get_provider('local', **local_options)
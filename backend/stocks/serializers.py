@@ -1,5 +1,7 @@
 from rest_framework import serializers
 from .models import Stock, StockPrice, UserFavoriteStock, StockDataImportLog
+from .providers import PERIODS
+from .storage import INDICATOR_FIELDS, float_storage_enabled, indicator_values
 
 
 class StockSerializer(serializers.ModelSerializer):
@@ -21,14 +23,8 @@ class StockSerializer(serializers.ModelSerializer):
         """
         Get latest price
         """
-        latest_price = obj.prices.first()
-        if latest_price:
-            return {
-                'close_price': latest_price.close_price,
-                'date': latest_price.date,
-                'volume': latest_price.volume
-            }
-        return None
+        # Only the columns of stock_prices_latest_idx, so the lookup is an index-only scan
+        return obj.prices.values('close_price', 'date', 'volume').first()
     
     def get_is_favorited(self, obj):
         """
@@ -57,6 +53,26 @@ class StockPriceSerializer(serializers.ModelSerializer):
             'ma_20', 'ma_50', 'ema_12', 'ema_26', 'macd', 'macd_signal', 
             'macd_histogram', 'rsi', 'created_at'
         ]
+    
+    def get_fields(self):
+        """
+        Leave the unused decimal indicator columns out when indicators are stored as floats
+        """
+        fields = super().get_fields()
+        if float_storage_enabled():
+            for field in INDICATOR_FIELDS:
+                del fields[field]
+        return fields
+    
+    def to_representation(self, instance):
+        """
+        Read indicators from the active storage, keeping the decimal output format
+        """
+        data = super().to_representation(instance)
+        if float_storage_enabled():
+            values = indicator_values(instance, as_string=True)
+            data = {field: values[field] if field in values else data[field] for field in self.Meta.fields}
+        return data
 
 
 class UserFavoriteStockSerializer(serializers.ModelSerializer):
@@ -75,13 +91,16 @@ class StockDataImportLogSerializer(serializers.ModelSerializer):
     Stock Data Import Log Serializer
     """
     created_by_username = serializers.CharField(source='created_by.username', read_only=True)
+    progress = serializers.FloatField(read_only=True)
+    records_per_second = serializers.FloatField(read_only=True)
     
     class Meta:
         model = StockDataImportLog
         fields = [
             'id', 'import_type', 'status', 'file_path', 'total_records',
-            'success_records', 'failed_records', 'error_message',
-            'created_by_username', 'created_at', 'updated_at'
+            'success_records', 'failed_records', 'rows_imported', 'progress',
+            'records_per_second', 'error_message', 'created_by_username',
+            'created_at', 'updated_at', 'started_at', 'finished_at'
         ]
 
 
@@ -103,12 +122,36 @@ class TechnicalIndicatorSerializer(serializers.Serializer):
     rsi = serializers.FloatField(allow_null=True)
 
 
+class SymbolListField(serializers.ListField):
+    """
+    List of stock symbols, also accepted as one comma-separated string
+    """
+    child = serializers.CharField(max_length=10)
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            data = [symbol for symbol in data.split(',') if symbol.strip()]
+        return super().to_internal_value(data)
+
+
 class StockImportSerializer(serializers.Serializer):
     """
     Stock Data Import Serializer
     """
-    symbol = serializers.CharField(max_length=10, required=True)
-    period = serializers.CharField(max_length=10, default='1y')
+    symbol = serializers.CharField(max_length=10, required=False)
+    symbols = SymbolListField(required=False)
+    period = serializers.ChoiceField(choices=PERIODS, default='1y')
+    full = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        """
+        Merge symbol into symbols, which must not end up empty
+        """
+        symbols = attrs.get('symbols') or ([attrs['symbol']] if attrs.get('symbol') else [])
+        if not symbols:
+            raise serializers.ValidationError({'symbols': 'Stock symbol is required'})
+        attrs['symbols'] = symbols
+        return attrs
 
 
 class ExcelImportSerializer(serializers.Serializer):
@@ -0,0 +1,117 @@
+from decimal import Decimal, ROUND_HALF_EVEN, ROUND_HALF_UP
+from typing import Any, Dict
+
+import numpy as np
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import connection
+
+from .models import StockPrice
+
+# Indicator columns stored for every price row
+INDICATOR_FIELDS = [
+    'ma_5', 'ma_10', 'ma_20', 'ma_50', 'ema_12', 'ema_26',
+    'macd', 'macd_signal', 'macd_histogram', 'rsi',
+]
+
+# Decimal places of the DecimalField columns, so float storage renders identically
+DECIMAL_PLACES = {
+    field: StockPrice._meta.get_field(field).decimal_places
+    for field in INDICATOR_FIELDS
+    if StockPrice._meta.get_field(field).get_internal_type() == 'DecimalField'
+}
+
+
+def _as_decimal(value: float, places: int) -> Decimal:
+    """
+    Round a float the way storing it into a numeric column does
+    """
+    # Both keep 15 significant digits; PostgreSQL's float8 -> numeric cast then rounds half
+    # away from zero, while SQLite stores the float and Django's converter rounds half to even
+    rounding = ROUND_HALF_UP if connection.vendor == 'postgresql' else ROUND_HALF_EVEN
+    return Decimal(f'{value:.15g}').quantize(Decimal(1).scaleb(-places), rounding=rounding)
+
+
+def _format_decimal(value: float, places: int) -> str:
+    """
+    Format a float like str(_as_decimal(value, places)), without creating a Decimal for most values
+    """
+    scaled = abs(value) * 10 ** places
+    # Fixed-point formatting rounds the exact binary value, which only differs from rounding
+    # 15 significant digits next to a tie or when more than 15 digits are kept
+    if scaled < 1e9 and abs(scaled % 1 - 0.5) > 1e-5:
+        return f'{value:.{places}f}'
+    return str(_as_decimal(value, places))
+
+
+def float_storage_enabled() -> bool:
+    """
+    Whether indicators are stored in the float-typed StockPriceIndicators table
+    """
+    return getattr(settings, 'STOCK_INDICATOR_STORAGE', 'decimal') == 'float'
+
+
+def with_indicators(queryset):
+    """
+    Join the float indicator table to a StockPrice queryset when it is in use
+
+    The unused decimal indicator columns are then deferred, so they are
+    neither read nor converted to Decimal.
+    """
+    if float_storage_enabled():
+        return queryset.select_related('float_indicators').defer(*INDICATOR_FIELDS)
+    return queryset
+
+
+def indicator_values(price: StockPrice, as_string: bool = False) -> Dict[str, Any]:
+    """
+    Get the indicator values of a price row from the active storage
+
+    Args:
+        price: StockPrice instance (use with_indicators() to avoid a query per row)
+        as_string: Format decimal columns as strings, like serializer DecimalFields do
+
+    Returns:
+        Indicator values keyed by field name. Float storage is converted to
+        Decimal with the decimal columns' precision so the API output does not change.
+    """
+    if not float_storage_enabled():
+        return {field: getattr(price, field) for field in INDICATOR_FIELDS}
+
+    try:
+        stored = price.float_indicators
+    except ObjectDoesNotExist:
+        stored = None
+
+    values = {}
+    for field in INDICATOR_FIELDS:
+        value = getattr(stored, field) if stored is not None else None
+        places = DECIMAL_PLACES.get(field)
+        if value is not None and places is not None:
+            value = _format_decimal(value, places) if as_string else _as_decimal(value, places)
+        values[field] = value
+    return values
+
+
+def indicator_arrays(queryset) -> Dict[str, np.ndarray]:
+    """
+    Load the indicator columns of a StockPrice queryset as float arrays
+
+    Args:
+        queryset: StockPrice queryset, already ordered
+
+    Returns:
+        Float64 arrays keyed by field name, with NaN for missing values. Float
+        storage is read as-is, without creating a Decimal per value.
+    """
+    if float_storage_enabled():
+        lookups = [f'float_indicators__{field}' for field in INDICATOR_FIELDS]
+    else:
+        lookups = INDICATOR_FIELDS
+    rows = list(queryset.values_list(*lookups))
+    if not rows:
+        return {field: np.empty(0) for field in INDICATOR_FIELDS}
+    # None becomes NaN; Decimal values are converted by float()
+    table = np.array(rows, dtype=float)
+    return {field: table[:, i] for i, field in enumerate(INDICATOR_FIELDS)}
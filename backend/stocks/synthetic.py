@@ -0,0 +1,50 @@
+from datetime import date
+from typing import Dict
+
+import numpy as np
+
+# Cheapest price the generator produces, so rounded prices never reach zero
+MIN_PRICE = 0.01
+
+
+def business_days(first: date, last: date) -> np.ndarray:
+    """
+    Weekdays from first to last inclusive, as a datetime64[D] array
+    """
+    days = np.arange(np.datetime64(first), np.datetime64(last) + 1)
+    return days[np.is_busday(days)]
+
+
+def generate_ohlcv(n_days: int, n_symbols: int, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+    """
+    Draw OHLCV bars for many symbols at once from a geometric Brownian motion
+
+    Every symbol gets its own starting price, drift and volatility; the whole
+    days x symbols matrix of each column is drawn in one call.
+
+    Args:
+        n_days: Number of bars per symbol
+        n_symbols: Number of symbols
+        rng: Random generator, seeded for reproducible datasets
+
+    Returns:
+        Dictionary of (n_days, n_symbols) arrays keyed by the StockPrice field
+        names; prices are rounded to cents and volumes are integers
+    """
+    shape = (n_days, n_symbols)
+    base = rng.uniform(10, 500, n_symbols)
+    drift = rng.uniform(-0.0002, 0.0006, n_symbols)
+    volatility = rng.uniform(0.01, 0.03, n_symbols)
+
+    close = base * np.exp(np.cumsum(rng.normal(drift, volatility, shape), axis=0))
+    open_ = close * np.exp(rng.normal(0, volatility / 4, shape))
+    spread = np.abs(rng.normal(0, volatility / 2, shape))
+    high = np.maximum(open_, close) * (1 + spread)
+    low = np.minimum(open_, close) * (1 - spread)
+
+    bars = {
+        field: np.maximum(np.round(values, 2), MIN_PRICE)
+        for field, values in (('open_price', open_), ('high_price', high), ('low_price', low), ('close_price', close))
+    }
+    bars['volume'] = rng.integers(100_000, 10_000_000, shape)
+    return bars
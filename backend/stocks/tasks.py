@@ -0,0 +1,121 @@
+import logging
+import os
+
+from typing import List, Optional
+
+from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .fundamentals import refresh_fundamentals
+from .jobs import run_excel_import, run_import_job
+from .models import StockDataImportLog
+from .partitions import create_future_partitions, is_partitioned
+
+logger = logging.getLogger('stockanalysis')
+
+
+def _mark_failed(log_id: int, error: Exception):
+    """
+    Record an unexpected task error on the job, so its status never stays 'pending'
+    """
+    StockDataImportLog.objects.filter(id=log_id).exclude(status='failed').update(
+        status='failed', error_message=str(error), finished_at=timezone.now(), updated_at=timezone.now()
+    )
+
+
+@shared_task
+def import_excel_task(log_id: int, file_path: str):
+    """
+    Import an uploaded Excel or CSV stock file and delete it afterwards
+
+    Args:
+        log_id: StockDataImportLog of the job
+        file_path: Path of the uploaded file in settings.STOCK_IMPORT_UPLOAD_DIR
+    """
+    try:
+        log = StockDataImportLog.objects.get(id=log_id)
+        run_excel_import(log, file_path)
+    except Exception as e:
+        logger.error("Excel import task %s failed: %s", log_id, e)
+        _mark_failed(log_id, e)
+    finally:
+        if os.path.exists(file_path):
+            os.unlink(file_path)
+
+
+@shared_task
+def import_api_task(log_id: int, period: str = '1y', full: bool = False):
+    """
+    Fetch and store the prices of an import job's symbols
+
+    Args:
+        log_id: StockDataImportLog created by create_import_job
+        period: History period for stocks without stored prices
+        full: Fetch the whole period even when prices are already stored
+    """
+    try:
+        log = StockDataImportLog.objects.get(id=log_id)
+        run_import_job(log, period=period, full=full)
+    except Exception as e:
+        logger.error("API import task %s failed: %s", log_id, e)
+        _mark_failed(log_id, e)
+
+
+@shared_task
+def create_price_partitions_task():
+    """
+    Create the stock_prices partitions of the coming years before bars arrive for them
+
+    Returns:
+        Names of the partitions created
+    """
+    if not is_partitioned():
+        return []
+    created = create_future_partitions()
+    if created:
+        logger.info("Created stock price partitions %s", ', '.join(created))
+    return created
+
+
+@shared_task
+def refresh_fundamentals_task(symbols: Optional[List[str]] = None):
+    """
+    Fetch names, sectors and ratios of stocks whose fundamentals are stale or missing
+
+    Args:
+        symbols: Limit to these symbols, or None for every stale stock
+
+    Returns:
+        Number of stocks refreshed and the symbols that failed
+    """
+    stats = refresh_fundamentals(symbols=symbols)
+    if stats['failed']:
+        logger.warning("Refreshing fundamentals failed for %s", ', '.join(stats['failed']))
+    return {'refreshed': stats['refreshed'], 'failed': stats['failed']}
+
+
+def queue_fundamentals_refresh(symbols: List[str]) -> None:
+    """
+    Queue a fundamentals refresh of newly created stocks once the current transaction commits
+
+    Without it new stocks keep their symbol as name until the next scheduled
+    refresh. Nothing is queued when no broker is configured (and tasks do not
+    run eagerly), and a broker that cannot be reached is logged instead of
+    failing the import; the scheduled refresh picks the stocks up later.
+    """
+    if not symbols:
+        return
+    if not getattr(settings, 'CELERY_BROKER_URL', None) and not getattr(settings, 'CELERY_TASK_ALWAYS_EAGER', False):
+        logger.debug("No Celery broker configured, leaving %d new stocks to the scheduled refresh", len(symbols))
+        return
+    symbols = list(symbols)
+
+    def send():
+        try:
+            refresh_fundamentals_task.apply_async(kwargs={'symbols': symbols}, retry=False)
+        except Exception as e:
+            logger.warning("Queueing the fundamentals refresh of %d new stocks failed: %s", len(symbols), e)
+
+    transaction.on_commit(send)
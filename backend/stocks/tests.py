@@ -0,0 +1,1323 @@
+import gzip
+import json
+import os
+import tempfile
+import threading
+from contextlib import redirect_stdout
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipIf, skipUnless
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import indicators, jobs, partitions, tasks, utils
+from .bulk import PRICE_FIELDS, copy_stock_prices, upsert_stock_prices, write_indicator_columns
+from .fundamentals import refresh_fundamentals
+from .models import Stock, StockDataImportLog, StockImportItem, StockIndicatorState, StockPrice
+from .panel import STATE_FIELDS, compute_panel_indicators, recompute_panel
+from .pipeline import run_import_pipeline
+from .providers import (
+    CachedProvider, LocalProvider, MarketDataProvider, RecordingProvider, first_bar_index,
+    frame_to_price_data,
+)
+from .storage import INDICATOR_FIELDS, indicator_values, with_indicators
+from .synthetic import MIN_PRICE, business_days, generate_ohlcv
+from .utils import compute_indicator_columns, save_stock_data, update_technical_indicators
+
+
+def make_records(n_days: int, seed: int = 0, first: date = date(2024, 1, 1)):
+    """
+    Synthetic price records of one symbol, in the format of a provider fetch result
+    """
+    bars = generate_ohlcv(n_days, 1, np.random.default_rng(seed))
+    days = business_days(first, date(first.year + 2, 12, 31))[:n_days]
+    return [
+        {
+            'date': day.item(),
+            **{field: values[i, 0].item() for field, values in bars.items()},
+        }
+        for i, day in enumerate(days)
+    ]
+
+
+def ragged_close(n_days: int = 300, seed: int = 1) -> np.ndarray:
+    """
+    Close price matrix of four symbols: full history, late listing, gaps and delisting
+    """
+    close = generate_ohlcv(n_days, 4, np.random.default_rng(seed))['close_price']
+    close[:120, 1] = np.nan
+    close[np.random.default_rng(seed).random(n_days) < 0.1, 2] = np.nan
+    close[200:, 3] = np.nan
+    return close
+
+
+def stored_indicators(symbol: str):
+    """
+    Indicator columns of a stock's stored bars, oldest first
+    """
+    return list(StockPrice.objects.filter(stock__symbol=symbol).order_by('date').values_list('date', *INDICATOR_FIELDS))
+
+
+def baseline_ema(prices, period):
+    """
+    calculate_ema as it was before the NumPy kernels, the reference of the parity tests
+    """
+    if len(prices) < period:
+        return [None] * len(prices)
+    multiplier = 2 / (period + 1)
+    values = [None] * (period - 1) + [sum(prices[:period]) / period]
+    for i in range(period, len(prices)):
+        values.append(prices[i] * multiplier + values[i - 1] * (1 - multiplier))
+    return values
+
+
+def baseline_rsi(prices, period):
+    """
+    calculate_rsi as it was before the NumPy kernels: one value shorter than
+    aligned, its value k being the RSI of bar period + k - 1
+    """
+    if len(prices) < period + 1:
+        return [None] * len(prices)
+    changes = [b - a for a, b in zip(prices, prices[1:])]
+    gains, losses = [max(c, 0) for c in changes], [-min(c, 0) for c in changes]
+    avg_gain, avg_loss = sum(gains[:period]) / period, sum(losses[:period]) / period
+    values = [None]
+    for i in range(period, len(changes)):
+        values.append(100 if avg_loss == 0 else 100 - 100 / (1 + avg_gain / avg_loss))
+        avg_gain = (avg_gain * (period - 1) + gains[i]) / period
+        avg_loss = (avg_loss * (period - 1) + losses[i]) / period
+    return values
+
+
+class IndicatorKernelTests(TestCase):
+
+    prices = [record['close_price'] for record in make_records(120, seed=5)]
+
+    def assertValuesEqual(self, actual, expected, msg=None):
+        self.assertEqual([value is None for value in actual], [value is None for value in expected], msg)
+        np.testing.assert_allclose([np.nan if v is None else v for v in actual],
+                                   [np.nan if v is None else v for v in expected], rtol=1e-12, err_msg=msg)
+
+    def test_moving_averages_match_the_baseline(self):
+        for period in (5, 20, 50):
+            expected = [None] * (period - 1) + [
+                sum(self.prices[i - period + 1:i + 1]) / period for i in range(period - 1, len(self.prices))
+            ]
+            self.assertValuesEqual(utils.calculate_ma(self.prices, period), expected, f'MA {period}')
+            self.assertValuesEqual(utils.calculate_ema(self.prices, period), baseline_ema(self.prices, period),
+                                   f'EMA {period}')
+
+    def test_macd_matches_the_baseline(self):
+        macd = utils.calculate_macd(self.prices)
+        fast, slow = baseline_ema(self.prices, 12), baseline_ema(self.prices, 26)
+        line = [None if f is None or s is None else f - s for f, s in zip(fast, slow)]
+        signal = [None] * 25 + baseline_ema(line[25:], 9)
+        self.assertValuesEqual(macd['macd'], line)
+        self.assertValuesEqual(macd['signal'], signal)
+        self.assertValuesEqual(macd['histogram'], [None if s is None else m - s for m, s in zip(line, signal)])
+        self.assertEqual((macd['macd'].count(None), macd['signal'].count(None)), (25, 33))
+
+    def test_rsi_is_aligned_with_the_prices(self):
+        rsi = utils.calculate_rsi(self.prices, 14)
+        baseline = baseline_rsi(self.prices, 14)
+
+        self.assertEqual(len(rsi), len(self.prices))
+        self.assertEqual(len(baseline), len(self.prices) - 14)
+        self.assertEqual(rsi[:14], [None] * 14)
+        self.assertValuesEqual(rsi[14:-1], baseline[1:])
+        self.assertIsNotNone(rsi[-1])
+        self.assertEqual(utils.calculate_rsi([1.0 + i for i in range(20)], 14)[14:], [100.0] * 6)
+
+    def test_short_series_have_no_values(self):
+        prices = self.prices[:10]
+        for values in (utils.calculate_ma(prices, 20), utils.calculate_ema(prices, 20),
+                       utils.calculate_rsi(prices, 10), *utils.calculate_macd(prices).values()):
+            self.assertEqual(values, [None] * 10)
+        self.assertEqual(utils.calculate_ma(prices, 10)[-1], sum(prices) / 10)
+
+
+class IndicatorSetTests(TestCase):
+
+    bars = pd.DataFrame({
+        field: values[:, 0] for field, values in generate_ohlcv(300, 1, np.random.default_rng(7)).items()
+    })
+    high, low, close, volume = bars['high_price'], bars['low_price'], bars['close_price'], bars['volume']
+
+    def compute(self, **options):
+        return indicators.compute_indicator_set(self.close, self.high, self.low, self.volume, **options)
+
+    def assertSeriesEqual(self, actual, expected, rtol=1e-9):
+        np.testing.assert_allclose(actual, expected.to_numpy(dtype=float), rtol=rtol)
+
+    def test_bollinger_matches_pandas(self):
+        result = self.compute(ma_periods=(20,), bollinger=(20, 2))
+        middle, std = self.close.rolling(20).mean(), self.close.rolling(20).std(ddof=0)
+        self.assertSeriesEqual(result['bb_middle'], middle)
+        self.assertSeriesEqual(result['bb_upper'], middle + 2 * std)
+        self.assertSeriesEqual(result['bb_lower'], middle - 2 * std)
+
+    def test_bollinger_width_of_a_long_low_volatility_series(self):
+        close = pd.Series(3000 + np.random.default_rng(3).normal(0, 0.01, 250_000))
+        result = indicators.compute_indicator_set(close, bollinger=(20, 2))
+        self.assertSeriesEqual((result['bb_upper'] - result['bb_lower']) / 4,
+                               close.rolling(20).std(ddof=0), rtol=1e-6)
+
+    def test_atr_matches_wilder_smoothed_true_range(self):
+        prev_close = self.close.shift()
+        true_range = pd.concat([self.high - self.low, (self.high - prev_close).abs(),
+                                (self.low - prev_close).abs()], axis=1).max(axis=1)
+        seeded = pd.concat([pd.Series(np.nan, index=range(13)), pd.Series([true_range[:14].mean()]),
+                            true_range[14:]], ignore_index=True)
+        self.assertSeriesEqual(self.compute(atr_period=14)['atr'], seeded.ewm(alpha=1 / 14, adjust=False).mean())
+
+    def test_stochastic_matches_pandas(self):
+        result = self.compute(stochastic=(14, 3))
+        lowest, highest = self.low.rolling(14).min(), self.high.rolling(14).max()
+        stoch_k = 100 * (self.close - lowest) / (highest - lowest)
+        self.assertSeriesEqual(result['stoch_k'], stoch_k)
+        self.assertSeriesEqual(result['stoch_d'], stoch_k.rolling(3).mean())
+
+    def test_stochastic_of_a_flat_range_is_nan(self):
+        flat = np.r_[np.full(20, 10.0), np.linspace(10, 12, 5)]
+        result = indicators.compute_indicator_set(flat, flat, flat, stochastic=(5, 3))
+        self.assertTrue(np.isnan(result['stoch_k'][4:20]).all())
+        self.assertTrue(np.isnan(result['stoch_d'][4:22]).all())
+        self.assertEqual(result['stoch_k'][-1], 100.0)
+
+    def test_obv_and_vwap_match_pandas(self):
+        result = self.compute(obv=True, vwap_period=10)
+        self.assertSeriesEqual(result['obv'], (np.sign(self.close.diff().fillna(0)) * self.volume).cumsum())
+        typical = (self.high + self.low + self.close) / 3
+        self.assertSeriesEqual(result['vwap'], (typical * self.volume).rolling(10).sum() / self.volume.rolling(10).sum())
+
+    def test_shared_intermediates_match_the_single_kernels(self):
+        result = self.compute(ma_periods=(5,), ema_periods=(12, 26), macd_params=(12, 26, 9), rsi_periods=(14,))
+        np.testing.assert_allclose(result['ma_5'], indicators.ma(self.close, 5))
+        np.testing.assert_allclose(result['ema_12'], indicators.ema(self.close, 12))
+        np.testing.assert_allclose(result['macd_signal'], indicators.macd(self.close)['signal'])
+        np.testing.assert_allclose(result['rsi_14'], indicators.rsi(self.close, 14))
+
+
+class SaveStockDataTests(TestCase):
+
+    def test_filled_gap_before_state_recomputes_indicators(self):
+        records = make_records(80)
+        gap = records.pop(70)
+        save_stock_data('GAP', {'price_data': records})
+        self.assertEqual(StockIndicatorState.objects.get(stock__symbol='GAP').last_date, records[-1]['date'])
+
+        # An overlap re-fetch brings the missing bar back, with every other close unchanged
+        overlap = records[65:]
+        overlap.insert(5, gap)
+        save_stock_data('GAP', {'price_data': overlap})
+        synced = stored_indicators('GAP')
+
+        update_technical_indicators('GAP')
+        self.assertEqual(synced, stored_indicators('GAP'))
+        self.assertEqual(len(synced), 80)
+        self.assertIsNotNone(dict((row[0], row) for row in synced)[gap['date']][1])
+
+
+class TechnicalIndicatorsViewTests(TestCase):
+
+    def test_revised_close_invalidates_custom_indicators(self):
+        records = make_records(60)
+        save_stock_data('REV', {'price_data': records})
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_user(username='viewer', email='viewer@example.com', password='viewer'))
+        url = reverse('technical_indicators', args=['REV'])
+
+        before = client.get(url, {'ma': '5'}).json()
+        # A re-fetch revises the latest close without adding a bar
+        save_stock_data('REV', {'price_data': [dict(records[-1], close_price=records[-1]['close_price'] + 10)]})
+        after = client.get(url, {'ma': '5'}).json()
+
+        self.assertEqual(before[0]['date'], after[0]['date'])
+        self.assertAlmostEqual(after[0]['ma_5'] - before[0]['ma_5'], 2.0, places=1)
+
+    def test_prices_written_without_recompute_invalidate_custom_indicators(self):
+        records = make_records(60)
+        save_stock_data('RAW', {'price_data': records})
+        stock = Stock.objects.get(symbol='RAW')
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_user(username='raw', email='raw@example.com', password='raw'))
+        url = reverse('technical_indicators', args=['RAW'])
+
+        # As import_price_file --skip-indicators does: an older bar is revised, the indicator state is not
+        state = StockIndicatorState.objects.get(stock=stock)
+        writers = [lambda bars: upsert_stock_prices(stock.id, bars)]
+        if connection.vendor == 'postgresql':
+            writers.append(lambda bars: copy_stock_prices(
+                (stock.id, bar['date'], *(bar[field] for field in PRICE_FIELDS)) for bar in bars
+            ))
+        for i, write in enumerate(writers, 1):
+            before = client.get(url, {'ma': '5'}).json()
+            write([dict(records[-3], close_price=records[-3]['close_price'] + 10 * i)])
+            after = client.get(url, {'ma': '5'}).json()
+
+            self.assertEqual(before[0]['date'], after[0]['date'])
+            self.assertAlmostEqual(after[0]['ma_5'] - before[0]['ma_5'], 2.0, places=1)
+        self.assertEqual(StockIndicatorState.objects.get(stock=stock).updated_at, state.updated_at)
+
+
+    def test_float_storage_returns_the_decimal_output(self):
+        save_stock_data('FMT', {'price_data': make_records(80)})
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_user(username='fmt', email='fmt@example.com', password='fmt'))
+        urls = [reverse('stock_prices', args=['FMT']), reverse('technical_indicators', args=['FMT'])]
+
+        responses = {}
+        for storage in ('decimal', 'float'):
+            with override_settings(STOCK_INDICATOR_STORAGE=storage):
+                update_technical_indicators('FMT')
+                responses[storage] = [client.get(url).content for url in urls]
+
+        self.assertIn(b'"macd":"', responses['float'][0])
+        self.assertEqual(responses['float'], responses['decimal'])
+
+
+class DeltaSyncTests(TestCase):
+
+    def sync(self, symbol, price_data, today):
+        """
+        Run import_stock_data on a given day, with a provider returning price_data
+        """
+        provider = mock.Mock()
+        provider.fetch.return_value = {'success': True, 'price_data': price_data}
+        with mock.patch('stocks.utils.latest_trading_day', return_value=utils.latest_trading_day(today)), \
+                mock.patch('stocks.utils.update_technical_indicators',
+                           wraps=utils.update_technical_indicators) as update, \
+                redirect_stdout(StringIO()):
+            self.assertTrue(utils.import_stock_data(symbol, period='2y', provider=provider))
+        return provider.fetch, update
+
+    def test_latest_trading_day_skips_weekends(self):
+        friday = date(2024, 6, 7)
+        for today in (friday, date(2024, 6, 8), date(2024, 6, 9)):
+            self.assertEqual(utils.latest_trading_day(today), friday)
+        self.assertEqual(utils.latest_trading_day(date(2024, 6, 10)), date(2024, 6, 10))
+
+    def test_new_symbol_fetches_its_period(self):
+        fetch, update = self.sync('NEW', make_records(30), date(2024, 6, 10))
+        fetch.assert_called_once_with('NEW', period='2y', start=None)
+        update.assert_called_once_with('NEW', incremental=True)
+        self.assertEqual(StockPrice.objects.filter(stock__symbol='NEW').count(), 30)
+
+    def test_current_data_is_not_fetched(self):
+        records = make_records(30)
+        save_stock_data('CUR', {'price_data': records})
+        last = records[-1]['date']
+        self.assertEqual(last.weekday(), 4)
+
+        # The weekend after the last bar, nothing is fetched
+        for today in (last + timedelta(days=1), last + timedelta(days=2)):
+            fetch, _ = self.sync('CUR', [], today)
+            fetch.assert_not_called()
+        # A Monday holiday still fetches, from the overlap before the last bar
+        fetch, _ = self.sync('CUR', [], last + timedelta(days=3))
+        fetch.assert_called_once_with('CUR', period='2y', start=last - timedelta(days=utils.DELTA_SYNC_OVERLAP_DAYS))
+
+    def test_overlap_updates_indicators_incrementally(self):
+        records = make_records(61)
+        save_stock_data('INC', {'price_data': records[:60]})
+        _, update = self.sync('INC', records[55:], records[-1]['date'])
+        update.assert_called_once_with('INC', incremental=True)
+
+        synced = stored_indicators('INC')
+        update_technical_indicators('INC')
+        self.assertEqual(synced, stored_indicators('INC'))
+
+    def test_revised_overlap_bar_recomputes_all_indicators(self):
+        records = make_records(61)
+        save_stock_data('REV', {'price_data': records[:60]})
+        overlap = [dict(record) for record in records[55:]]
+        overlap[2]['close_price'] += 1
+        _, update = self.sync('REV', overlap, records[-1]['date'])
+        update.assert_called_once_with('REV', incremental=False)
+
+        synced = stored_indicators('REV')
+        update_technical_indicators('REV')
+        self.assertEqual(synced, stored_indicators('REV'))
+        self.assertEqual(float(StockPrice.objects.get(stock__symbol='REV', date=overlap[2]['date']).close_price),
+                         round(overlap[2]['close_price'], 2))
+
+
+class ImportPipelineTests(TestCase):
+
+    def test_failing_writer_stops_the_fetch_threads(self):
+        def on_result(symbol, success, rows, error):
+            raise RuntimeError('writer failed')
+
+        raised = []
+
+        def run():
+            try:
+                run_import_pipeline(
+                    [f'S{i:03d}' for i in range(100)],
+                    fetcher=lambda symbol, **kwargs: {'success': False, 'error': 'no data'},
+                    concurrency=8, rate=0, queue_size=4, on_result=on_result,
+                )
+            except RuntimeError as e:
+                raised.append(e)
+            finally:
+                connection.close()
+
+        # A daemon thread, so a hanging pipeline fails the test instead of blocking the run
+        thread = threading.Thread(target=run, daemon=True)
+        with self.assertLogs('stockanalysis', 'WARNING'):
+            thread.start()
+            thread.join(timeout=10)
+
+        self.assertFalse(thread.is_alive(), 'run_import_pipeline hung after the writer raised')
+        self.assertEqual([str(e) for e in raised], ['writer failed'])
+
+
+class ImportJobResumeTests(TestCase):
+
+    def setUp(self):
+        self.fetched = []
+        self.failing = {'BAD'}
+
+    def fetch(self, symbol, **kwargs):
+        self.fetched.append(symbol)
+        if symbol in self.failing:
+            return {'success': False, 'error': 'no data', 'retryable': False}
+        return {'success': True, 'price_data': make_records(30)}
+
+    def run_job(self, log, **options):
+        return jobs.run_import_job(log, fetcher=self.fetch, concurrency=1, rate=0, retries=0, **options)
+
+    def test_stopped_job_resumes_with_pending_symbols_only(self):
+        log = jobs.create_import_job(['AAA', 'BAD', 'CCC', 'DDD'])
+
+        def stop(log):
+            raise RuntimeError('stopped')
+
+        with self.assertLogs('stockanalysis', 'WARNING'), self.assertRaises(RuntimeError):
+            self.run_job(log, checkpoint_every=2, progress=stop)
+        log.refresh_from_db()
+        self.assertEqual(log.status, 'failed')
+        self.assertEqual((log.success_records, log.failed_records, log.rows_imported), (1, 1, 30))
+        self.assertEqual(
+            dict(log.items.values_list('symbol', 'status')),
+            {'AAA': 'done', 'BAD': 'failed', 'CCC': 'pending', 'DDD': 'pending'}
+        )
+
+        self.fetched.clear()
+        self.run_job(log)
+        log.refresh_from_db()
+        self.assertEqual(sorted(self.fetched), ['CCC', 'DDD'])
+        self.assertEqual(log.resumed_records, 2)
+        self.assertEqual((log.total_records, log.success_records, log.failed_records), (4, 3, 1))
+        self.assertEqual(log.rows_imported, 90)
+        self.assertEqual(log.status, 'failed')
+
+        self.fetched.clear()
+        self.failing.clear()
+        self.run_job(log, retry_failed=True)
+        log.refresh_from_db()
+        self.assertEqual(self.fetched, ['BAD'])
+        self.assertEqual(log.resumed_records, 3)
+        self.assertEqual((log.total_records, log.success_records, log.failed_records), (4, 4, 0))
+        self.assertEqual(log.rows_imported, 120)
+        self.assertEqual(log.status, 'success')
+        self.assertEqual(list(log.items.values_list('symbol', 'attempts').order_by('id')),
+                         [('AAA', 1), ('BAD', 2), ('CCC', 1), ('DDD', 1)])
+
+
+    def test_symbols_leased_by_a_worker_are_left_to_it(self):
+        log = jobs.create_import_job(['AAA', 'BBB', 'CCC'])
+        self.assertEqual([item.symbol for item in jobs.lease_items('worker-a', batch_size=1)], ['AAA'])
+
+        self.run_job(log)
+        log.refresh_from_db()
+        self.assertEqual(sorted(self.fetched), ['BBB', 'CCC'])
+        self.assertEqual((log.status, log.success_records), ('processing', 2))
+        self.assertEqual(
+            dict(log.items.values_list('symbol', 'leased_by')),
+            {'AAA': 'worker-a', 'BBB': None, 'CCC': None}
+        )
+        # Nothing is left for a queue worker started next to the job
+        self.assertEqual(jobs.lease_items('worker-b'), [])
+
+
+class LeaseItemsTests(TestCase):
+
+    def test_rows_leased_after_the_select_are_skipped(self):
+        log = jobs.create_import_job(['AAA', 'BBB', 'CCC'])
+        taken = jobs.lease_items('worker-a', batch_size=1)
+        self.assertEqual([item.symbol for item in taken], ['AAA'])
+
+        # Stands in for a SELECT that ran before worker-a's lease (SQLite ignores SKIP LOCKED)
+        stale = mock.Mock()
+        stale.select_for_update.return_value.filter.return_value = StockImportItem.objects.all()
+        with mock.patch.object(StockImportItem, 'objects', wraps=StockImportItem.objects) as objects:
+            objects.select_for_update = stale.select_for_update
+            leased = jobs.lease_items('worker-b', log_id=log.id)
+
+        self.assertEqual([item.symbol for item in leased], ['BBB', 'CCC'])
+        self.assertEqual(
+            dict(log.items.values_list('symbol', 'leased_by')),
+            {'AAA': 'worker-a', 'BBB': 'worker-b', 'CCC': 'worker-b'}
+        )
+        self.assertEqual(jobs.lease_items('worker-c'), [])
+
+    def test_result_of_a_taken_over_lease_is_dropped(self):
+        log = jobs.create_import_job(['AAA'])
+        timed_out = mock.Mock(return_value={'success': False, 'error': 'timed out'})
+        pipeline = jobs.run_import_pipeline
+
+        def take_over(symbols, **options):
+            # worker-a's lease runs out while it fetches, and worker-b finishes the symbol
+            if options['fetcher'] is timed_out:
+                StockImportItem.objects.update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+                jobs.work_import_queue('worker-b', fetcher=lambda symbol, **kwargs: {
+                    'success': True, 'price_data': make_records(5)
+                }, rate=0)
+            return pipeline(symbols, **options)
+
+        with mock.patch('stocks.jobs.run_import_pipeline', side_effect=take_over), \
+                self.assertLogs('stockanalysis', 'WARNING'):
+            stats = jobs.work_import_queue('worker-a', fetcher=timed_out, rate=0, retries=0)
+
+        timed_out.assert_called_once()
+        self.assertEqual((stats['done'], stats['failed'], stats['lost']), (0, 0, 1))
+        item = StockImportItem.objects.get()
+        self.assertEqual((item.status, item.rows, item.attempts, item.leased_by), ('done', 5, 1, None))
+        log.refresh_from_db()
+        self.assertEqual((log.status, log.success_records), ('success', 1))
+
+
+class ImportJobViewTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(
+            username='admin', email='admin@example.com', password='admin', is_staff=True
+        ))
+        self.url = reverse('import_api')
+
+    def test_invalid_requests_are_rejected(self):
+        for body in ({}, {'symbols': [{'symbol': 'AAPL'}]}, {'symbols': ['AAPL', 'MUCHTOOLONGSYMBOL']},
+                     {'symbol': 'AAPL', 'period': '3w'}, {'symbols': ' , '}):
+            response = self.client.post(self.url, body, format='json')
+            self.assertEqual(response.status_code, 400, body)
+        self.assertFalse(StockDataImportLog.objects.exists())
+
+    @mock.patch('stocks.views.import_api_task')
+    def test_queued_job_points_at_its_status(self, task):
+        response = self.client.post(self.url, {'symbols': 'aapl, msft', 'period': '5y', 'full': True}, format='json')
+
+        self.assertEqual(response.status_code, 202)
+        job = response.json()
+        self.assertEqual(job['status'], 'pending')
+        self.assertEqual(job['status_url'], reverse('import_log_detail', args=[job['job_id']]))
+        task.delay.assert_called_once_with(job['job_id'], period='5y', full=True)
+
+        status = self.client.get(job['status_url']).json()
+        self.assertEqual((status['import_type'], status['status'], status['total_records']), ('api', 'pending', 2))
+        self.assertEqual(sorted(StockImportItem.objects.values_list('symbol', flat=True)), ['AAPL', 'MSFT'])
+
+    @override_settings(CELERY_TASK_ALWAYS_EAGER=True, STOCK_DATA_PROVIDER='local', STOCK_DATA_FIXTURE_DIR='')
+    def test_eager_task_finishes_before_the_response(self):
+        response = self.client.post(self.url, {'symbol': 'EAGER', 'period': '1mo'}, format='json')
+
+        self.assertEqual((response.status_code, response.json()['status']), (202, 'success'))
+        self.assertEqual(StockPrice.objects.filter(stock__symbol='EAGER').count(), 21)
+        self.assertEqual(self.client.get(response.json()['status_url']).json()['success_records'], 1)
+
+    def test_job_status_needs_an_admin(self):
+        log = jobs.create_import_job(['AAPL'])
+        self.client.force_authenticate(get_user_model().objects.create_user(username='user', email='user@example.com', password='user'))
+        self.assertEqual(self.client.get(reverse('import_log_detail', args=[log.id])).status_code, 403)
+
+    @override_settings(STOCK_IMPORT_MAX_XLS_BYTES=1024)
+    @mock.patch('stocks.views.import_excel_task')
+    def test_xls_upload_over_the_limit_is_rejected(self, task):
+        content = b'symbol,name\n' + b'AAPL,Apple\n' * 200
+        with tempfile.TemporaryDirectory() as directory, override_settings(STOCK_IMPORT_UPLOAD_DIR=directory):
+            rejected = self.client.post(reverse('import_excel'), {'file': SimpleUploadedFile('stocks.xls', content)})
+            accepted = self.client.post(reverse('import_excel'), {'file': SimpleUploadedFile('stocks.csv', content)})
+
+        self.assertEqual(rejected.status_code, 400)
+        self.assertIn('.xls files are limited to', rejected.json()['error'])
+        self.assertEqual(accepted.status_code, 202)
+        self.assertEqual(task.delay.call_count, 1)
+
+    @skipUnless(connection.vendor == 'postgresql', 'SQLite does not enforce column lengths')
+    def test_rejected_item_leaves_no_job(self):
+        with self.assertRaises(DatabaseError):
+            jobs.create_import_job(['AAPL', 'MUCHTOOLONGSYMBOL'])
+        self.assertFalse(StockDataImportLog.objects.exists())
+
+
+class PriceFileImportTests(TestCase):
+
+    def import_file(self, text, name='prices.csv', **options):
+        """
+        Run a price file import of text written to a temporary file
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, name)
+            with (gzip.open if name.endswith('.gz') else open)(path, 'wt') as f:
+                f.write(text)
+            log = StockDataImportLog.objects.create(import_type='csv', status='pending', file_path=path)
+            return jobs.run_price_file_import(log, path, **options)
+
+    def test_duplicated_bars_keep_the_last_row(self):
+        text = ('symbol,date,open,high,low,close,volume\n'
+                'DUP,2024-01-02,1,1,1,1,100\nDUP,2024-01-03,2,2,2,2,100\nDUP,2024-01-02,3,3,3,3,300\n')
+        methods = ['bulk', 'copy'] if connection.vendor == 'postgresql' else ['bulk']
+        for method in methods:
+            with self.subTest(method=method):
+                StockPrice.objects.all().delete()
+                log = self.import_file(text, method=method, recompute=False)
+
+                self.assertEqual(log.status, 'success', log.error_message)
+                self.assertEqual((log.total_records, log.success_records, log.failed_records), (3, 2, 1))
+                self.assertEqual(
+                    list(StockPrice.objects.order_by('date').values_list('close_price', 'volume')),
+                    [(Decimal('3.00'), 300), (Decimal('2.00'), 100)]
+                )
+
+    def test_invalid_and_unknown_rows_are_counted_as_failed(self):
+        Stock.objects.create(symbol='KNOWN', name='Known', exchange='NYSE')
+        text = ('Ticker,Trade_Date,Open,High,Low,Close,Volume\n'
+                'known,2024-01-02,1,2,0.5,1.5,100\n'
+                'KNOWN,not a date,1,2,0.5,1.5,100\n'
+                'KNOWN,2024-01-03,1,2,0.5,,100\n'
+                'KNOWN,2024-01-04,1,1e9,0.5,1.5,100\n'
+                ',2024-01-05,1,2,0.5,1.5,100\n'
+                'OTHER,2024-01-02,1,2,0.5,1.5,100\n'
+                'KNOWN,2024-01-08,1.004,2,0.5,1.5,99.6\n'
+                'KNOWN,2024-01-09,1,2,0,1.5,100\n'
+                'KNOWN,2024-01-10,1,2,0.5,-1.5,100\n'
+                'KNOWN,2024-01-11,1,2,0.004,1.5,100\n'
+                'KNOWN,2024-01-12,1,2,0.5,1.5,-100\n')
+        log = self.import_file(text, chunk_size=3, create_missing=False, recompute=False)
+
+        self.assertEqual(log.status, 'success', log.error_message)
+        self.assertEqual((log.total_records, log.success_records, log.failed_records), (11, 2, 9))
+        self.assertEqual(log.rows_imported, 2)
+        self.assertFalse(Stock.objects.filter(symbol='OTHER').exists())
+        self.assertEqual(
+            list(StockPrice.objects.order_by('date').values_list('date', 'open_price', 'volume')),
+            [(date(2024, 1, 2), Decimal('1.00'), 100), (date(2024, 1, 8), Decimal('1.00'), 100)]
+        )
+
+    def test_na_like_tickers_are_kept(self):
+        text = ('symbol,date,open,high,low,close,volume\n'
+                'NA,2024-01-02,1,1,1,1,100\nNULL,2024-01-02,2,2,2,2,100\nNA,2024-01-03,1,,1,1,100\n')
+        with mock.patch.object(tasks, 'queue_fundamentals_refresh'):
+            log = self.import_file(text, recompute=False)
+
+        self.assertEqual((log.total_records, log.success_records, log.failed_records), (3, 2, 1))
+        self.assertEqual(sorted(StockPrice.objects.values_list('stock__symbol', flat=True)), ['NA', 'NULL'])
+
+    def test_gzipped_csv_creates_missing_stocks(self):
+        text = 'symbol,date,open,high,low,close,volume\n' + ''.join(
+            f'NEW,{record["date"]},{record["open_price"]:.2f},{record["high_price"]:.2f},'
+            f'{record["low_price"]:.2f},{record["close_price"]:.2f},{record["volume"]}\n'
+            for record in make_records(60)
+        )
+        with mock.patch.object(tasks, 'queue_fundamentals_refresh') as queue_refresh:
+            log = self.import_file(text, name='prices.csv.gz')
+
+        self.assertEqual(log.status, 'success', log.error_message)
+        self.assertEqual((log.total_records, log.success_records, log.failed_records), (60, 60, 0))
+        stock = Stock.objects.get(symbol='NEW')
+        self.assertEqual(stock.prices.count(), 60)
+        self.assertTrue(stock.prices.filter(ma_20__isnull=False).exists())
+        queue_refresh.assert_called_once_with(['NEW'])
+
+    def test_chunks_loaded_before_a_failure_are_recomputed(self):
+        records = make_records(70)
+        save_stock_data('OLD', {'price_data': records[:60]})
+        text = 'symbol,date,open,high,low,close,volume\n' + ''.join(
+            f'{symbol},{record["date"]},{record["open_price"]:.2f},{record["high_price"]:.2f},'
+            f'{record["low_price"]:.2f},{record["close_price"]:.2f},{record["volume"]}\n'
+            for symbol in ('OLD', 'BAD') for record in records[60:]
+        )
+        upsert = jobs.upsert_stock_prices
+
+        def fail_second_chunk(stock_id, bars):
+            if Stock.objects.get(id=stock_id).symbol == 'BAD':
+                raise DatabaseError('connection lost')
+            return upsert(stock_id, bars)
+
+        with mock.patch('stocks.jobs.upsert_stock_prices', side_effect=fail_second_chunk), \
+                self.assertLogs('stockanalysis', 'ERROR'):
+            log = self.import_file(text, method='bulk', chunk_size=10)
+
+        self.assertEqual(log.status, 'failed')
+        self.assertIn('connection lost', log.error_message)
+        self.assertEqual(StockIndicatorState.objects.get(stock__symbol='OLD').last_date, records[-1]['date'])
+        recomputed = stored_indicators('OLD')
+        update_technical_indicators('OLD')
+        self.assertEqual(recomputed, stored_indicators('OLD'))
+
+    def test_missing_column_fails_the_import(self):
+        with self.assertLogs('stockanalysis', 'ERROR'):
+            log = self.import_file('symbol,date,open,high,low,close\nAAA,2024-01-02,1,1,1,1\n')
+
+        self.assertEqual(log.status, 'failed')
+        self.assertIn('Missing required column: volume', log.error_message)
+        self.assertFalse(StockPrice.objects.exists())
+
+
+class StockFileImportTests(TestCase):
+
+    def import_file(self, text, name='stocks.csv', **options):
+        """
+        Run a stock metadata import of text written to a temporary file
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, name)
+            with open(path, 'w') as f:
+                f.write(text)
+            log = StockDataImportLog.objects.create(import_type='stock_csv', status='pending', file_path=path)
+            return jobs.run_excel_import(log, path, **options)
+
+    def test_rows_are_validated_per_chunk(self):
+        text = ('Symbol,Name,Sector,Market_Cap,PE_Ratio\n'
+                ' aapl ,Apple,Technology,3000000000000,31.5\n'
+                ',No Symbol,Technology,1,1\n'
+                'TOOLONGSYMBOL,Too Long,Technology,1,1\n'
+                'MSFT,Microsoft,Technology,n/a,not a number\n'
+                'AAPL,Apple Inc.,Technology,3100000000000,32\n')
+        log = self.import_file(text, chunk_size=10)
+
+        self.assertEqual(log.status, 'success', log.error_message)
+        # The first AAPL row is replaced by the second one and counts as failed
+        self.assertEqual((log.total_records, log.success_records, log.failed_records), (5, 2, 3))
+        self.assertEqual(
+            list(Stock.objects.order_by('symbol').values_list('symbol', 'name', 'market_cap', 'pe_ratio')),
+            [('AAPL', 'Apple Inc.', 3100000000000, 32.0), ('MSFT', 'Microsoft', None, None)]
+        )
+
+    def test_na_like_tickers_are_kept(self):
+        log = self.import_file('symbol,name\nNA,Northern Assets\nNULL,Null Corp\nN/A,Slash Corp\n,Blank\n')
+
+        self.assertEqual((log.total_records, log.success_records, log.failed_records), (4, 3, 1))
+        self.assertEqual(sorted(Stock.objects.values_list('symbol', flat=True)), ['N/A', 'NA', 'NULL'])
+
+    def test_file_only_updates_its_columns(self):
+        Stock.objects.create(symbol='AAPL', name='Apple', exchange='NASDAQ', sector='Technology', pe_ratio=30)
+        log = self.import_file('symbol,name\nAAPL,Apple Inc.\nMSFT,Microsoft\nNVDA,Nvidia\n', chunk_size=2)
+
+        self.assertEqual(log.status, 'success', log.error_message)
+        self.assertEqual((log.total_records, log.success_records, log.failed_records), (3, 3, 0))
+        stock = Stock.objects.get(symbol='AAPL')
+        self.assertEqual((stock.name, stock.sector, stock.pe_ratio), ('Apple Inc.', 'Technology', 30))
+
+    def test_xlsx_chunks_pad_short_rows(self):
+        import openpyxl
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'stocks.xlsx')
+            workbook = openpyxl.Workbook()
+            sheet = workbook.active
+            sheet.append(['Symbol', 'Name', 'Sector'])
+            sheet.append(['AAPL', 'Apple', 'Technology'])
+            sheet.append([None, None, None])
+            sheet.append(['MSFT', 'Microsoft'])
+            sheet.append(['NVDA', 'Nvidia', 'Technology'])
+            workbook.save(path)
+
+            chunks = list(utils.iter_stock_file(path, chunk_size=2))
+
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 1])
+        self.assertEqual(list(chunks[0].columns), ['symbol', 'name', 'sector'])
+        records, invalid = utils.clean_stock_frame(chunks[0])
+        self.assertEqual(invalid, 0)
+        self.assertEqual(records[1], {'symbol': 'MSFT', 'name': 'Microsoft', 'sector': ''})
+
+    def test_parse_excel_data_returns_every_row_with_every_field(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'stocks.csv')
+            with open(path, 'w') as f:
+                f.write('Symbol,Name,PE_Ratio\naapl,Apple,31.5\n,No Symbol,\naapl,Apple Inc.,32\n')
+            data = utils.parse_excel_data(path)
+
+        empty = {field: '' for field in utils.STOCK_FILE_TEXT_FIELDS}
+        empty.update({field: None for field in utils.STOCK_FILE_NUMBER_FIELDS})
+        self.assertEqual(data, [
+            dict(empty, symbol='AAPL', name='Apple', pe_ratio=31.5),
+            dict(empty, symbol='', name='No Symbol'),
+            dict(empty, symbol='AAPL', name='Apple Inc.', pe_ratio=32.0),
+        ])
+        self.assertEqual([utils.validate_stock_data(row) for row in data], [True, False, True])
+
+    def test_missing_symbol_column_fails_the_import(self):
+        with self.assertLogs('stockanalysis', 'ERROR'):
+            log = self.import_file('name,sector\nApple,Technology\n')
+
+        self.assertEqual(log.status, 'failed')
+        self.assertIn('Missing required column: symbol', log.error_message)
+        self.assertFalse(Stock.objects.exists())
+
+
+class PriceFrameTests(TestCase):
+
+    def test_frame_is_converted_to_price_records(self):
+        hist = pd.DataFrame({
+            'Open': [10.0, np.nan, 12.0, 13.0],
+            'High': [11.0, 12.0, 13.0, np.nan],
+            'Low': [9.0, 10.0, 11.0, 12.0],
+            'Close': [10.5, 11.5, 12.5, 13.5],
+            'Volume': [1000, 2000, np.nan, 4000],
+        }, index=pd.date_range('2024-01-02', periods=4, tz='America/New_York'))
+
+        records = frame_to_price_data(hist)
+
+        self.assertEqual(records, [
+            {'date': date(2024, 1, 2), 'open_price': 10.0, 'high_price': 11.0,
+             'low_price': 9.0, 'close_price': 10.5, 'volume': 1000},
+            {'date': date(2024, 1, 4), 'open_price': 12.0, 'high_price': 13.0,
+             'low_price': 11.0, 'close_price': 12.5, 'volume': 0},
+        ])
+        self.assertIs(type(records[0]['date']), date)
+        self.assertIs(type(records[0]['volume']), int)
+
+    def test_first_bar_index(self):
+        dates = [date(2024, 1, 1) + timedelta(days=i) for i in range(10)]
+
+        self.assertEqual(first_bar_index(dates, '5d'), 5)
+        self.assertEqual(first_bar_index(dates, '1mo'), 0)
+        self.assertEqual(first_bar_index(dates, 'max'), 0)
+        self.assertEqual(first_bar_index(dates, start=date(2024, 1, 4)), 3)
+        self.assertEqual(first_bar_index(dates, '5d', start=date(2024, 1, 2)), 1)
+        self.assertEqual(first_bar_index(dates, start=date(2024, 2, 1)), 10)
+        self.assertEqual(first_bar_index([], '5d'), 0)
+
+
+class RecordingProviderTests(TestCase):
+
+    def test_delta_fetch_is_merged_into_the_recording(self):
+        records = make_records(30)
+        upstream = mock.Mock(spec=MarketDataProvider)
+        with tempfile.TemporaryDirectory() as directory:
+            provider = RecordingProvider(upstream, directory)
+            upstream.fetch.return_value = {'success': True, 'price_data': records[:25]}
+            provider.fetch('REC', period='1y')
+
+            revised = dict(records[22], close_price=records[22]['close_price'] + 1)
+            upstream.fetch.return_value = {'success': True, 'price_data': [revised] + records[23:]}
+            provider.fetch('REC', start=records[22]['date'])
+
+            replayed = LocalProvider(directory).fetch('REC', period='max')
+        self.assertEqual(replayed['price_data'], records[:22] + [revised] + records[23:])
+
+
+class CachedProviderTests(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.upstream = mock.Mock()
+        self.upstream.fetch.side_effect = lambda symbol, period='1y', start=None: {
+            'success': True, 'price_data': make_records(30),
+        }
+
+    def cache(self, **options):
+        return CachedProvider(self.upstream, self.directory.name, **options)
+
+    def age(self, path, seconds):
+        then = path.stat().st_mtime - seconds
+        os.utime(path, (then, then))
+
+    def test_repeated_fetch_is_served_from_disk(self):
+        cache = self.cache()
+        first = cache.fetch('AAPL', period='1y')
+        second = cache.fetch('AAPL', period='1y')
+
+        self.assertEqual(self.upstream.fetch.call_count, 1)
+        self.assertEqual([record['date'] for record in second['price_data']],
+                         [record['date'] for record in first['price_data']])
+        self.assertAlmostEqual(second['price_data'][-1]['close_price'], first['price_data'][-1]['close_price'])
+
+    def test_period_and_start_are_cached_apart(self):
+        cache = self.cache()
+        today = date.today().isoformat()
+        cache.fetch('AAPL', period='1y')
+        cache.fetch('AAPL', period='1y', start=date(2024, 1, 1))
+        cache.fetch('AAPL', period='5y')
+
+        self.assertEqual(self.upstream.fetch.call_count, 3)
+        self.assertEqual(
+            sorted(path.name for path in (cache.directory / 'AAPL').iterdir()),
+            sorted([f'1y_{today}.npz', f'5y_{today}.npz', f'from-2024-01-01_{today}.npz'])
+        )
+
+    def test_expired_entry_is_refetched(self):
+        cache = self.cache(ttl=60)
+        cache.fetch('AAPL')
+        self.age(cache.path_for('AAPL'), 120)
+        cache.fetch('AAPL')
+
+        self.assertEqual(self.upstream.fetch.call_count, 2)
+
+    def test_response_with_todays_bar_expires_after_live_ttl(self):
+        records = make_records(30)
+        records[-1]['date'] = date.today()
+        self.upstream.fetch.side_effect = lambda symbol, period='1y', start=None: {
+            'success': True, 'price_data': records,
+        }
+        cache = self.cache(live_ttl=60)
+        cache.fetch('LIVE')
+        cache.fetch('LIVE')
+        self.assertEqual(self.upstream.fetch.call_count, 1)
+
+        # The first run may have stored an intraday bar, so a later run must see the close
+        self.age(cache.path_for('LIVE'), 120)
+        cache.fetch('LIVE')
+        self.assertEqual(self.upstream.fetch.call_count, 2)
+
+    def test_response_ending_with_the_previous_session_expires_after_live_ttl(self):
+        records = make_records(30)
+        records[-1]['date'] = utils.latest_trading_day(date.today() - timedelta(days=1))
+        self.upstream.fetch.side_effect = lambda symbol, period='1y', start=None: {
+            'success': True, 'price_data': records,
+        }
+        cache = self.cache(live_ttl=60)
+        cache.fetch('PREV', start=records[-5]['date'])
+
+        # Fetched before today's bar was posted; a resync later in the day must look for it
+        self.age(cache.path_for('PREV', start=records[-5]['date']), 120)
+        cache.fetch('PREV', start=records[-5]['date'])
+        self.assertEqual(self.upstream.fetch.call_count, 2)
+
+    def test_completed_bars_outlive_live_ttl(self):
+        cache = self.cache(live_ttl=60)
+        cache.fetch('AAPL')
+        self.age(cache.path_for('AAPL'), 120)
+        cache.fetch('AAPL')
+
+        self.assertEqual(self.upstream.fetch.call_count, 1)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = self.cache()
+        cache.fetch('AAA')
+        size = cache.path_for('AAA').stat().st_size
+        cache.max_bytes = int(size * 3.5)
+        cache.fetch('BBB')
+        cache.fetch('CCC')
+        # Reading AAA makes BBB the least recently used entry
+        cache.fetch('AAA')
+        cache.fetch('DDD')
+
+        self.assertTrue(cache.path_for('AAA').exists())
+        self.assertFalse(cache.path_for('BBB').exists())
+        self.assertTrue(cache.path_for('CCC').exists())
+        self.assertTrue(cache.path_for('DDD').exists())
+        self.assertEqual(self.upstream.fetch.call_count, 4)
+
+
+class FundamentalsProvider(MarketDataProvider):
+    """
+    Fundamentals from a dictionary of symbol to stock_data
+    """
+    name = 'test'
+
+    def __init__(self, fundamentals):
+        self.fundamentals = fundamentals
+
+    def fetch_fundamentals(self, symbol):
+        return {'success': True, 'stock_data': self.fundamentals[symbol]}
+
+
+class RefreshFundamentalsTests(TestCase):
+
+    def refresh(self, fundamentals):
+        return refresh_fundamentals(provider=FundamentalsProvider(fundamentals), rate=0, retries=0)
+
+    def test_missing_values_of_not_null_columns_are_not_saved(self):
+        Stock.objects.create(symbol='OLD', name='Old Corp', exchange='NYSE')
+        Stock.objects.create(symbol='NEW', name='NEW', exchange='')
+
+        stats = self.refresh({
+            'OLD': {'name': None, 'exchange': None, 'sector': None, 'pe_ratio': 12.5},
+            'NEW': {'name': 'New Corp', 'exchange': None, 'sector': 'Technology'},
+        })
+
+        self.assertEqual((stats['refreshed'], stats['failed']), (2, []))
+        self.assertEqual(
+            list(Stock.objects.order_by('symbol').values_list('symbol', 'name', 'exchange', 'sector', 'pe_ratio')),
+            [('NEW', 'New Corp', '', 'Technology', None), ('OLD', 'Old Corp', 'NYSE', None, 12.5)]
+        )
+
+    def test_failed_batch_is_saved_row_by_row(self):
+        for symbol in ('AAA', 'BAD', 'CCC'):
+            Stock.objects.create(symbol=symbol, name=symbol, exchange='NYSE')
+        save = Stock.save
+
+        def failing_save(stock, *args, **kwargs):
+            if stock.symbol == 'BAD':
+                raise DatabaseError('rejected')
+            return save(stock, *args, **kwargs)
+
+        with mock.patch.object(Stock.objects, 'bulk_update', side_effect=DatabaseError('rejected')), \
+                mock.patch.object(Stock, 'save', failing_save), \
+                self.assertLogs('stockanalysis', 'ERROR') as logs:
+            stats = self.refresh({symbol: {'sector': 'Energy'} for symbol in ('AAA', 'BAD', 'CCC')})
+
+        self.assertIn('Saving fundamentals of BAD failed', logs.output[0])
+        self.assertEqual((stats['refreshed'], stats['failed']), (2, ['BAD']))
+        self.assertEqual(
+            dict(Stock.objects.values_list('symbol', 'sector')),
+            {'AAA': 'Energy', 'BAD': None, 'CCC': 'Energy'}
+        )
+
+    def test_scheduled_task_refreshes_stale_stocks(self):
+        self.assertIn('stocks.tasks.refresh_fundamentals_task',
+                      [entry['task'] for entry in settings.CELERY_BEAT_SCHEDULE.values()])
+        Stock.objects.create(symbol='NEW', name='NEW', exchange='')
+
+        with mock.patch('stocks.fundamentals.get_provider',
+                        return_value=FundamentalsProvider({'NEW': {'name': 'New Corp', 'exchange': 'NASDAQ'}})):
+            self.assertEqual(tasks.refresh_fundamentals_task(), {'refreshed': 1, 'failed': []})
+        self.assertEqual(Stock.objects.filter(symbol='NEW').values_list('name', 'exchange').get(),
+                         ('New Corp', 'NASDAQ'))
+
+    @mock.patch.object(tasks.refresh_fundamentals_task, 'apply_async')
+    def test_new_stocks_queue_a_refresh(self, apply_async):
+        with self.captureOnCommitCallbacks(execute=True):
+            save_stock_data('NEW', {'price_data': make_records(5)})
+            save_stock_data('NEW', {'price_data': make_records(6)})
+        apply_async.assert_called_once_with(kwargs={'symbols': ['NEW']}, retry=False)
+
+        apply_async.reset_mock()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'prices.csv')
+            with open(path, 'w') as f:
+                f.write('symbol,date,open,high,low,close,volume\n'
+                        'NEW,2024-01-02,1,1,1,1,100\nFILE,2024-01-02,2,2,2,2,100\n')
+            log = StockDataImportLog.objects.create(import_type='csv', status='pending', file_path=path)
+            with self.captureOnCommitCallbacks(execute=True):
+                jobs.run_price_file_import(log, path, method='bulk', recompute=False)
+        apply_async.assert_called_once_with(kwargs={'symbols': ['FILE']}, retry=False)
+
+    @mock.patch.object(tasks.refresh_fundamentals_task, 'apply_async')
+    def test_pipeline_queues_one_refresh_per_run(self, apply_async):
+        Stock.objects.create(symbol='OLD', name='Old Corp')
+        with self.captureOnCommitCallbacks(execute=True):
+            run_import_pipeline(['AAA', 'OLD', 'BBB'], concurrency=1, rate=0,
+                                fetcher=lambda symbol, **kwargs: {'success': True, 'price_data': make_records(5)})
+        apply_async.assert_called_once_with(kwargs={'symbols': mock.ANY}, retry=False)
+        self.assertEqual(sorted(apply_async.call_args.kwargs['kwargs']['symbols']), ['AAA', 'BBB'])
+
+        apply_async.reset_mock()
+        with override_settings(CELERY_BROKER_URL=None, CELERY_TASK_ALWAYS_EAGER=False), \
+                self.captureOnCommitCallbacks(execute=True):
+            save_stock_data('CCC', {'price_data': make_records(5)})
+        apply_async.assert_not_called()
+
+
+class PanelIndicatorTests(TestCase):
+
+    def test_panel_matches_per_symbol_columns(self):
+        close = ragged_close()
+        columns, state = compute_panel_indicators(close)
+
+        for j in range(close.shape[1]):
+            mask = ~np.isnan(close[:, j])
+            expected_columns, expected_state = compute_indicator_columns(close[mask, j])
+            for field in INDICATOR_FIELDS:
+                np.testing.assert_array_equal(columns[field][mask, j], expected_columns[field], err_msg=field)
+                self.assertTrue(np.isnan(columns[field][~mask, j]).all(), field)
+            for field in STATE_FIELDS:
+                np.testing.assert_array_equal(state[field][j], np.float64(np.nan if expected_state[field] is None else expected_state[field]), err_msg=field)
+
+    def test_recompute_panel_matches_per_symbol_update(self):
+        close = ragged_close()
+        days = business_days(date(2024, 1, 1), date(2025, 12, 31))[:len(close)]
+        for j, symbol in enumerate(['FULL', 'LATE', 'GAPS', 'GONE']):
+            stock = Stock.objects.create(symbol=symbol, name=symbol)
+            upsert_stock_prices(stock.id, [
+                {'date': day.item(), 'open_price': price, 'high_price': price, 'low_price': price,
+                 'close_price': price, 'volume': 1000}
+                for day, price in zip(days, close[:, j]) if not np.isnan(price)
+            ])
+
+        recompute_panel()
+        panel = {symbol: stored_indicators(symbol) for symbol in ['FULL', 'LATE', 'GAPS', 'GONE']}
+        panel_states = {state.stock.symbol: state for state in StockIndicatorState.objects.select_related('stock')}
+
+        for symbol, rows in panel.items():
+            update_technical_indicators(symbol)
+            self.assertEqual(rows, stored_indicators(symbol), symbol)
+            single = StockIndicatorState.objects.get(stock__symbol=symbol)
+            for field in ['last_date'] + STATE_FIELDS:
+                self.assertEqual(getattr(panel_states[symbol], field), getattr(single, field), f'{symbol} {field}')
+
+
+class RecomputeIndicatorsCommandTests(TestCase):
+
+    def setUp(self):
+        for seed, symbol in enumerate(['AAA', 'BBB', 'CCC']):
+            stock = Stock.objects.create(symbol=symbol, name=symbol)
+            upsert_stock_prices(stock.id, make_records(80, seed=seed))
+
+    def test_stored_indicators_match_update_technical_indicators(self):
+        call_command('recompute_indicators', '--workers', '1', '--chunk-size', '2', stdout=StringIO())
+        recomputed = {symbol: stored_indicators(symbol) for symbol in ['AAA', 'BBB', 'CCC']}
+
+        for symbol, rows in recomputed.items():
+            self.assertIsNotNone(rows[-1][1], symbol)
+            update_technical_indicators(symbol)
+            self.assertEqual(rows, stored_indicators(symbol), symbol)
+
+    def test_failed_chunks_fail_the_command(self):
+        def recompute(symbols, **options):
+            if 'BBB' in symbols:
+                raise DatabaseError('deadlock detected')
+            return recompute_panel(symbols, **options)
+
+        with mock.patch('stocks.panel.recompute_panel', side_effect=recompute), \
+                self.assertRaisesMessage(CommandError, 'Failed stocks: BBB'):
+            call_command('recompute_indicators', '--workers', '1', '--chunk-size', '1',
+                         stdout=StringIO(), stderr=StringIO())
+        self.assertIsNotNone(stored_indicators('CCC')[-1][1])
+
+
+class StreamingIndicatorTests(TestCase):
+
+    def stream(self, make, prices, restore_at=None):
+        """
+        Feed prices one at a time, round-tripping the state through JSON at restore_at
+        """
+        indicator = make()
+        values = []
+        for i, price in enumerate(prices):
+            if i == restore_at:
+                indicator = type(indicator).restore(json.loads(json.dumps(indicator.snapshot())))
+            values.append(indicator.update(price))
+        return values
+
+    def test_streaming_matches_batch_kernels(self):
+        prices = make_records(2000, seed=3)
+        close = [record['close_price'] for record in prices]
+        macd = indicators.macd(close)
+        expected = {
+            'sma': (lambda: indicators.StreamingSMA(20), indicators.to_optional_list(indicators.ma(close, 20))),
+            'ema': (lambda: indicators.StreamingEMA(12), indicators.to_optional_list(indicators.ema(close, 12))),
+            'rsi': (lambda: indicators.StreamingRSI(14), indicators.to_optional_list(indicators.rsi(close, 14))),
+        }
+
+        for restore_at in (None, 7, 1000):
+            for name, (make, batch) in expected.items():
+                self.assertEqual(self.stream(make, close, restore_at), batch, f'{name} restored at {restore_at}')
+
+            streamed = self.stream(indicators.StreamingMACD, close, restore_at)
+            for key in ('macd', 'signal', 'histogram'):
+                self.assertEqual([value[key] for value in streamed], indicators.to_optional_list(macd[key]),
+                                 f'macd {key} restored at {restore_at}')
+
+
+class SyntheticMarketTests(TestCase):
+
+    def generate(self, prefix, method, seed=7):
+        call_command('import_stock_data', '--generate', '--symbols', '3', '--years', '1', '--seed', str(seed),
+                     '--prefix', prefix, '--method', method, '--batch-size', '2', stdout=StringIO())
+
+    def test_bars_are_consistent(self):
+        bars = generate_ohlcv(2000, 20, np.random.default_rng(3))
+
+        self.assertEqual({values.shape for values in bars.values()}, {(2000, 20)})
+        for field in ('open_price', 'close_price'):
+            self.assertTrue((bars['low_price'] <= bars[field]).all(), field)
+            self.assertTrue((bars[field] <= bars['high_price']).all(), field)
+        for field in ('open_price', 'high_price', 'low_price', 'close_price'):
+            self.assertGreaterEqual(bars[field].min(), MIN_PRICE)
+            self.assertTrue(np.array_equal(bars[field], np.round(bars[field], 2)), field)
+        self.assertTrue(np.issubdtype(bars['volume'].dtype, np.integer))
+        self.assertGreater(bars['volume'].min(), 0)
+
+    def test_same_seed_generates_the_same_bars(self):
+        first = generate_ohlcv(100, 5, np.random.default_rng(11))
+        again = generate_ohlcv(100, 5, np.random.default_rng(11))
+        other = generate_ohlcv(100, 5, np.random.default_rng(12))
+
+        for field in first:
+            self.assertTrue(np.array_equal(first[field], again[field]), field)
+        self.assertFalse(np.array_equal(first['close_price'], other['close_price']))
+
+    def test_business_days_skip_weekends(self):
+        days = business_days(date(2024, 1, 1), date(2024, 1, 14))
+
+        self.assertEqual(len(days), 10)
+        self.assertEqual((days[0].item(), days[-1].item()), (date(2024, 1, 1), date(2024, 1, 12)))
+        self.assertTrue(all(day.weekday() < 5 for day in days.tolist()))
+
+    def test_generated_market_is_reproducible(self):
+        self.generate('AA', 'bulk')
+        self.generate('BB', 'bulk')
+
+        self.assertEqual(Stock.objects.filter(symbol__startswith='AA').count(), 3)
+        for i in range(3):
+            a, b = stored_indicators(f'AA{i:04d}'), stored_indicators(f'BB{i:04d}')
+            self.assertGreater(len(a), 250)
+            self.assertTrue(all(day.weekday() < 5 for day, *_ in a))
+            self.assertEqual(a, b)
+
+    @skipUnless(connection.vendor == 'postgresql', 'The COPY loader requires PostgreSQL')
+    @override_settings(STOCK_INDICATOR_STORAGE='decimal')
+    def test_copy_with_indicators_matches_bulk_and_recompute(self):
+        self.generate('CP', 'copy')
+        self.generate('BK', 'bulk')
+
+        state_fields = ['last_date', 'last_close', 'ema_12', 'ema_26', 'macd_signal', 'rsi_avg_gain', 'rsi_avg_loss']
+        for i in range(3):
+            copied, recomputed = f'CP{i:04d}', f'BK{i:04d}'
+            self.assertEqual(stored_indicators(copied), stored_indicators(recomputed))
+            copied_state = StockIndicatorState.objects.values(*state_fields).get(stock__symbol=copied)
+            recomputed_state = StockIndicatorState.objects.values(*state_fields).get(stock__symbol=recomputed)
+            for field in state_fields:
+                if isinstance(copied_state[field], float):
+                    self.assertAlmostEqual(copied_state[field], recomputed_state[field], places=6, msg=field)
+                else:
+                    self.assertEqual(copied_state[field], recomputed_state[field], field)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'The COPY loader requires PostgreSQL')
+class CopyLoaderTests(TestCase):
+
+    def stored_bars(self, stock):
+        return list(StockPrice.objects.filter(stock=stock).order_by('date').values_list('date', *PRICE_FIELDS))
+
+    def test_copy_matches_bulk_upsert(self):
+        records = make_records(300, seed=4)
+        # A re-fetch overlapping the first load, with revised closes and a duplicated bar
+        revised = [dict(record, close_price=record['close_price'] + 1) for record in records[250:]]
+        revised.append(dict(revised[-1], close_price=revised[-1]['close_price'] + 1))
+        bulk, copy = Stock.objects.create(symbol='BULK', name='BULK'), Stock.objects.create(symbol='COPY', name='COPY')
+
+        upsert_stock_prices(bulk.id, records[:280])
+        upsert_stock_prices(bulk.id, revised[:-2] + revised[-1:])
+        for batch in (records[:280], revised):
+            stats = copy_stock_prices((copy.id, record['date'], *(record[field] for field in PRICE_FIELDS))
+                                      for record in batch)
+            self.assertEqual(stats['rows'], len(batch))
+
+        self.assertEqual(self.stored_bars(copy), self.stored_bars(bulk))
+        self.assertEqual(len(self.stored_bars(copy)), 300)
+
+
+class WriteStrategyTests(TestCase):
+
+    def write(self, symbol, strategy):
+        """
+        Store the same bars under a new symbol and write their indicators with a strategy
+        """
+        stock = Stock.objects.create(symbol=symbol, name=symbol)
+        upsert_stock_prices(stock.id, make_records(120, seed=5))
+        rows = list(StockPrice.objects.filter(stock=stock).order_by('date').values_list('id', 'close_price'))
+        columns, _ = compute_indicator_columns([float(close) for _, close in rows])
+        stats = write_indicator_columns([price_id for price_id, _ in rows], columns, strategy=strategy, chunk_size=50)
+        self.assertEqual(stats['rows'], len(rows))
+        prices = with_indicators(StockPrice.objects.filter(stock=stock).order_by('date'))
+        return [indicator_values(price) for price in prices]
+
+    def assert_strategies_match(self, strategies):
+        expected = self.write('BASE', 'bulk_update')
+        self.assertTrue(any(value is not None for value in expected[-1].values()))
+        for i, strategy in enumerate(strategies):
+            self.assertEqual(self.write(f'S{i}', strategy), expected, strategy)
+
+    def test_strategies_store_the_same_values(self):
+        strategies = ['executemany', 'auto']
+        if connection.vendor == 'postgresql':
+            strategies.append('temp_table')
+        self.assert_strategies_match(strategies)
+
+    def test_float_storage_stores_the_same_values(self):
+        decimal = self.write('DEC', 'bulk_update')
+        with override_settings(STOCK_INDICATOR_STORAGE='float'):
+            self.assertEqual(self.write('FLT', 'bulk_update'), decimal)
+
+    @skipIf(connection.vendor == 'postgresql', 'temp_table is available on PostgreSQL')
+    def test_temp_table_requires_postgresql(self):
+        with self.assertRaises(ValueError):
+            write_indicator_columns([1], {'ma_5': np.array([1.0])}, strategy='temp_table')
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Query plans are checked on PostgreSQL')
+class QueryPlanTests(TestCase):
+
+    def latest_index_names(self):
+        """
+        The covering latest-price index and, on a partitioned table, its partition indexes
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = 'stock_prices_latest_idx'::regclass"
+            )
+            return ['stock_prices_latest_idx'] + [name for name, in cursor.fetchall()]
+
+    def test_hot_queries_use_indexes(self):
+        output = StringIO()
+        call_command('check_query_plans', '--seed', '20', '--seed-years', '3', stdout=output)
+        self.assertIn('use indexes', output.getvalue())
+
+        stock = Stock.objects.get(symbol='QP0000')
+        plan = stock.prices.values('close_price', 'date', 'volume')[:1].explain()
+        self.assertTrue(any(name in plan for name in self.latest_index_names()), plan)
+
+    def test_symbol_without_prices_is_rejected(self):
+        Stock.objects.create(symbol='EMPTY', name='Empty')
+        with self.assertRaisesMessage(CommandError, 'Stock EMPTY has no prices to explain'):
+            call_command('check_query_plans', '--symbol', 'empty', stdout=StringIO())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'stock_prices is only partitioned on PostgreSQL')
+class PartitionTests(TestCase):
+
+    def partition_counts(self):
+        """
+        Bars stored in each partition of stock_prices
+        """
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT tableoid::regclass::text, count(*) FROM stock_prices GROUP BY 1")
+            return dict(cursor.fetchall())
+
+    def test_new_year_partitions_take_their_bars_from_the_default_partition(self):
+        this_year = date.today().year
+        self.assertTrue(partitions.is_partitioned())
+        stock = Stock.objects.create(symbol='PART', name='PART')
+        days = [date(2001, 3, 1), date(2001, 12, 31), date(2002, 1, 2), date(this_year, 1, 2)]
+        upsert_stock_prices(stock.id, [dict(record, date=day) for record, day in zip(make_records(4), days)])
+
+        self.assertEqual(self.partition_counts(), {
+            partitions.default_partition_name(): 3,
+            partitions.partition_name(this_year): 1,
+        })
+
+        with self.assertLogs('stockanalysis', 'INFO'):
+            created = partitions.create_year_partitions(2001, 2002)
+        self.assertEqual(created, [partitions.partition_name(2001), partitions.partition_name(2002)])
+        self.assertEqual(self.partition_counts(), {
+            partitions.partition_name(2001): 2,
+            partitions.partition_name(2002): 1,
+            partitions.partition_name(this_year): 1,
+        })
+        self.assertEqual(partitions.create_year_partitions(2001, 2002), [])
+        self.assertEqual(list(stock.prices.values_list('date', flat=True)), days[::-1])
+
+        plan = stock.prices.filter(date__gte=date(2001, 6, 1), date__lt=date(2002, 1, 1)).values('date')[:1].explain()
+        self.assertIn(partitions.partition_name(2001), plan)
+        for name in (partitions.partition_name(2002), partitions.partition_name(this_year),
+                     partitions.default_partition_name()):
+            self.assertNotIn(name, plan)
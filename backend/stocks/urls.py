@@ -17,8 +17,9 @@ urlpatterns = [
     path('favorite/list/', views.FavoriteStockListView.as_view(), name='favorite_list'),
     
     # import data
-    # path('import/excel/', views.ExcelImportView.as_view(), name='import_excel'),
-    # path('import/api/', views.ImportAPIDataView.as_view(), name='import_api'),
-    # path('import/logs/', views.ImportLogListView.as_view(), name='import_logs'),
+    path('import/excel/', views.ExcelImportView.as_view(), name='import_excel'),
+    path('import/api/', views.ImportAPIDataView.as_view(), name='import_api'),
+    path('import/logs/', views.ImportLogListView.as_view(), name='import_logs'),
+    path('import/logs/<int:pk>/', views.ImportLogDetailView.as_view(), name='import_log_detail'),
 
 ] 
\ No newline at end of file
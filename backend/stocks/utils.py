@@ -1,10 +1,20 @@
+import os
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Any
+import openpyxl
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from decimal import Decimal
-from datetime import datetime, date
-import yfinance as yf
-from .models import Stock, StockPrice
+from datetime import datetime, date, timedelta
+from functools import lru_cache
+from bisect import bisect_left
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from .models import Stock, StockPrice, StockIndicatorState
+from . import indicators
+from .bulk import PRICE_FIELDS, copy_stock_prices, upsert_stock_prices, write_indicator_columns
+from .providers import YFinanceProvider, get_provider
+from .storage import INDICATOR_FIELDS
 
 
 def calculate_ma(prices: List[float], period: int) -> List[float]:
@@ -18,17 +28,7 @@ def calculate_ma(prices: List[float], period: int) -> List[float]:
     Returns:
         List of moving averages
     """
-    if len(prices) < period:
-        return [None] * len(prices)
-    
-    ma_values = []
-    for i in range(len(prices)):
-        if i < period - 1:
-            ma_values.append(None)
-        else:
-            ma_values.append(sum(prices[i-period+1:i+1]) / period)
-    
-    return ma_values
+    return indicators.to_optional_list(indicators.ma(prices, period))
 
 
 def calculate_ema(prices: List[float], period: int) -> List[float]:
@@ -42,23 +42,7 @@ def calculate_ema(prices: List[float], period: int) -> List[float]:
     Returns:
         List of exponential moving averages
     """
-    if len(prices) < period:
-        return [None] * len(prices)
-    
-    multiplier = 2 / (period + 1)
-    ema_values = []
-    
-    # First value uses SMA
-    sma = sum(prices[:period]) / period
-    ema_values.extend([None] * (period - 1))
-    ema_values.append(sma)
-    
-    # Subsequent values use EMA formula
-    for i in range(period, len(prices)):
-        ema = (prices[i] * multiplier) + (ema_values[i-1] * (1 - multiplier))
-        ema_values.append(ema)
-    
-    return ema_values
+    return indicators.to_optional_list(indicators.ema(prices, period))
 
 
 def calculate_macd(prices: List[float], fast_period: int = 12, slow_period: int = 26, signal_period: int = 9) -> Dict[str, List[float]]:
@@ -74,36 +58,8 @@ def calculate_macd(prices: List[float], fast_period: int = 12, slow_period: int
     Returns:
         Dictionary containing MACD, signal line, histogram
     """
-    ema_fast = calculate_ema(prices, fast_period)
-    ema_slow = calculate_ema(prices, slow_period)
-    
-    # Calculate MACD line
-    macd_line = []
-    for i in range(len(prices)):
-        if ema_fast[i] is None or ema_slow[i] is None:
-            macd_line.append(None)
-        else:
-            macd_line.append(ema_fast[i] - ema_slow[i])
-    
-    # Calculate signal line
-    macd_signal = calculate_ema([x for x in macd_line if x is not None], signal_period)
-    
-    # Pad with None values
-    signal_values = [None] * (len(macd_line) - len(macd_signal)) + macd_signal
-    
-    # Calculate histogram
-    histogram = []
-    for i in range(len(macd_line)):
-        if macd_line[i] is None or signal_values[i] is None:
-            histogram.append(None)
-        else:
-            histogram.append(macd_line[i] - signal_values[i])
-    
-    return {
-        'macd': macd_line,
-        'signal': signal_values,
-        'histogram': histogram
-    }
+    macd_data = indicators.macd(prices, fast_period, slow_period, signal_period)
+    return {key: indicators.to_optional_list(values) for key, values in macd_data.items()}
 
 
 def calculate_rsi(prices: List[float], period: int = 14) -> List[float]:
@@ -115,195 +71,452 @@ def calculate_rsi(prices: List[float], period: int = 14) -> List[float]:
         period: Period
     
     Returns:
-        List of RSI values
+        List of RSI values aligned with prices
+    """
+    return indicators.to_optional_list(indicators.rsi(prices, period))
+
+
+MA_PERIODS = (5, 10, 20, 50)
+
+
+def _indicator_state(close: np.ndarray, columns: Dict[str, np.ndarray], avg_gain: np.ndarray, avg_loss: np.ndarray) -> Dict[str, Optional[float]]:
+    """
+    Extract the running indicator values of the last bar
+    """
+    values = {
+        'last_close': close[-1],
+        'ema_12': columns['ema_12'][-1],
+        'ema_26': columns['ema_26'][-1],
+        'macd_signal': columns['macd_signal'][-1],
+        'rsi_avg_gain': avg_gain[-1],
+        'rsi_avg_loss': avg_loss[-1],
+    }
+    return {key: None if np.isnan(value) else float(value) for key, value in values.items()}
+
+
+def calculate_indicator_arrays(close: np.ndarray) -> Tuple[Dict[str, np.ndarray], np.ndarray, np.ndarray]:
     """
-    if len(prices) < period + 1:
-        return [None] * len(prices)
+    Calculate the stored indicator columns from a close price array
     
-    # Calculate price changes
-    price_changes = []
-    for i in range(1, len(prices)):
-        price_changes.append(prices[i] - prices[i-1])
+    Args:
+        close: Close prices of shape (n,) or (n, k) in date order, without gaps
+    
+    Returns:
+        Tuple of (indicator arrays keyed by field name, RSI average gains, RSI average losses)
+    """
+    result = indicators.compute_indicator_set(
+        close,
+        ma_periods=MA_PERIODS,
+        ema_periods=(12, 26),
+        macd_params=(12, 26, 9),
+        rsi_periods=(14,),
+        include_state=True,
+    )
+    result['rsi'] = result.pop('rsi_14')
+    columns = {field: result[field] for field in INDICATOR_FIELDS}
+    return columns, result['rsi_14_avg_gain'], result['rsi_14_avg_loss']
+
+
+def compute_indicator_columns(close_prices) -> Tuple[Dict[str, np.ndarray], Dict[str, Optional[float]]]:
+    """
+    Calculate the stored indicator columns for a full price history
     
-    # Separate gains and losses
-    gains = [max(change, 0) for change in price_changes]
-    losses = [-min(change, 0) for change in price_changes]
+    Args:
+        close_prices: Close prices in date order
     
-    rsi_values = [None]  # First value is None
+    Returns:
+        Tuple of (indicator arrays keyed by field name, running state of the last bar)
+    """
+    close = indicators.as_float_array(close_prices)
+    columns, avg_gain, avg_loss = calculate_indicator_arrays(close)
+    return columns, _indicator_state(close, columns, avg_gain, avg_loss)
+
+
+def continue_indicator_columns(history_prices, new_prices, state: Dict[str, float]) -> Tuple[Dict[str, np.ndarray], Dict[str, Optional[float]]]:
+    """
+    Calculate the stored indicator columns for newly appended bars only
     
-    # Calculate initial average values
-    avg_gain = sum(gains[:period]) / period
-    avg_loss = sum(losses[:period]) / period
+    Args:
+        history_prices: Trailing close prices before the new bars (at least max(MA_PERIODS) - 1 when available)
+        new_prices: Close prices of the new bars in date order
+        state: Running state of the bar preceding new_prices
     
-    # Calculate RSI
-    for i in range(period, len(price_changes)):
-        if avg_loss == 0:
-            rsi = 100
-        else:
-            rs = avg_gain / avg_loss
-            rsi = 100 - (100 / (1 + rs))
-        
-        rsi_values.append(rsi)
-        
-        # Update average values
-        avg_gain = ((avg_gain * (period - 1)) + gains[i]) / period
-        avg_loss = ((avg_loss * (period - 1)) + losses[i]) / period
+    Returns:
+        Tuple of (indicator arrays for the new bars, running state of the last bar)
+    """
+    history = indicators.as_float_array(history_prices)
+    close = indicators.as_float_array(new_prices)
+    count = len(close)
+    
+    window = np.concatenate([history, close])
+    columns = {f'ma_{period}': indicators.ma(window, period)[-count:] for period in MA_PERIODS}
+    columns['ema_12'] = indicators.continue_ema(close, 12, state['ema_12'])
+    columns['ema_26'] = indicators.continue_ema(close, 26, state['ema_26'])
+    columns['macd'] = columns['ema_12'] - columns['ema_26']
+    columns['macd_signal'] = indicators.continue_ema(columns['macd'], 9, state['macd_signal'])
+    columns['macd_histogram'] = columns['macd'] - columns['macd_signal']
+    
+    avg_gain, avg_loss = indicators.continue_wilder_averages(
+        close, 14, state['last_close'], state['rsi_avg_gain'], state['rsi_avg_loss']
+    )
+    columns['rsi'] = indicators.rsi_from_averages(avg_gain, avg_loss)
+    
+    return columns, _indicator_state(close, columns, avg_gain, avg_loss)
+
+
+def _save_indicator_state(stock: Stock, last_date: date, state: Dict[str, Optional[float]]) -> None:
+    """
+    Persist the running indicator state of a stock
+    """
+    StockIndicatorState.objects.update_or_create(
+        stock=stock,
+        defaults={'last_date': last_date, **state}
+    )
+
+
+def _update_indicators_full(stock: Stock, strategy: str) -> bool:
+    """
+    Recalculate indicators over the full price history of a stock
+    """
+    rows = list(StockPrice.objects.filter(stock=stock).order_by('date').values_list('id', 'date', 'close_price'))
     
-    return rsi_values
+    if not rows:
+        return False
+    
+    columns, state = compute_indicator_columns([float(close) for _, _, close in rows])
+    with transaction.atomic():
+        write_indicator_columns([price_id for price_id, _, _ in rows], columns, strategy=strategy)
+        _save_indicator_state(stock, rows[-1][1], state)
+    return True
 
 
-def update_technical_indicators(stock_symbol: str) -> bool:
+def _update_indicators_incremental(stock: Stock, strategy: str) -> Optional[bool]:
+    """
+    Calculate indicators only for bars after the stored running state
+    
+    Returns:
+        Whether update was successful, or None when a full recalculation is needed
+    """
+    state = StockIndicatorState.objects.filter(stock=stock).first()
+    if state is None or not state.is_seeded:
+        return None
+    
+    new_prices = list(
+        StockPrice.objects.filter(stock=stock, date__gt=state.last_date)
+        .order_by('date')
+        .values_list('id', 'date', 'close_price')
+    )
+    if not new_prices:
+        return True
+    
+    history = list(
+        StockPrice.objects.filter(stock=stock, date__lte=state.last_date)
+        .order_by('-date')
+        .values_list('close_price', flat=True)[:max(MA_PERIODS) - 1]
+    )[::-1]
+    
+    # The last processed bar was revised or removed, so the running state is stale
+    if not history or float(history[-1]) != state.last_close:
+        return None
+    
+    columns, new_state = continue_indicator_columns(
+        [float(close) for close in history],
+        [float(close) for _, _, close in new_prices],
+        {
+            'last_close': state.last_close,
+            'ema_12': state.ema_12,
+            'ema_26': state.ema_26,
+            'macd_signal': state.macd_signal,
+            'rsi_avg_gain': state.rsi_avg_gain,
+            'rsi_avg_loss': state.rsi_avg_loss,
+        }
+    )
+    with transaction.atomic():
+        write_indicator_columns([price_id for price_id, _, _ in new_prices], columns, strategy=strategy)
+        _save_indicator_state(stock, new_prices[-1][1], new_state)
+    return True
+
+
+def update_technical_indicators(stock_symbol: str, incremental: bool = False, strategy: str = 'auto') -> bool:
     """
     Update technical indicators for stock
     
     Args:
         stock_symbol: Stock symbol
+        incremental: Only process bars appended since the last update, falling
+            back to a full recalculation when no usable running state exists
+        strategy: Bulk write strategy ('auto', 'bulk_update', 'executemany' or 'temp_table')
     
     Returns:
         Whether update was successful
     """
     try:
         stock = Stock.objects.get(symbol=stock_symbol)
-        prices = StockPrice.objects.filter(stock=stock).order_by('date')
-        
-        if not prices.exists():
-            return False
-        
-        # Get price data
-        close_prices = [float(price.close_price) for price in prices]
-        
-        # Calculate technical indicators
-        ma_5 = calculate_ma(close_prices, 5)
-        ma_10 = calculate_ma(close_prices, 10)
-        ma_20 = calculate_ma(close_prices, 20)
-        ma_50 = calculate_ma(close_prices, 50)
-        
-        ema_12 = calculate_ema(close_prices, 12)
-        ema_26 = calculate_ema(close_prices, 26)
         
-        macd_data = calculate_macd(close_prices)
-        rsi_values = calculate_rsi(close_prices)
+        if incremental:
+            result = _update_indicators_incremental(stock, strategy)
+            if result is not None:
+                return result
         
-        # Update database
-        for i, price in enumerate(prices):
-            price.ma_5 = Decimal(str(ma_5[i])) if ma_5[i] is not None else None
-            price.ma_10 = Decimal(str(ma_10[i])) if ma_10[i] is not None else None
-            price.ma_20 = Decimal(str(ma_20[i])) if ma_20[i] is not None else None
-            price.ma_50 = Decimal(str(ma_50[i])) if ma_50[i] is not None else None
-            
-            price.ema_12 = Decimal(str(ema_12[i])) if ema_12[i] is not None else None
-            price.ema_26 = Decimal(str(ema_26[i])) if ema_26[i] is not None else None
-            
-            price.macd = Decimal(str(macd_data['macd'][i])) if macd_data['macd'][i] is not None else None
-            price.macd_signal = Decimal(str(macd_data['signal'][i])) if macd_data['signal'][i] is not None else None
-            price.macd_histogram = Decimal(str(macd_data['histogram'][i])) if macd_data['histogram'][i] is not None else None
-            
-            price.rsi = rsi_values[i] if rsi_values[i] is not None else None
-            price.save()
-        
-        return True
+        return _update_indicators_full(stock, strategy)
         
     except Exception as e:
         print(f"Error updating technical indicators for {stock_symbol}: {e}")
         return False
 
 
-def fetch_stock_data_from_yfinance(symbol: str, period: str = "1y") -> Dict[str, Any]:
+# Extended indicators available on demand, with their default parameters
+EXTRA_INDICATORS = {
+    'bollinger': {'bollinger': (20, 2.0)},
+    'atr': {'atr_period': 14},
+    'stochastic': {'stochastic': (14, 3)},
+    'obv': {'obv': True},
+    'vwap': {'vwap_period': 20},
+}
+
+
+@lru_cache(maxsize=getattr(settings, 'TECHNICAL_INDICATOR_CACHE_SIZE', 256))
+def compute_custom_indicators(symbol: str, last_date: date, prices_updated_at: Optional[datetime] = None,
+                              ma_periods: Tuple[int, ...] = (),
+                              ema_periods: Tuple[int, ...] = (), rsi_periods: Tuple[int, ...] = (),
+                              macd_params: Optional[Tuple[int, int, int]] = None,
+                              extras: Tuple[str, ...] = (),
+                              start_date: Optional[date] = None, end_date: Optional[date] = None,
+                              limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Calculate indicators with arbitrary periods from price history, memoized in an LRU cache
+    
+    Args:
+        symbol: Stock symbol
+        last_date: Date of the stock's latest bar; only used as part of the cache
+            key, so new bars invalidate cached results
+        prices_updated_at: updated_at of the Stock, which the price writers bump;
+            only used as part of the cache key, so revised bars, which do not
+            add a new last date, invalidate cached results too, even when their
+            indicators were not recomputed
+        ma_periods: Moving average periods
+        ema_periods: Exponential moving average periods
+        rsi_periods: RSI periods
+        macd_params: (fast, slow, signal) periods, or None to skip MACD
+        extras: Names from EXTRA_INDICATORS to add with default parameters
+        start_date: First date to return (earlier bars are still used for warm-up)
+        end_date: Last date to return
+        limit: Maximum number of most recent rows to return
+    
+    Returns:
+        List of indicator rows, newest first. The list is shared between
+        callers through the cache and must not be modified.
+    """
+    prices = StockPrice.objects.filter(stock__symbol=symbol).order_by('date')
+    if end_date:
+        prices = prices.filter(date__lte=end_date)
+    rows = list(prices.values_list('date', 'close_price', 'high_price', 'low_price', 'volume'))
+    
+    if not rows:
+        return []
+    
+    dates, closes, highs, lows, volumes = zip(*rows)
+    options = {}
+    for name in extras:
+        options.update(EXTRA_INDICATORS[name])
+    
+    columns = indicators.compute_indicator_set(
+        np.array(closes, dtype=np.float64),
+        high=np.array(highs, dtype=np.float64),
+        low=np.array(lows, dtype=np.float64),
+        volume=np.array(volumes, dtype=np.float64),
+        ma_periods=ma_periods,
+        ema_periods=ema_periods,
+        macd_params=macd_params,
+        rsi_periods=rsi_periods,
+        **options
+    )
+    
+    first = 0
+    if start_date:
+        first = bisect_left(dates, start_date)
+    if limit is not None:
+        first = max(first, len(dates) - limit)
+    
+    values = {key: indicators.to_optional_list(np.round(array[first:], 4)) for key, array in columns.items()}
+    
+    data = []
+    for offset, i in enumerate(range(first, len(rows))):
+        row = {'date': dates[i], 'close_price': closes[i]}
+        for key in columns:
+            row[key] = values[key][offset]
+        data.append(row)
+    
+    data.reverse()
+    return data
+
+
+def fetch_stock_data_from_yfinance(symbol: str, period: str = "1y", start: Optional[date] = None) -> Dict[str, Any]:
     """
     Fetch stock data from Yahoo Finance
     
     Args:
         symbol: Stock symbol
         period: Data period (1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max)
+        start: Only fetch bars from this date onward (overrides period)
     
     Returns:
         Dictionary containing stock data and metadata
     """
-    try:
-        ticker = yf.Ticker(symbol)
-        
-        # Get stock info
-        info = ticker.info
-        
-        # Get historical data
-        hist = ticker.history(period=period)
-        
-        if hist.empty:
-            return {'success': False, 'error': f'No data found for symbol {symbol}'}
-        
-        # Prepare stock basic information
-        stock_data = {
-            'symbol': symbol,
-            'name': info.get('longName', symbol),
-            'exchange': info.get('exchange', ''),
-            'sector': info.get('sector', ''),
-            'industry': info.get('industry', ''),
-            'market_cap': info.get('marketCap'),
-            'description': info.get('longBusinessSummary', ''),
-            'pe_ratio': info.get('trailingPE'),
-            'pb_ratio': info.get('priceToBook'),
-            'dividend_yield': info.get('dividendYield'),
-        }
-        
-        # Prepare price data
-        price_data = []
-        for date_idx, row in hist.iterrows():
-            price_data.append({
-                'date': date_idx.date(),
-                'open_price': float(row['Open']),
-                'high_price': float(row['High']),
-                'low_price': float(row['Low']),
-                'close_price': float(row['Close']),
-                'volume': int(row['Volume'])
-            })
-        
-        return {
-            'success': True,
-            'stock_data': stock_data,
-            'price_data': price_data
-        }
-        
-    except Exception as e:
-        return {'success': False, 'error': str(e)}
+    return YFinanceProvider().fetch(symbol, period=period, start=start)
 
 
-def import_stock_data(symbol: str) -> bool:
+# How import_stock_data writes price bars: ORM bulk upsert, or PostgreSQL COPY
+PRICE_LOAD_METHODS = ('bulk', 'copy')
+
+# Calendar days re-fetched before the last stored bar, to pick up revised bars
+DELTA_SYNC_OVERLAP_DAYS = 7
+
+
+def latest_trading_day(today: Optional[date] = None) -> date:
+    """
+    Most recent weekday on or before today (exchange holidays are not known here)
+    """
+    today = today or date.today()
+    return today - timedelta(days=max(0, today.weekday() - 4))
+
+
+def delta_sync_starts(symbols: List[str]) -> Dict[str, Tuple[Optional[date], bool]]:
+    """
+    Work out where a delta sync of each stock should start, with one query
+    
+    Args:
+        symbols: Stock symbols
+    
+    Returns:
+        Dictionary of symbol to (fetch start date or None when nothing is stored yet,
+        whether the stored data is already current)
+    """
+    last_dates = dict(
+        StockPrice.objects.filter(stock__symbol__in=symbols)
+        .values('stock__symbol').annotate(last=Max('date'))
+        .values_list('stock__symbol', 'last')
+    )
+    current_day = latest_trading_day()
+    starts = {}
+    for symbol in symbols:
+        last_date = last_dates.get(symbol)
+        if last_date is None:
+            starts[symbol] = (None, False)
+        else:
+            starts[symbol] = (last_date - timedelta(days=DELTA_SYNC_OVERLAP_DAYS), last_date >= current_day)
+    return starts
+
+
+def delta_sync_start(symbol: str) -> Tuple[Optional[date], bool]:
+    """
+    Work out where a delta sync of a stock should start
+    
+    Args:
+        symbol: Stock symbol
+    
+    Returns:
+        Tuple of (fetch start date or None when nothing is stored yet, whether the stored data is already current)
+    """
+    return delta_sync_starts([symbol])[symbol]
+
+
+def save_stock_data(symbol: str, result: Dict[str, Any], method: str = 'bulk',
+                    new_stocks: Optional[List[str]] = None) -> int:
+    """
+    Store a successful fetch result: price bars and technical indicators
+    
+    Args:
+        symbol: Stock symbol
+        result: Result of fetch_stock_data_from_yfinance (or a compatible fetcher)
+        method: Price load method, 'bulk' or 'copy' (PostgreSQL only)
+        new_stocks: Collects the symbol when the stock is created, for the caller
+            to queue one fundamentals refresh per run; when None, the refresh
+            of a created stock is queued right away
+    
+    Returns:
+        Number of price bars written
+    """
+    price_data = result['price_data']
+    
+    # New stocks get their name and fundamentals from the refresh_fundamentals job
+    stock, created = Stock.objects.get_or_create(
+        symbol=symbol,
+        defaults={'name': symbol}
+    )
+    if created and new_stocks is not None:
+        new_stocks.append(symbol)
+    elif created:
+        # tasks imports this module through jobs
+        from .tasks import queue_fundamentals_refresh
+        queue_fundamentals_refresh([symbol])
+    
+    # Detect revised closes of bars we already have, and missing bars filled in at or before
+    # the last processed one, which both invalidate the running indicator state
+    existing_closes = dict(
+        StockPrice.objects.filter(stock=stock, date__in=[record['date'] for record in price_data])
+        .values_list('date', 'close_price')
+    )
+    state_date = StockIndicatorState.objects.filter(stock=stock).values_list('last_date', flat=True).first()
+    revised = any(
+        existing_closes[record['date']] != Decimal(str(record['close_price'])).quantize(Decimal('0.01'))
+        if record['date'] in existing_closes
+        else state_date is not None and record['date'] <= state_date
+        for record in price_data
+    )
+    
+    # Import price data
+    if method == 'copy':
+        copy_stock_prices(
+            (stock.id, record['date'], *(record[field] for field in PRICE_FIELDS))
+            for record in price_data
+        )
+    else:
+        upsert_stock_prices(stock.id, price_data)
+    
+    # Update technical indicators
+    update_technical_indicators(symbol, incremental=not revised)
+    return len(price_data)
+
+
+def import_stock_data(symbol: str, method: str = 'bulk', period: str = '1y', full: bool = False,
+                      provider=None) -> bool:
     """
     Import stock data from external API
     
+    Only bars after the last stored one (plus a short overlap) are fetched, and
+    nothing is fetched when the stored data is already current.
+    
     Args:
         symbol: Stock symbol
+        method: Price load method, 'bulk' or 'copy' (PostgreSQL only)
+        period: History period for the first import of a stock, or with full=True
+        full: Re-download the whole period instead of syncing the delta
+        provider: Market data provider, defaults to get_provider()
     
     Returns:
         Whether import was successful
     """
+    if method not in PRICE_LOAD_METHODS:
+        raise ValueError(f"Unknown price load method: {method}")
+    
     try:
-        # Fetch data from Yahoo Finance
-        result = fetch_stock_data_from_yfinance(symbol)
+        start = None
+        if not full:
+            start, current = delta_sync_start(symbol)
+            if current:
+                print(f"Data for {symbol} is already up to date")
+                return True
+        
+        # Fetch data from the market data provider
+        provider = provider or get_provider()
+        result = provider.fetch(symbol, period=period, start=start)
         
         if not result['success']:
             print(f"Failed to fetch data for {symbol}: {result['error']}")
             return False
         
-        stock_data = result['stock_data']
-        price_data = result['price_data']
-        
-        # Create or update stock
-        stock, created = Stock.objects.update_or_create(
-            symbol=symbol,
-            defaults=stock_data
-        )
-        
-        # Import price data
-        for price_record in price_data:
-            StockPrice.objects.update_or_create(
-                stock=stock,
-                date=price_record['date'],
-                defaults=price_record
-            )
-        
-        # Update technical indicators
-        update_technical_indicators(symbol)
+        save_stock_data(symbol, result, method=method)
         
         print(f"Successfully imported data for {symbol}")
         return True
@@ -313,44 +526,239 @@ def import_stock_data(symbol: str) -> bool:
         return False
 
 
+# Stock columns a metadata file can set; a file only updates the columns it has
+STOCK_FILE_TEXT_FIELDS = ['name', 'exchange', 'sector', 'industry', 'description']
+STOCK_FILE_NUMBER_FIELDS = ['market_cap', 'pe_ratio', 'pb_ratio', 'dividend_yield']
+STOCK_FILE_FIELDS = STOCK_FILE_TEXT_FIELDS + STOCK_FILE_NUMBER_FIELDS
+
+# Rows read, validated and upserted at a time by the metadata file import
+STOCK_FILE_CHUNK_SIZE = 1000
+
+
+def _iter_xlsx_chunks(file_path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """
+    Read the first sheet of an xlsx workbook in read-only mode, chunk_size rows at a time
+    """
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(value).strip().lower() if value is not None else '' for value in header]
+        width = len(columns)
+
+        batch = []
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            # Read-only sheets do not pad short rows
+            batch.append(tuple(row[:width]) + (None,) * (width - len(row)))
+            if len(batch) >= chunk_size:
+                yield pd.DataFrame(batch, columns=columns)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=columns)
+    finally:
+        workbook.close()
+
+
+def iter_stock_file(file_path: str, chunk_size: int = STOCK_FILE_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Stream a stock metadata file as DataFrames of at most chunk_size rows
+
+    xlsx files are read with openpyxl in read-only mode and CSV files with
+    chunked pd.read_csv, so memory stays flat however large the file is.
+    Legacy .xls files cannot be streamed and are read whole. Only empty
+    cells are missing values, so tickers such as NA or NULL are kept.
+
+    Args:
+        file_path: Path to an .xlsx, .xlsm, .xls or .csv file with a header row
+        chunk_size: Rows per chunk
+
+    Returns:
+        Iterator of DataFrames with lower-case column names
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == '.csv':
+        chunks = pd.read_csv(file_path, chunksize=chunk_size, dtype=str, skip_blank_lines=True,
+                             keep_default_na=False, na_values=[''])
+    elif extension in ('.xlsx', '.xlsm'):
+        chunks = _iter_xlsx_chunks(file_path, chunk_size)
+    else:
+        df = pd.read_excel(file_path, keep_default_na=False, na_values=[''])
+        chunks = (df.iloc[start:start + chunk_size] for start in range(0, len(df), chunk_size))
+
+    for chunk in chunks:
+        chunk.columns = [str(column).strip().lower() for column in chunk.columns]
+        yield chunk
+
+
+def clean_stock_frame(df: pd.DataFrame) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Validate and normalize one chunk of stock metadata rows with column operations
+
+    Symbols are upper-cased and must be non-empty and fit the symbol column,
+    as in validate_stock_data. Text is truncated to its column length and
+    numbers that cannot be parsed become None. A symbol repeated in the chunk
+    keeps its last row.
+
+    Args:
+        df: Chunk from iter_stock_file
+
+    Returns:
+        Tuple of the valid rows, as dictionaries with 'symbol' and the
+        STOCK_FILE_FIELDS columns present in the chunk, and the number of
+        invalid rows
+    """
+    if 'symbol' not in df.columns:
+        raise ValueError("Missing required column: symbol")
+
+    symbols = df['symbol'].astype('string').str.strip().str.upper()
+    lengths = symbols.str.len().fillna(0)
+    valid = ((lengths > 0) & (lengths <= Stock._meta.get_field('symbol').max_length)).astype(bool)
+    rows = df[valid]
+
+    clean = pd.DataFrame({'symbol': symbols[valid]})
+    for field in STOCK_FILE_TEXT_FIELDS:
+        if field in rows.columns:
+            values = rows[field].astype('string').str.strip()
+            max_length = Stock._meta.get_field(field).max_length
+            if max_length:
+                values = values.str.slice(0, max_length)
+            clean[field] = values.fillna('')
+    for field in STOCK_FILE_NUMBER_FIELDS:
+        if field in rows.columns:
+            values = pd.to_numeric(rows[field], errors='coerce')
+            if field == 'market_cap':
+                values = values.where(values.abs() < 2 ** 63).round().astype('Int64')
+            clean[field] = values
+    clean = clean.drop_duplicates('symbol', keep='last')
+
+    records = clean.astype(object).where(clean.notna(), None).to_dict('records')
+    return records, int((~valid).sum())
+
+
+# Price file columns, with the vendor spellings accepted for each
+PRICE_FILE_COLUMNS = {
+    'symbol': ('symbol', 'ticker'),
+    'date': ('date', 'trade_date'),
+    'open_price': ('open_price', 'open'),
+    'high_price': ('high_price', 'high'),
+    'low_price': ('low_price', 'low'),
+    'close_price': ('close_price', 'close'),
+    'volume': ('volume',),
+}
+
+# Rows read, validated and loaded at a time by the price file import
+PRICE_FILE_CHUNK_SIZE = 50000
+
+# Largest price the numeric(10, 2) price columns hold
+MAX_STORED_PRICE = 10 ** 8
+
+
+def iter_price_file(file_path: str, chunk_size: int = PRICE_FILE_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Stream a price history file as DataFrames of at most chunk_size rows
+
+    Args:
+        file_path: CSV (optionally compressed, e.g. .csv.gz) or Parquet file
+            with symbol, date and OHLCV columns
+        chunk_size: Rows per chunk
+
+    Returns:
+        Iterator of DataFrames with the PRICE_FILE_COLUMNS names
+
+    Raises:
+        ValueError: If a column is missing, or the file is Parquet and pyarrow is not installed
+    """
+    name = file_path.lower()
+    if name.endswith(('.parquet', '.pq')):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Reading Parquet files requires pyarrow (pip install pyarrow)")
+        parquet_file = pq.ParquetFile(file_path)
+        chunks = (batch.to_pandas() for batch in parquet_file.iter_batches(batch_size=chunk_size))
+    else:
+        # Only empty cells are missing values, so tickers such as NA or NULL are kept
+        chunks = pd.read_csv(file_path, chunksize=chunk_size, dtype={0: str}, keep_default_na=False, na_values=[''])
+
+    for chunk in chunks:
+        columns = {str(column).strip().lower(): column for column in chunk.columns}
+        renamed = {}
+        for field, spellings in PRICE_FILE_COLUMNS.items():
+            column = next((columns[spelling] for spelling in spellings if spelling in columns), None)
+            if column is None:
+                raise ValueError(f"Missing required column: {field}")
+            renamed[column] = field
+        yield chunk[list(renamed)].rename(columns=renamed)
+
+
+def clean_price_frame(df: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
+    """
+    Validate and normalize one chunk of price rows with column operations
+
+    Rows without a symbol, a parseable date or any OHLCV value, rows with
+    a price that is not positive or does not fit the price columns, and rows
+    with a negative volume are dropped.
+
+    Args:
+        df: Chunk from iter_price_file
+
+    Returns:
+        Tuple of the valid rows (upper-case symbols, datetime.date dates,
+        prices rounded to cents, integer volumes) and the number of invalid rows
+    """
+    clean = pd.DataFrame({
+        'symbol': df['symbol'].astype('string').str.strip().str.upper(),
+        'date': pd.to_datetime(df['date'], errors='coerce'),
+    })
+    for field in PRICE_FIELDS:
+        clean[field] = pd.to_numeric(df[field], errors='coerce')
+
+    lengths = clean['symbol'].str.len().fillna(0)
+    valid = ((lengths > 0) & (lengths <= Stock._meta.get_field('symbol').max_length)).astype(bool)
+    valid &= clean.notna().all(axis=1)
+    # Prices are checked as stored, so ones that round to zero cents are rejected as well
+    prices = clean[['open_price', 'high_price', 'low_price', 'close_price']].round(2)
+    valid &= ((prices > 0) & (prices < MAX_STORED_PRICE)).all(axis=1)
+    valid &= clean['volume'] >= 0
+
+    clean = clean[valid].copy()
+    clean['date'] = clean['date'].dt.date
+    for field in ('open_price', 'high_price', 'low_price', 'close_price'):
+        clean[field] = clean[field].round(2)
+    clean['volume'] = clean['volume'].round().astype('int64')
+    return clean, int((~valid).sum())
+
+
 def parse_excel_data(file_path: str) -> List[Dict[str, Any]]:
     """
     Parse Excel file and extract stock data
     
+    Reads the whole file; imports should stream it with iter_stock_file and
+    clean_stock_frame instead. Every row is returned, invalid ones included,
+    for the caller to check with validate_stock_data.
+
     Args:
         file_path: Path to Excel file
     
     Returns:
-        List of stock data dictionaries
+        List of stock data dictionaries with every STOCK_FILE_FIELDS key;
+        missing text is '' and missing or unparsable numbers are None
     """
     try:
-        # Read Excel file
-        df = pd.read_excel(file_path)
-        
-        # Check required columns
-        required_columns = ['symbol']
-        for col in required_columns:
-            if col not in df.columns:
-                raise ValueError(f"Missing required column: {col}")
-        
-        # Convert to list of dictionaries
         data_list = []
-        for _, row in df.iterrows():
-            stock_data = {
-                'symbol': str(row['symbol']).upper(),
-                'name': str(row.get('name', '')),
-                'exchange': str(row.get('exchange', '')),
-                'sector': str(row.get('sector', '')),
-                'industry': str(row.get('industry', '')),
-                'market_cap': row.get('market_cap') if pd.notna(row.get('market_cap')) else None,
-                'description': str(row.get('description', '')),
-                'pe_ratio': row.get('pe_ratio') if pd.notna(row.get('pe_ratio')) else None,
-                'pb_ratio': row.get('pb_ratio') if pd.notna(row.get('pb_ratio')) else None,
-                'dividend_yield': row.get('dividend_yield') if pd.notna(row.get('dividend_yield')) else None,
-            }
-            
-            data_list.append(stock_data)
-        
+        for chunk in iter_stock_file(file_path):
+            if 'symbol' not in chunk.columns:
+                raise ValueError("Missing required column: symbol")
+            rows = pd.DataFrame({'symbol': chunk['symbol'].astype('string').str.upper().fillna('')})
+            for field in STOCK_FILE_TEXT_FIELDS:
+                rows[field] = chunk[field].astype('string').fillna('') if field in chunk.columns else ''
+            for field in STOCK_FILE_NUMBER_FIELDS:
+                rows[field] = pd.to_numeric(chunk[field], errors='coerce') if field in chunk.columns else None
+            data_list.extend(rows.astype(object).where(rows.notna(), None).to_dict('records'))
         return data_list
         
     except Exception as e:
@@ -1,16 +1,24 @@
+import os
+import tempfile
+from datetime import date
 from rest_framework import generics, status, filters
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.views import APIView
-from django.db.models import Q
+from django.conf import settings
+from django.db.models import Q, Max
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from .models import Stock, StockPrice, UserFavoriteStock, StockDataImportLog
 from .serializers import (
     StockSerializer, StockPriceSerializer, UserFavoriteStockSerializer,
-    StockDataImportLogSerializer
+    StockDataImportLogSerializer, StockImportSerializer
 )
-from .utils import import_stock_data, parse_excel_data
+from .jobs import create_import_job
+from .storage import with_indicators, indicator_values
+from .tasks import import_api_task, import_excel_task
+from .utils import compute_custom_indicators, EXTRA_INDICATORS
 
 
 class StockListView(generics.ListAPIView):
@@ -92,7 +100,30 @@ class StockPriceListView(generics.ListAPIView):
         if end_date:
             queryset = queryset.filter(date__lte=end_date)
         
-        return queryset.order_by('-date')
+        return with_indicators(queryset).order_by('-date')
+
+
+# Limits for on-demand indicator parameters
+MAX_INDICATOR_PERIOD = 500
+MAX_INDICATOR_PERIODS = 10
+
+
+def _parse_periods(value, name, count=None):
+    """
+    Parse a comma-separated list of indicator periods from a query parameter
+    """
+    try:
+        periods = tuple(int(item) for item in value.split(',') if item.strip())
+    except ValueError:
+        raise ValueError(f'{name} periods must be integers')
+    
+    if not periods or any(period < 1 or period > MAX_INDICATOR_PERIOD for period in periods):
+        raise ValueError(f'{name} periods must be between 1 and {MAX_INDICATOR_PERIOD}')
+    if count is not None and len(periods) != count:
+        raise ValueError(f'{name} requires exactly {count} periods')
+    if len(periods) > MAX_INDICATOR_PERIODS:
+        raise ValueError(f'At most {MAX_INDICATOR_PERIODS} {name} periods are allowed')
+    return periods
 
 
 class TechnicalIndicatorsView(APIView):
@@ -104,27 +135,64 @@ class TechnicalIndicatorsView(APIView):
     def get(self, request, symbol):
         """
         Get technical indicator data for stock
+        
+        Stored indicator columns are returned by default. Passing any of
+        ma, ema, rsi (comma-separated periods), macd (fast,slow,signal) or
+        extra (bollinger, atr, stochastic, obv, vwap) calculates those
+        indicators on the fly instead. start and end
+        bound the returned dates; without start the latest 100 rows are returned.
         """
         stock = get_object_or_404(Stock, symbol=symbol)
+        params = request.query_params
+        
+        try:
+            start_date = date.fromisoformat(params['start']) if params.get('start') else None
+            end_date = date.fromisoformat(params['end']) if params.get('end') else None
+            ma_periods = _parse_periods(params['ma'], 'MA') if params.get('ma') else ()
+            ema_periods = _parse_periods(params['ema'], 'EMA') if params.get('ema') else ()
+            rsi_periods = _parse_periods(params['rsi'], 'RSI') if params.get('rsi') else ()
+            macd_params = _parse_periods(params['macd'], 'MACD', count=3) if params.get('macd') else None
+            extras = tuple(sorted({name.strip() for name in params.get('extra', '').split(',') if name.strip()}))
+            unknown = [name for name in extras if name not in EXTRA_INDICATORS]
+            if unknown:
+                raise ValueError(f"Unknown indicators: {', '.join(unknown)}")
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        limit = None if start_date else 100
+        
+        if ma_periods or ema_periods or rsi_periods or macd_params or extras:
+            last_date = StockPrice.objects.filter(stock=stock).aggregate(last=Max('date'))['last']
+            if last_date is None:
+                return Response([])
+            data = compute_custom_indicators(
+                stock.symbol, last_date, stock.updated_at,
+                ma_periods=ma_periods,
+                ema_periods=ema_periods,
+                rsi_periods=rsi_periods,
+                macd_params=macd_params,
+                extras=extras,
+                start_date=start_date,
+                end_date=end_date,
+                limit=limit,
+            )
+            return Response(data)
         
         # Get recent price data
-        prices = StockPrice.objects.filter(stock=stock).order_by('-date')[:100]
+        prices = with_indicators(StockPrice.objects.filter(stock=stock)).order_by('-date')
+        if start_date:
+            prices = prices.filter(date__gte=start_date)
+        if end_date:
+            prices = prices.filter(date__lte=end_date)
+        if limit:
+            prices = prices[:limit]
         
         data = []
         for price in prices:
             data.append({
                 'date': price.date,
                 'close_price': price.close_price,
-                'ma_5': price.ma_5,
-                'ma_10': price.ma_10,
-                'ma_20': price.ma_20,
-                'ma_50': price.ma_50,
-                'ema_12': price.ema_12,
-                'ema_26': price.ema_26,
-                'macd': price.macd,
-                'macd_signal': price.macd_signal,
-                'macd_histogram': price.macd_histogram,
-                'rsi': price.rsi,
+                **indicator_values(price),
             })
         
         return Response(data)
@@ -207,87 +275,60 @@ class ExcelImportView(APIView):
     
     def post(self, request):
         """
-        Import stock data from Excel file
+        Queue an import of stock data from an Excel or CSV file
+
+        The file is imported by a background task; the response carries the
+        job id, whose status and progress the import log endpoints report.
+        xlsx and CSV files are streamed, but legacy .xls files are read whole,
+        so those larger than STOCK_IMPORT_MAX_XLS_BYTES are rejected.
         """
         file_obj = request.FILES.get('file')
         if not file_obj:
             return Response({'error': 'File is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        if not file_obj.name.endswith(('.xlsx', '.xls')):
-            return Response({'error': 'Only Excel files are supported'}, status=status.HTTP_400_BAD_REQUEST)
+        if not file_obj.name.lower().endswith(('.xlsx', '.xls', '.csv')):
+            return Response({'error': 'Only Excel and CSV files are supported'}, status=status.HTTP_400_BAD_REQUEST)
+
+        max_xls_bytes = settings.STOCK_IMPORT_MAX_XLS_BYTES
+        if file_obj.name.lower().endswith('.xls') and file_obj.size > max_xls_bytes:
+            return Response(
+                {'error': f'.xls files are limited to {max_xls_bytes / (1024 * 1024):g}MB; '
+                          'save larger files as .xlsx or CSV'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
+        import_log = None
+        tmp_file_path = None
         try:
+            # Keep the file where the background worker can read it
+            os.makedirs(settings.STOCK_IMPORT_UPLOAD_DIR, exist_ok=True)
+            suffix = os.path.splitext(file_obj.name)[1]
+            with tempfile.NamedTemporaryFile(dir=settings.STOCK_IMPORT_UPLOAD_DIR, suffix=suffix,
+                                             delete=False) as tmp_file:
+                for chunk in file_obj.chunks():
+                    tmp_file.write(chunk)
+                tmp_file_path = tmp_file.name
+            
             # Create import log
             import_log = StockDataImportLog.objects.create(
-                import_type='excel',
-                status='processing',
+                import_type='stock_csv' if suffix.lower() == '.csv' else 'excel',
+                status='pending',
                 file_path=file_obj.name,
                 created_by=request.user
             )
+            import_excel_task.delay(import_log.id, tmp_file_path)
             
-            # Save file temporarily
-            import tempfile
-            import os
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_file:
-                for chunk in file_obj.chunks():
-                    tmp_file.write(chunk)
-                tmp_file_path = tmp_file.name
-            
-            try:
-                # Parse Excel data
-                data_list = parse_excel_data(tmp_file_path)
-                
-                success_count = 0
-                error_count = 0
-                
-                for data in data_list:
-                    try:
-                        # Create or update stock
-                        stock, created = Stock.objects.update_or_create(
-                            symbol=data['symbol'],
-                            defaults={
-                                'name': data.get('name', ''),
-                                'exchange': data.get('exchange', ''),
-                                'sector': data.get('sector', ''),
-                                'industry': data.get('industry', ''),
-                                'market_cap': data.get('market_cap'),
-                                'description': data.get('description', ''),
-                                'pe_ratio': data.get('pe_ratio'),
-                                'pb_ratio': data.get('pb_ratio'),
-                                'dividend_yield': data.get('dividend_yield'),
-                            }
-                        )
-                        success_count += 1
-                    except Exception as e:
-                        error_count += 1
-                        continue
-                
-                # Update import log
-                import_log.status = 'success'
-                import_log.total_records = len(data_list)
-                import_log.success_records = success_count
-                import_log.failed_records = error_count
-                import_log.save()
-                
-                return Response({
-                    'message': 'Import completed successfully',
-                    'total_records': len(data_list),
-                    'success_records': success_count,
-                    'failed_records': error_count
-                }, status=status.HTTP_200_OK)
-                
-            finally:
-                # Clean up temporary file
-                os.unlink(tmp_file_path)
-                
         except Exception as e:
-            # Update import log
-            import_log.status = 'failed'
-            import_log.error_message = str(e)
-            import_log.save()
+            if tmp_file_path and os.path.exists(tmp_file_path):
+                os.unlink(tmp_file_path)
+            if import_log:
+                import_log.status = 'failed'
+                import_log.error_message = str(e)
+                import_log.save()
             
             return Response({'error': f'Import failed: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        return _job_response(import_log, f'Import of {file_obj.name} started')
 
 
 class ImportAPIDataView(APIView):
@@ -298,49 +339,46 @@ class ImportAPIDataView(APIView):
     
     def post(self, request):
         """
-        Import stock data from external API
+        Queue an import of stock data from the external API
+
+        Accepts one 'symbol' or a list (or comma-separated string) of
+        'symbols'. The prices are fetched by a background task; the response
+        carries the job id, whose status and progress the import log
+        endpoints report.
         """
-        symbol = request.data.get('symbol')
-        period = request.data.get('period', '1y')
-        
-        if not symbol:
-            return Response({'error': 'Stock symbol is required'}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = StockImportSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        params = serializer.validated_data
         
+        import_log = None
         try:
-            # Create import log
-            import_log = StockDataImportLog.objects.create(
-                import_type='api',
-                status='processing',
-                created_by=request.user
-            )
+            import_log = create_import_job(params['symbols'], import_type='api', created_by=request.user)
+            import_api_task.delay(import_log.id, period=params['period'], full=params['full'])
             
-            # Import data
-            success = import_stock_data(symbol)
-            
-            if success:
-                import_log.status = 'success'
-                import_log.total_records = 1
-                import_log.success_records = 1
-                import_log.failed_records = 0
-                import_log.save()
-                
-                return Response({
-                    'message': f'Successfully imported data for {symbol}',
-                    'symbol': symbol
-                }, status=status.HTTP_200_OK)
-            else:
+        except Exception as e:
+            if import_log:
                 import_log.status = 'failed'
-                import_log.error_message = f'Failed to import data for {symbol}'
+                import_log.error_message = str(e)
                 import_log.save()
-                
-                return Response({'error': f'Failed to import data for {symbol}'}, status=status.HTTP_400_BAD_REQUEST)
-                
-        except Exception as e:
-            import_log.status = 'failed'
-            import_log.error_message = str(e)
-            import_log.save()
             
             return Response({'error': f'Import failed: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        return _job_response(import_log, f"Import of {', '.join(import_log.items.values_list('symbol', flat=True))} started")
+
+
+def _job_response(import_log, message):
+    """
+    202 response pointing at a queued import job
+    """
+    # Eager tasks have already finished
+    import_log.refresh_from_db()
+    return Response({
+        'message': message,
+        'job_id': import_log.id,
+        'status': import_log.status,
+        'status_url': reverse('import_log_detail', args=[import_log.id]),
+    }, status=status.HTTP_202_ACCEPTED)
 
 
 class ImportLogListView(generics.ListAPIView):
@@ -353,3 +391,12 @@ class ImportLogListView(generics.ListAPIView):
 
 
 
+
+
+class ImportLogDetailView(generics.RetrieveAPIView):
+    """
+    Data Import Job Status View
+    """
+    serializer_class = StockDataImportLogSerializer
+    permission_classes = [IsAdminUser]
+    queryset = StockDataImportLog.objects.all()